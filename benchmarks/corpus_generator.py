@@ -0,0 +1,94 @@
+import argparse
+import os
+import random
+from bisect import bisect_right
+from itertools import accumulate
+
+import config
+
+
+class ZipfSampler:
+
+    def __init__(self, size, exponent):
+        self.cumulative_weights = list(accumulate(1.0 / (rank ** exponent) for rank in range(1, size + 1)))
+        self.total = self.cumulative_weights[-1]
+
+
+    def sample(self, rng):
+        return bisect_right(self.cumulative_weights, rng.random() * self.total)
+
+
+class CorpusGenerator:
+
+    SYLLABLES = ["ba", "cá", "de", "fí", "go", "há", "la", "mó", "na", "pe", "rí", "sa", "tú", "bh", "ch", "gh"]
+    SPEAKER_NAME_TEMPLATE = "cainteoir{0:05d}"
+    SOURCE_DATE = 695280768
+    SOURCE_CHANNELS = ["#tástáil"]
+
+    def __init__(self, seed=0, vocabulary_size=50000, vocabulary_exponent=1.1, max_line_length=40,
+            line_length_exponent=1.5, min_line_length=2):
+        self.seed = seed
+        self.vocabulary_size = vocabulary_size
+        self.words = [self.make_word(i) for i in range(vocabulary_size)]
+        self.word_sampler = ZipfSampler(vocabulary_size, vocabulary_exponent)
+        self.line_length_sampler = ZipfSampler(max_line_length - min_line_length + 1, line_length_exponent)
+        self.min_line_length = min_line_length
+
+
+    def make_word(self, i):
+        syllables = [CorpusGenerator.SYLLABLES[i % len(CorpusGenerator.SYLLABLES)]]
+        i //= len(CorpusGenerator.SYLLABLES)
+        while i:
+            syllables.append(CorpusGenerator.SYLLABLES[i % len(CorpusGenerator.SYLLABLES)])
+            i //= len(CorpusGenerator.SYLLABLES)
+        return "".join(syllables)
+
+
+    def get_speaker_name(self, rank):
+        return CorpusGenerator.SPEAKER_NAME_TEMPLATE.format(rank)
+
+
+    def get_line_count(self, rank, max_lines, min_lines):
+        return max(min_lines, int(max_lines / rank))
+
+
+    def generate_lines(self, rank, line_count):
+        rng = random.Random("{0}:{1}".format(self.seed, rank))
+        lines = []
+        for i in range(line_count):
+            length = self.min_line_length + self.line_length_sampler.sample(rng)
+            lines.append(" ".join(self.words[self.word_sampler.sample(rng)] for j in range(length)))
+        return lines
+
+
+    def generate(self, dir_path, speaker_count, max_lines, min_lines=10):
+        os.makedirs(dir_path, exist_ok=True)
+
+        speaker_names = []
+        for rank in range(1, speaker_count + 1):
+            speaker_name = self.get_speaker_name(rank)
+            lines = self.generate_lines(rank, self.get_line_count(rank, max_lines, min_lines))
+            with open(os.path.join(dir_path, speaker_name + config.SOURCE_EXTENSION), "w", encoding="utf8") as source_file:
+                source_file.write("\n".join(lines) + "\n")
+            speaker_names.append(speaker_name)
+
+        with open(os.path.join(dir_path, config.SOURCE_INFO_FILENAME), "w", encoding="utf8") as info_file:
+            info_file.write("{0}={1}\n".format(config.SOURCE_INFO_KEY_DATE, CorpusGenerator.SOURCE_DATE))
+            info_file.write("{0}={1}\n".format(config.SOURCE_INFO_KEY_CHANNELS, " ".join(CorpusGenerator.SOURCE_CHANNELS)))
+
+        return speaker_names
+
+
+if __name__ == "__main__":
+
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument("output_dir")
+    argparser.add_argument("--speakers", type=int, default=1000)
+    argparser.add_argument("--max-lines", type=int, default=50000)
+    argparser.add_argument("--min-lines", type=int, default=10)
+    argparser.add_argument("--vocabulary", type=int, default=50000)
+    argparser.add_argument("--seed", type=int, default=0)
+    args = argparser.parse_args()
+
+    generator = CorpusGenerator(seed=args.seed, vocabulary_size=args.vocabulary)
+    generator.generate(args.output_dir, args.speakers, args.max_lines, args.min_lines)
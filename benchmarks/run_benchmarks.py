@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import config
+from cached_transition_retriever import CachedTransitionRetriever
+from compiled_transition_store import CompiledTransitionStore, compile_speaker
+from quote_generator import QuoteGenerator
+from rand import Rand
+from request_handler import RequestHandler
+from source_retriever import SourceRetriever
+from speaker_collection import SpeakerCollection
+from transition_builder import TransitionBuilder
+from vocabulary import Vocabulary
+
+from corpus_generator import CorpusGenerator
+
+
+class Benchmarks:
+
+    MERGED_SPEAKER_COUNT = 3
+
+    def __init__(self, source_dir, speaker_names, repeat):
+        self.source_dir = source_dir
+        self.speaker_names = speaker_names
+        self.repeat = repeat
+        self.results = {}
+
+
+    def measure(self, name, function, setup=None, number=1):
+        timings = []
+        for i in range(self.repeat):
+            argument = setup() if setup else None
+            start = time.perf_counter()
+            for j in range(number):
+                function(argument)
+            timings.append((time.perf_counter() - start) / number)
+
+        self.results[name] = {
+            "min" : min(timings),
+            "median" : statistics.median(timings),
+            "mean" : statistics.mean(timings),
+            "repeat" : self.repeat,
+            "number" : number,
+        }
+
+
+    def make_retriever(self, compiled_dir=None):
+        vocabulary = Vocabulary()
+        source_retriever = SourceRetriever(self.source_dir)
+        transition_store = CompiledTransitionStore(compiled_dir, vocabulary) if compiled_dir else None
+        retriever = CachedTransitionRetriever(source_retriever, TransitionBuilder(vocabulary), SpeakerCollection(source_retriever),
+            min_lookbacks=0, transition_store=transition_store)
+        return retriever
+
+
+    def make_handler(self):
+        shutil.rmtree(os.path.join(self.source_dir, config.COMPILED_DIR_NAME), ignore_errors=True)
+        return RequestHandler(self.source_dir)
+
+
+    def run(self):
+        top_speaker = self.speaker_names[0]
+        merged_speakers = self.speaker_names[:Benchmarks.MERGED_SPEAKER_COUNT]
+        lines = list(SourceRetriever(self.source_dir).retrieve(top_speaker))
+        seed = lines[0].split()[0]
+
+        self.measure("build", lambda argument: TransitionBuilder(Vocabulary()).build(lines, config.LOOKBACK_LENGTH))
+        self.measure("build_both", lambda argument: TransitionBuilder(Vocabulary()).build_both(lines, config.LOOKBACK_LENGTH))
+
+        self.measure("get_cold", lambda retriever: retriever.get([top_speaker]), setup=self.make_retriever)
+        warm_retriever = self.make_retriever()
+        warm_retriever.get([top_speaker])
+        warm_retriever.get(merged_speakers)
+        self.measure("get_warm", lambda argument: warm_retriever.get([top_speaker]), number=1000)
+        self.measure("get_merged_cold", lambda retriever: retriever.get(merged_speakers), setup=self.make_retriever)
+        self.measure("get_merged_warm", lambda argument: warm_retriever.get(merged_speakers), number=1000)
+
+        generator = QuoteGenerator(Rand())
+        speaker_names, transitions = warm_retriever.get([top_speaker])
+        speaker_names, merged_transitions = warm_retriever.get(merged_speakers)
+        seed_ids = warm_retriever.transition_builder.vocabulary.encode((seed,))
+        self.measure("generate_unseeded", lambda argument: generator.generate(transitions), number=100)
+        self.measure("generate_seeded", lambda argument: generator.generate(transitions, seed_ids), number=100)
+        self.measure("generate_merged", lambda argument: generator.generate(merged_transitions), number=100)
+
+        with tempfile.TemporaryDirectory() as compiled_dir:
+            self.run_compiled(compiled_dir, top_speaker, merged_speakers, seed, generator)
+
+        request = "{0}{1} {2}".format(config.GENERATE_REQUEST_TRIGGER, top_speaker, seed)
+        self.measure("handle_cold", lambda handler: handler.handle(request), setup=self.make_handler)
+        warm_handler = self.make_handler()
+        warm_handler.handle(request)
+        self.measure("handle_warm", lambda argument: warm_handler.handle(request), number=100)
+
+        return self.results
+
+
+    def run_compiled(self, compiled_dir, top_speaker, merged_speakers, seed, generator):
+        self.measure("compile", lambda argument: compile_speaker(self.source_dir, argument.name, top_speaker),
+            setup=lambda: tempfile.TemporaryDirectory())
+        for speaker_name in merged_speakers:
+            compile_speaker(self.source_dir, compiled_dir, speaker_name)
+
+        self.measure("get_compiled_cold", lambda retriever: retriever.get([top_speaker]), setup=lambda: self.make_retriever(compiled_dir))
+        self.measure("get_compiled_both_cold", lambda retriever: retriever.get_both([top_speaker]), setup=lambda: self.make_retriever(compiled_dir))
+        self.measure("get_compiled_merged_cold", lambda retriever: retriever.get(merged_speakers), setup=lambda: self.make_retriever(compiled_dir))
+
+        retriever = self.make_retriever(compiled_dir)
+        speaker_names, transitions = retriever.get([top_speaker])
+        speaker_names, reverse_transitions = retriever.get([top_speaker], reverse=True)
+        speaker_names, merged_transitions = retriever.get(merged_speakers)
+        seed_ids = retriever.transition_builder.vocabulary.encode((seed,))
+        self.measure("generate_compiled_unseeded", lambda argument: generator.generate(transitions), number=100)
+        self.measure("generate_compiled_seeded", lambda argument: generator.generate(transitions, seed_ids), number=100)
+        self.measure("generate_compiled_reverse", lambda argument: generator.generate(reverse_transitions, seed_ids), number=100)
+        self.measure("generate_compiled_merged", lambda argument: generator.generate(merged_transitions), number=100)
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in sorted(results.items()):
+        if not name in baseline:
+            continue
+        ratio = result["median"] / baseline[name]["median"] if baseline[name]["median"] else float("inf")
+        print("{0:<20} {1:>12.6f}s {2:>12.6f}s {3:>7.2f}x".format(name, baseline[name]["median"], result["median"], ratio), file=sys.stderr)
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument("--source-dir", help="use an existing corpus instead of generating one")
+    argparser.add_argument("--speakers", type=int, default=200)
+    argparser.add_argument("--max-lines", type=int, default=20000)
+    argparser.add_argument("--vocabulary", type=int, default=20000)
+    argparser.add_argument("--seed", type=int, default=0)
+    argparser.add_argument("--repeat", type=int, default=5)
+    argparser.add_argument("--output", help="write results as JSON to this file instead of stdout")
+    argparser.add_argument("--baseline", help="JSON results to compare against")
+    argparser.add_argument("--tolerance", type=float, default=0.1)
+    args = argparser.parse_args()
+
+    config.BUILD_PROCESSES = 1
+    temp_dir = tempfile.TemporaryDirectory()
+    source_dir = os.path.join(temp_dir.name, "source")
+    if args.source_dir:
+        shutil.copytree(args.source_dir, source_dir, ignore=shutil.ignore_patterns(config.COMPILED_DIR_NAME))
+    else:
+        CorpusGenerator(seed=args.seed, vocabulary_size=args.vocabulary).generate(source_dir, args.speakers, args.max_lines)
+
+    speaker_names = sorted(SourceRetriever(source_dir).list_speakers(),
+        key=lambda speaker_name: -os.path.getsize(os.path.join(source_dir, speaker_name + config.SOURCE_EXTENSION)))
+    results = Benchmarks(source_dir, speaker_names, args.repeat).run()
+    temp_dir.cleanup()
+
+    output = {
+        "meta" : {
+            "python" : platform.python_version(),
+            "platform" : platform.platform(),
+            "source_dir" : args.source_dir,
+            "speakers" : len(speaker_names),
+            "max_lines" : args.max_lines,
+            "vocabulary" : args.vocabulary,
+            "seed" : args.seed,
+            "lookback_length" : config.LOOKBACK_LENGTH,
+        },
+        "results" : results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as output_file:
+            json.dump(output, output_file, indent=2, sort_keys=True)
+    else:
+        json.dump(output, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions beyond {0:.0%}: {1}".format(args.tolerance, ", ".join(regressions)), file=sys.stderr)
+            sys.exit(1)
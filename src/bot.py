@@ -1,9 +1,13 @@
 import argparse
 
 from twisted.words.protocols import irc
-from twisted.internet import reactor, protocol, ssl
+from twisted.internet import defer, reactor, protocol, ssl
+from twisted.python import log
+from twisted.web import server
 
 import config
+from metrics_resource import MetricsResource
+from request_dispatcher import RequestDispatcher
 from request_handler import RequestHandler
 
 
@@ -11,38 +15,66 @@ class PasadoirBot(irc.IRCClient):
 
     nickname = config.BOT_NICK
 
-    def __init__(self, channel, source_dir):
-        self.channel = channel
-        self.handler = RequestHandler(source_dir)
+    def __init__(self, channels, handler, dispatcher):
+        self.channels = channels
+        self.handler = handler
+        self.dispatcher = dispatcher
 
 
     def signedOn(self):
-        self.join(self.channel)
+        for channel in self.channels:
+            self.join(channel)
 
 
     def privmsg(self, user, channel, input_message):
-        output_message = self.handler.handle(input_message)
+        if not self.handler.accepts(input_message):
+            return
+
+        deferred = self.dispatcher.dispatch(self.handler, input_message)
+        deferred.addCallback(self.reply, channel)
+        deferred.addErrback(self.drop_timed_out)
+        deferred.addErrback(log.err)
+
+
+    def reply(self, output_message, channel):
         if output_message:
             self.msg(channel, output_message)
 
 
-class PasadoirBotFactory(protocol.ClientFactory):
+    def drop_timed_out(self, failure):
+        failure.trap(defer.TimeoutError)
 
-    def __init__(self, channel, source_dir):
-        self.channel = channel
-        self.source_dir = source_dir
+
+class PasadoirBotFactory(protocol.ReconnectingClientFactory):
+
+    def __init__(self, channels, handler, dispatcher):
+        self.channels = channels
+        self.handler = handler
+        self.dispatcher = dispatcher
 
 
     def buildProtocol(self, addr):
-        return PasadoirBot(self.channel, self.source_dir)
+        self.resetDelay()
+        bot = PasadoirBot(self.channels, self.handler, self.dispatcher)
+        bot.factory = self
+        return bot
 
 
-    def clientConnectionLost(self, connector, reason):
-        connector.connect()
+def start_background_tasks(handler, dispatcher, tail_interval):
+    dispatcher.run_in_background(handler.warm)
+    dispatcher.repeat(config.POPULARITY_SAVE_SECONDS, handler.save_popularity)
+    if tail_interval > 0:
+        dispatcher.repeat(tail_interval, handler.tail)
+    dispatcher.repeat(config.SPEAKER_STATS_UPDATE_SECONDS, handler.update_statistics, idle_only=True)
+    if config.QUOTE_RESERVOIR_SIZE > 0:
+        dispatcher.repeat(config.QUOTE_RESERVOIR_REFILL_SECONDS, handler.refill_quotes, idle_only=True)
 
 
-    def clientConnectionFailed(self, connector, reason):
-        reactor.stop()
+def parse_network(host, port, channels, use_ssl):
+    if port.startswith(config.SSL_PORT_PREFIX):
+        use_ssl = True
+        port = port[len(config.SSL_PORT_PREFIX):]
+    return host, int(port), channels.split(config.CHANNEL_SEPARATOR), use_ssl
 
 
 if __name__ == "__main__":
@@ -50,15 +82,26 @@ if __name__ == "__main__":
     argparser = argparse.ArgumentParser()
     argparser.add_argument("host")
     argparser.add_argument("port")
-    argparser.add_argument("channel")
+    argparser.add_argument("channels")
     argparser.add_argument("source_dir")
     argparser.add_argument("--ssl", action="store_true")
+    argparser.add_argument("--network", action="append", nargs=3, default=[], metavar=("HOST", "PORT", "CHANNELS"))
+    argparser.add_argument("--tail", type=int, default=config.TAIL_INTERVAL_SECONDS, metavar="SECONDS")
+    argparser.add_argument("--metrics-port", type=int, default=config.METRICS_PORT)
     args = argparser.parse_args()
 
-    factory = PasadoirBotFactory(args.channel, args.source_dir)
-    if args.ssl:
-        reactor.connectSSL(args.host, int(args.port), factory, ssl.ClientContextFactory())
-    else:
-        reactor.connectTCP(args.host, int(args.port), factory)
+    dispatcher = RequestDispatcher(reactor)
+    handler = RequestHandler(args.source_dir)
+    reactor.callWhenRunning(start_background_tasks, handler, dispatcher, args.tail)
+    reactor.addSystemEventTrigger("before", "shutdown", handler.save_popularity)
+    if args.metrics_port > 0:
+        reactor.listenTCP(args.metrics_port, server.Site(MetricsResource(handler.tracer)), interface=config.METRICS_INTERFACE)
+
+    for host, port, channels in [(args.host, args.port, args.channels)] + args.network:
+        host, port, channels, use_ssl = parse_network(host, port, channels, args.ssl)
+        factory = PasadoirBotFactory(channels, handler, dispatcher)
+        if use_ssl:
+            reactor.connectSSL(host, port, factory, ssl.ClientContextFactory())
+        else:
+            reactor.connectTCP(host, port, factory)
     reactor.run()
-
@@ -1,25 +1,63 @@
+import threading
+import time
 from collections import namedtuple, OrderedDict
+from concurrent.futures.process import BrokenProcessPool
 
 import config
+from compiled_transition_store import compile_speaker
+from latency_tracker import LatencyTracker
+from request_tracer import RequestTracer
+from merged_transitions import MergedTransitions
+from transition_table import TransitionTable
 
-CacheItem = namedtuple("CacheItem", ["age", "key", "value", "reversed"])
+CacheItem = namedtuple("CacheItem", ["value", "size", "signature"])
 
 class CachedTransitionRetriever:
 
     def __init__(self, source_retriever, transition_builder, speaker_collection,
-            capacity=config.CACHE_CAPACITY, min_lookbacks=config.CACHE_MIN_LOOKBACKS):
+            budget=config.CACHE_BUDGET_BYTES, min_lookbacks=config.CACHE_MIN_LOOKBACKS,
+            max_merged_speakers=config.MAX_MERGED_SPEAKERS, transition_store=None, build_pool=None, save_pool=None,
+            equal_weight=config.MERGE_EQUAL_WEIGHT, popularity=None, tracer=None):
         self.source_retriever = source_retriever
         self.transition_builder = transition_builder
         self.speaker_collection = speaker_collection
-        self.capacity = capacity
+        self.transition_store = transition_store
+        self.build_pool = build_pool
+        self.save_pool = save_pool
+        self.compiling_names = set()
+        self.budget = budget
         self.min_lookbacks = min_lookbacks
-        self.max_merged_speakers = int(self.capacity / 2) - 1
-        self.refresh()
+        self.max_merged_speakers = max_merged_speakers
+        self.equal_weight = equal_weight
+        self.popularity = popularity
+        self.tracer = tracer if tracer else RequestTracer()
+        self.eviction_count = 0
+        self.overflow_count = 0
+        self.hit_counts = {False : 0, True : 0}
+        self.miss_counts = {False : 0, True : 0}
+        self.build_latency = LatencyTracker()
+        self.lock = threading.Lock()
+        self.clear()
+
+
+    def clear(self):
+        with self.lock:
+            self.cache = OrderedDict()
+            self.cache_size = 0
 
 
     def refresh(self):
-        self.cache = [CacheItem(age=-1, key="", value={}, reversed=False)] * self.capacity
-        self.age_counter = 0
+        with self.lock:
+            cached = [(cache_key, item.signature) for cache_key, item in self.cache.items()]
+
+        changed_names = set()
+        for (speaker_name, reverse), signature in cached:
+            if speaker_name in changed_names or self.source_retriever.get_signature(speaker_name) != signature:
+                changed_names.add(speaker_name)
+                with self.lock:
+                    self.evict((speaker_name, reverse))
+
+        return sorted(changed_names)
 
 
     def get(self, speaker_nicks, reverse=False):
@@ -27,99 +65,316 @@ class CachedTransitionRetriever:
         if len(speaker_names) < 1:
             return None, {}
 
+        self.record_popularity(speaker_names, reverse)
         if len(speaker_names) == 1:
             return speaker_names, self.get_by_name(speaker_names[0], reverse)
 
         return speaker_names, self.get_merged(speaker_names, reverse)
 
 
+    def get_both(self, speaker_nicks):
+        speaker_names = self.resolve_speaker_names(speaker_nicks)
+        if len(speaker_names) < 1:
+            return None, {}, {}
+
+        self.record_popularity(speaker_names, False)
+        self.record_popularity(speaker_names, True)
+        if len(speaker_names) == 1:
+            return (speaker_names,) + self.get_both_by_name(speaker_names[0])
+
+        self.compile_uncached(speaker_names, False)
+        components = [self.get_both_by_name(speaker_name) for speaker_name in speaker_names]
+        return (speaker_names, self.merge([forward_transitions for forward_transitions, reverse_transitions in components]),
+            self.merge([reverse_transitions for forward_transitions, reverse_transitions in components]))
+
+
+    def record_popularity(self, speaker_names, reverse):
+        if self.popularity:
+            self.popularity.record(speaker_names, reverse)
+
+
+    def warm(self, entries):
+        overflow_count = self.overflow_count
+        warmed = []
+        for speaker_names, reverse in entries:
+            speaker_names = [speaker_name for speaker_name in speaker_names if self.speaker_collection.resolve_speaker(speaker_name)]
+            for speaker_name in speaker_names:
+                if self.get_by_name(speaker_name, reverse, evict=False) and not (speaker_name, reverse) in warmed:
+                    warmed.append((speaker_name, reverse))
+            if self.overflow_count != overflow_count:
+                break
+
+        with self.lock:
+            warmed = [cache_key for cache_key in warmed if cache_key in self.cache]
+            for cache_key in reversed(warmed):
+                self.cache.move_to_end(cache_key)
+
+        return warmed
+
+
     def resolve_speaker_names(self, speaker_nicks):
-        names = self.speaker_collection.resolve_names(speaker_nicks)
+        with self.tracer.stage("resolve"):
+            names = self.speaker_collection.resolve_names(speaker_nicks)
         trimmed_names = list(OrderedDict.fromkeys(names))[:self.max_merged_speakers]
         trimmed_names.sort()
         return trimmed_names
 
 
-    def get_by_name(self, speaker_name, reverse=False):
-        min_age = self.cache[0].age
-        min_age_index = 0
+    def tail(self):
+        with self.lock:
+            speaker_names = sorted({speaker_name for speaker_name, reverse in self.cache})
+
+        updated_names = []
+        for speaker_name in speaker_names:
+            lines = self.source_retriever.retrieve_appended(speaker_name)
+            if lines is None:
+                with self.lock:
+                    self.evict((speaker_name, False))
+                    self.evict((speaker_name, True))
+            elif lines:
+                signature = self.source_retriever.get_signature(speaker_name)
+                forward_additions, reverse_additions = self.transition_builder.build_both(lines, config.LOOKBACK_LENGTH)
+                self.extend_cache_line(speaker_name, False, forward_additions, signature)
+                self.extend_cache_line(speaker_name, True, reverse_additions, signature)
+                updated_names.append(speaker_name)
+
+        return updated_names
+
+
+    def get_by_name(self, speaker_name, reverse=False, evict=True):
+        return self.get_pair_by_name(speaker_name, reverse, False, evict)[0]
+
+
+    def get_both_by_name(self, speaker_name):
+        forward_transitions, reverse_transitions = self.get_pair_by_name(speaker_name, False, True, True)
+        if reverse_transitions is None:
+            reverse_transitions = self.get_by_name(speaker_name, True)
+        return forward_transitions, reverse_transitions
+
+
+    # Both directions are returned when both were loaded or built, whether or not the cache kept them
+    def get_pair_by_name(self, speaker_name, reverse, both, evict):
+        transitions = self.get_by_name_cached_only(speaker_name, reverse)
+        if transitions:
+            return transitions, None
+
+        start_time = time.perf_counter()
+        transitions = None
+        opposite_transitions = None
+        signature = self.source_retriever.get_signature(speaker_name)
+        if self.transition_store:
+            with self.tracer.stage("load"):
+                transitions, opposite_transitions = self.load(speaker_name, reverse, signature, both)
+            if transitions is not None:
+                self.source_retriever.set_offset(speaker_name, signature[0])
+
+        built = transitions is None
+        if built:
+            transitions, opposite_transitions = self.build(speaker_name, reverse, both)
+        self.build_latency.record(time.perf_counter() - start_time)
+        if transitions:
+            self.update_cache_line(speaker_name, transitions, reverse, signature, evict)
+        if both and opposite_transitions:
+            self.update_cache_line(speaker_name, opposite_transitions, not reverse, signature, evict)
+
+        if built and transitions and self.transition_store and signature:
+            self.compile_later(speaker_name, signature, reverse, transitions, opposite_transitions)
+        return transitions, opposite_transitions
+
+
+    def load(self, speaker_name, reverse, signature, both):
+        if not both:
+            return self.transition_store.load(speaker_name, signature, reverse), None
+
+        loaded = self.transition_store.load_both(speaker_name, signature)
+        if not loaded:
+            return None, None
+        forward_transitions, reverse_transitions = loaded
+        if reverse:
+            return reverse_transitions, forward_transitions
+        return forward_transitions, reverse_transitions
+
+
+    def build(self, speaker_name, reverse, both=False):
+        with self.tracer.stage("open"):
+            source = self.source_retriever.retrieve(speaker_name)
+        if not source:
+            return TransitionTable(config.LOOKBACK_LENGTH), TransitionTable(config.LOOKBACK_LENGTH) if both else None
+
+        if not both:
+            with self.tracer.stage("build"):
+                return self.transition_builder.build(source, config.LOOKBACK_LENGTH, reverse), None
+
+        with self.tracer.stage("build"):
+            forward_transitions, reverse_transitions = self.transition_builder.build_both(source, config.LOOKBACK_LENGTH)
+        if reverse:
+            return reverse_transitions, forward_transitions
+        return forward_transitions, reverse_transitions
+
+
+    # Compiling is left until after the request has its table: in a build process if there is one, otherwise
+    #  in the save thread, reusing the tables just built when both directions were built
+    def compile_later(self, speaker_name, signature, reverse, transitions, opposite_transitions):
+        with self.lock:
+            if speaker_name in self.compiling_names:
+                return
+            self.compiling_names.add(speaker_name)
+
+        both_transitions = None
+        if opposite_transitions is not None:
+            both_transitions = (opposite_transitions, transitions) if reverse else (transitions, opposite_transitions)
+        built_transitions = [transitions, opposite_transitions]
+
+        future = None
+        build_pool = self.build_pool
+        if build_pool:
+            try:
+                future = build_pool.submit(compile_speaker, self.source_retriever.dir_path, self.transition_store.dir_path, speaker_name)
+            except (BrokenProcessPool, RuntimeError):
+                self.build_pool = None
+                build_pool.shutdown(wait=False)
+        if not future and self.save_pool:
+            future = self.save_pool.submit(self.compile, speaker_name, signature, both_transitions)
+
+        if future:
+            future.add_done_callback(lambda future: self.finish_compiling(speaker_name, signature, built_transitions, future.result))
+        else:
+            self.finish_compiling(speaker_name, signature, built_transitions,
+                lambda: self.compile(speaker_name, signature, both_transitions))
+
+
+    def compile(self, speaker_name, signature, both_transitions=None):
+        if both_transitions is None:
+            source = self.source_retriever.retrieve(speaker_name, record_offset=False)
+            if not source:
+                return False
+            both_transitions = self.transition_builder.build_both(source, config.LOOKBACK_LENGTH)
+        return self.transition_store.save(speaker_name, signature, *both_transitions)
+
+
+    def finish_compiling(self, speaker_name, signature, built_transitions, get_result):
+        try:
+            compiled = get_result()
+        except (BrokenProcessPool, OSError):
+            compiled = False
+        finally:
+            with self.lock:
+                self.compiling_names.discard(speaker_name)
+
+        if compiled:
+            self.adopt_compiled(speaker_name, signature, built_transitions)
+
+
+    # Cached tables that were built are swapped for views of the compiled file, which share one copy of the n-grams
+    def adopt_compiled(self, speaker_name, signature, built_transitions):
+        loaded = self.transition_store.load_both(speaker_name, signature)
+        if not loaded:
+            return
+
+        with self.lock:
+            for reverse, transitions in zip((False, True), loaded):
+                item = self.cache.get((speaker_name, reverse), None)
+                if item and item.signature == signature and any(item.value is built for built in built_transitions):
+                    size = self.estimate_size(transitions)
+                    self.cache[(speaker_name, reverse)] = CacheItem(transitions, size, signature)
+                    self.cache_size += size - item.size
 
-        for i, item in enumerate(self.cache):
 
-            if item.key == speaker_name and item.reversed == reverse:
-                self.update_cache_line(i, item.key, item.value, item.reversed)
-                return item.value
+    def get_merged(self, speaker_names, reverse):
+        self.compile_uncached(speaker_names, reverse)
+        return self.merge([self.get_by_name(speaker_name, reverse) for speaker_name in speaker_names])
 
-            if item.age < min_age:
-                min_age = item.age
-                min_age_index = i
 
-        transitions = {}
-        source = self.source_retriever.retrieve(speaker_name)
-        if source:
-            transitions = self.transition_builder.build(source, config.LOOKBACK_LENGTH, reverse)
-            if transitions:
-                self.update_cache_line(min_age_index, speaker_name, transitions, reverse)
+    def merge(self, components):
+        components = [transitions for transitions in components if transitions]
 
-        return transitions
+        if not components:
+            return TransitionTable(config.LOOKBACK_LENGTH)
+        if len(components) == 1:
+            return components[0]
+        return MergedTransitions(components, self.equal_weight)
 
 
-    def get_merged(self, speaker_names, reverse):
-        key = self.make_merged_speaker_key(speaker_names)
+    def compile_uncached(self, speaker_names, reverse):
+        if not self.transition_store or not self.build_pool:
+            return
 
-        transitions = self.get_by_name_cached_only(key, reverse)
-        if not transitions:
-            transitions = self.copy_transitions(self.get_by_name(speaker_names[0], reverse))
-            for speaker_name in speaker_names[1:]:
-                additional_transitions = self.get_by_name(speaker_name, reverse)
-                self.merge_transitions(transitions, additional_transitions)
+        stale_names = [speaker_name for speaker_name in speaker_names
+            if not (speaker_name, reverse) in self.cache
+            and not self.transition_store.is_fresh(speaker_name, self.source_retriever.get_signature(speaker_name))]
 
-            if transitions:
-                self.update_cache_line(self.get_min_cache_age_index(), key, transitions, reverse)
+        if len(stale_names) > 1:
+            build_pool = self.build_pool
+            if build_pool and self.transition_store.compile_in_parallel(self.source_retriever.dir_path, stale_names, build_pool) is None:
+                self.build_pool = None
+                build_pool.shutdown(wait=False)
 
-        return transitions
 
+    def get_by_name_cached_only(self, speaker_name, reverse):
+        with self.tracer.stage("lookup"), self.lock:
+            item = self.cache.get((speaker_name, reverse), None)
+            if not item:
+                self.miss_counts[reverse] += 1
+                return {}
 
-    def make_merged_speaker_key(self, speaker_names):
-        return ":".join(speaker_names)
+            self.hit_counts[reverse] += 1
+            self.cache.move_to_end((speaker_name, reverse))
+            return item.value
 
 
-    def get_by_name_cached_only(self, speaker_name, reverse):
-        for i, item in enumerate(self.cache):
-            if item.key == speaker_name and item.reversed == reverse:
-                self.update_cache_line(i, item.key, item.value, item.reversed)
-                return item.value
-        return {}
+    def list_cache_entries(self):
+        with self.lock:
+            return [(speaker_name, reverse, len(item.value), item.size) for (speaker_name, reverse), item in self.cache.items()]
+
+
+    def update_cache_line(self, key, transitions, reverse, signature=None, evict=True):
+        if len(transitions) < self.min_lookbacks:
+            return
+
+        size = self.estimate_size(transitions)
+        if size > self.budget:
+            return
+
+        with self.lock:
+            self.evict((key, reverse))
+            if not evict and self.cache_size + size > self.budget:
+                self.overflow_count += 1
+                return
 
+            while self.cache and self.cache_size + size > self.budget:
+                self.evict(next(iter(self.cache)))
+                self.eviction_count += 1
 
-    def get_min_cache_age_index(self):
-        min_age = self.cache[0].age
-        min_age_index = 0
+            self.cache[(key, reverse)] = CacheItem(transitions, size, signature)
+            self.cache_size += size
 
-        for i, item in enumerate(self.cache):
-            if item.age < min_age:
-                min_age = item.age
-                min_age_index = i
 
-        return min_age_index
+    def extend_cache_line(self, key, reverse, additions, signature):
+        with self.lock:
+            item = self.cache.get((key, reverse), None)
+        if not item or not additions:
+            return
 
+        transitions = item.value
+        if isinstance(transitions, MergedTransitions):
+            base_transitions, appended_transitions = transitions.components
+            appended_transitions = appended_transitions.extended(additions)
+            size = item.size - self.estimate_size(transitions.components[1]) + self.estimate_size(appended_transitions)
+        else:
+            base_transitions, appended_transitions = transitions, additions
+            size = item.size + self.estimate_size(appended_transitions)
 
-    def copy_transitions(self, original):
-        result = {}
-        for lookback, follows in original.items():
-            result[lookback] = list(follows)
-        return result
+        with self.lock:
+            if self.cache.get((key, reverse), None) is item:
+                self.cache[(key, reverse)] = CacheItem(MergedTransitions([base_transitions, appended_transitions]), size, signature)
+                self.cache_size += size - item.size
 
 
-    def merge_transitions(self, transitions, additional_transitions):
-        for lookback, follows in additional_transitions.items():
-            if not lookback in transitions:
-                transitions[lookback] = []
-            transitions[lookback] += follows
+    def evict(self, cache_key):
+        item = self.cache.pop(cache_key, None)
+        if item:
+            self.cache_size -= item.size
 
 
-    def update_cache_line(self, index, key, transitions, reverse):
-        if len(transitions) >= self.min_lookbacks:
-            self.cache[index] = CacheItem(self.age_counter, key, transitions, reverse)
-            self.age_counter += 1
-        #print(["{0}|{1}|{2}|{3}".format(item.key, item.age, len(item.value), int(item.reversed)) for item in self.cache])
+    def estimate_size(self, transitions):
+        return transitions.estimate_size()
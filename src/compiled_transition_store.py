@@ -0,0 +1,503 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import config
+from source_retriever import SourceRetriever
+from transition_builder import TransitionBuilder
+from vocabulary import Vocabulary
+
+
+class CompiledLookbacks(Sequence):
+
+    def __init__(self, transitions):
+        self.transitions = transitions
+
+
+    def __len__(self):
+        return self.transitions.key_count
+
+
+    def __getitem__(self, i):
+        if i < 0 or i >= self.transitions.key_count:
+            raise IndexError(i)
+        return self.transitions.decode_key(i)
+
+
+class CompiledLineStarts:
+
+    def __init__(self, transitions, cumulative_weights, key_indices):
+        self.transitions = transitions
+        self.cumulative_weights = cumulative_weights
+        self.key_indices = key_indices
+        self.total = cumulative_weights[-1] if len(cumulative_weights) else 0
+
+
+    def __len__(self):
+        return self.total
+
+
+    def counts(self):
+        counts = {}
+        previous = 0
+        for cumulative_weight, i in zip(self.cumulative_weights, self.key_indices):
+            counts[self.transitions.decode_key(i)] = cumulative_weight - previous
+            previous = cumulative_weight
+        return counts
+
+
+    def sample(self, rand):
+        start = bisect_right(self.cumulative_weights, rand.rand_index(self.total))
+        return self.transitions.decode_key(self.key_indices[start])
+
+
+# The follows of one lookback are a contiguous range of positions, each holding the running total of the
+#  weights before it within the range, so that a draw is a single bisection
+class CompiledFollows:
+
+    def __init__(self, transitions, start, end):
+        self.transitions = transitions
+        self.start = start
+        self.end = end
+        self.total = transitions.cumulative_weights[end - 1]
+
+
+    def __len__(self):
+        return self.total
+
+
+    def __eq__(self, other):
+        if not hasattr(other, "counts"):
+            return NotImplemented
+        return self.counts() == other.counts()
+
+
+    def __repr__(self):
+        return "CompiledFollows({0})".format(self.counts())
+
+
+    def counts(self):
+        counts = {}
+        previous = 0
+        for position in range(self.start, self.end):
+            cumulative_weight = self.transitions.cumulative_weights[position]
+            counts[self.transitions.decode_follow(position)] = cumulative_weight - previous
+            previous = cumulative_weight
+        return counts
+
+
+    def sample(self, rand):
+        position = bisect_right(self.transitions.cumulative_weights, rand.rand_index(self.total), self.start, self.end)
+        return self.transitions.decode_follow(position)
+
+
+class CompiledNGrams:
+
+    SECTION_HEADER = struct.Struct("=QQQQQ")
+
+    def __init__(self, mapped, offset, lookback_length, global_ids, local_ids):
+        self.lookback_length = lookback_length
+        self.global_ids = global_ids
+        self.local_ids = local_ids
+        self.stride = lookback_length + 1
+
+        gram_count, forward_key_count, reverse_key_count, forward_start_count, reverse_start_count = \
+            CompiledNGrams.SECTION_HEADER.unpack_from(mapped, offset)
+        view = memoryview(mapped)
+        offset += CompiledNGrams.SECTION_HEADER.size
+        self.forward_start_weights, offset = self.cast(view, offset, "Q", forward_start_count)
+        self.reverse_start_weights, offset = self.cast(view, offset, "Q", reverse_start_count)
+        self.grams, offset = self.cast(view, offset, "I", gram_count * self.stride)
+        self.forward_cumulative_weights, offset = self.cast(view, offset, "I", gram_count)
+        self.forward_key_starts, offset = self.cast(view, offset, "I", forward_key_count + 1)
+        self.reverse_order, offset = self.cast(view, offset, "I", gram_count)
+        self.reverse_cumulative_weights, offset = self.cast(view, offset, "I", gram_count)
+        self.reverse_key_starts, offset = self.cast(view, offset, "I", reverse_key_count + 1)
+        self.forward_start_keys, offset = self.cast(view, offset, "I", forward_start_count)
+        self.reverse_start_keys, offset = self.cast(view, offset, "I", reverse_start_count)
+
+
+    @staticmethod
+    def cast(view, offset, item_format, count):
+        end = offset + struct.calcsize(item_format) * count
+        if end > len(view):
+            raise ValueError(end)
+        return view[offset:end].cast(item_format), end
+
+
+    def estimate_shared_size(self):
+        return sys.getsizeof(self.global_ids) + sys.getsizeof(self.local_ids) + self.grams.nbytes
+
+
+class CompiledTransitions(Mapping):
+
+    def __init__(self, ngrams, reverse=False):
+        self.ngrams = ngrams
+        self.reverse = reverse
+        self.lookback_length = ngrams.lookback_length
+        self.global_ids = ngrams.global_ids
+        self.local_ids = ngrams.local_ids
+
+        if reverse:
+            self.order = ngrams.reverse_order
+            self.key_starts = ngrams.reverse_key_starts
+            self.cumulative_weights = ngrams.reverse_cumulative_weights
+            start_weights, start_keys = ngrams.reverse_start_weights, ngrams.reverse_start_keys
+        else:
+            self.order = None
+            self.key_starts = ngrams.forward_key_starts
+            self.cumulative_weights = ngrams.forward_cumulative_weights
+            start_weights, start_keys = ngrams.forward_start_weights, ngrams.forward_start_keys
+
+        self.key_count = len(self.key_starts) - 1
+        self.lookbacks = CompiledLookbacks(self)
+        self.line_starts = CompiledLineStarts(self, start_weights, start_keys)
+
+
+    def __len__(self):
+        return self.key_count
+
+
+    def __iter__(self):
+        for i in range(self.key_count):
+            yield self.decode_key(i)
+
+
+    def __contains__(self, lookback):
+        return self.find(lookback) >= 0
+
+
+    def __getitem__(self, lookback):
+        i = self.find(lookback)
+        if i < 0:
+            raise KeyError(lookback)
+        return CompiledFollows(self, self.key_starts[i], self.key_starts[i + 1])
+
+
+    def estimate_size(self):
+        size = (self.ngrams.estimate_shared_size() // 2 + self.key_starts.nbytes + self.cumulative_weights.nbytes
+            + self.line_starts.cumulative_weights.nbytes + self.line_starts.key_indices.nbytes)
+        if self.reverse:
+            size += self.order.nbytes
+        return size
+
+
+    def gram_index(self, position):
+        if self.order is None:
+            return position
+        return self.order[position]
+
+
+    def key_ids(self, position):
+        start = self.gram_index(position) * self.ngrams.stride
+        if self.reverse:
+            return self.ngrams.grams[start + 1:start + self.ngrams.stride].tolist()[::-1]
+        return self.ngrams.grams[start:start + self.lookback_length].tolist()
+
+
+    def follow_id(self, gram):
+        start = gram * self.ngrams.stride
+        if self.reverse:
+            return self.ngrams.grams[start]
+        return self.ngrams.grams[start + self.lookback_length]
+
+
+    def decode_follow(self, position):
+        return self.global_ids[self.follow_id(self.gram_index(position))]
+
+
+    def decode_key(self, i):
+        return tuple(self.global_ids[local_id] for local_id in self.key_ids(self.key_starts[i]))
+
+
+    def lookbacks_with_prefix(self, prefix):
+        ids = self.to_local_ids(prefix)
+        if ids is None:
+            return ()
+
+        start = self.search(ids, upper=False)
+        end = self.search(ids, upper=True)
+        return [self.decode_key(i) for i in range(start, end)]
+
+
+    def sample_lookback(self, rand):
+        return self.lookbacks[rand.rand_index(len(self.lookbacks))]
+
+
+    def find(self, lookback):
+        if len(lookback) != self.lookback_length:
+            return -1
+
+        ids = self.to_local_ids(lookback)
+        if ids is None:
+            return -1
+
+        i = self.search(ids, upper=False)
+        if i < self.key_count and self.key_ids(self.key_starts[i]) == ids:
+            return i
+        return -1
+
+
+    def to_local_ids(self, token_ids):
+        ids = []
+        for token_id in token_ids:
+            local_id = self.local_ids.get(token_id, None)
+            if local_id is None:
+                return None
+            ids.append(local_id)
+        return ids
+
+
+    def search(self, ids, upper):
+        low = 0
+        high = self.key_count
+        while low < high:
+            mid = (low + high) // 2
+            key = self.key_ids(self.key_starts[mid])[:len(ids)]
+            if key < ids or (upper and key == ids):
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+
+class CompiledTransitionStore:
+
+    MAGIC = 0x52445350
+    VERSION = 5
+    HEADER = struct.Struct("=IHHQqQQQQ")
+    ALIGNMENT = 8
+
+    def __init__(self, dir_path, vocabulary):
+        self.dir_path = dir_path
+        self.vocabulary = vocabulary
+
+
+    def get_path(self, speaker_name):
+        return os.path.join(self.dir_path, speaker_name + config.COMPILED_EXTENSION)
+
+
+    def is_fresh(self, speaker_name, signature):
+        if not signature:
+            return False
+
+        try:
+            with open(self.get_path(speaker_name), "rb") as compiled_file:
+                header = compiled_file.read(CompiledTransitionStore.HEADER.size)
+        except OSError:
+            return False
+
+        return self.matches(header, signature)
+
+
+    def matches(self, buffer, signature):
+        if len(buffer) < CompiledTransitionStore.HEADER.size:
+            return False
+
+        magic, version, lookback_length, source_size, source_mtime = CompiledTransitionStore.HEADER.unpack_from(buffer, 0)[:5]
+        return (magic == CompiledTransitionStore.MAGIC and version == CompiledTransitionStore.VERSION
+            and lookback_length == config.LOOKBACK_LENGTH and (source_size, source_mtime) == tuple(signature))
+
+
+    def compile_in_parallel(self, source_dir, speaker_names, pool):
+        try:
+            futures = [pool.submit(compile_speaker, source_dir, self.dir_path, speaker_name) for speaker_name in speaker_names]
+
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except OSError:
+                    results.append(False)
+        except BrokenProcessPool:
+            return None
+        return results
+
+
+    def load(self, speaker_name, signature, reverse=False):
+        ngrams = self.load_ngrams(speaker_name, signature)
+        if not ngrams:
+            return None
+        return CompiledTransitions(ngrams, reverse)
+
+
+    def load_both(self, speaker_name, signature):
+        ngrams = self.load_ngrams(speaker_name, signature)
+        if not ngrams:
+            return None
+        return CompiledTransitions(ngrams, False), CompiledTransitions(ngrams, True)
+
+
+    def load_ngrams(self, speaker_name, signature):
+        if not signature:
+            return None
+
+        try:
+            with open(self.get_path(speaker_name), "rb") as compiled_file:
+                mapped = mmap.mmap(compiled_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        if not self.matches(mapped, signature):
+            return None
+
+        (magic, version, lookback_length, source_size, source_mtime, vocabulary_count, vocabulary_offset,
+            vocabulary_length, ngram_offset) = CompiledTransitionStore.HEADER.unpack_from(mapped, 0)
+
+        global_ids = []
+        if vocabulary_count:
+            tokens = mapped[vocabulary_offset:vocabulary_offset + vocabulary_length].decode("utf8").split("\n")
+            global_ids = self.vocabulary.intern_all(tokens)
+        local_ids = {global_id : i for i, global_id in enumerate(global_ids)}
+
+        try:
+            return CompiledNGrams(mapped, ngram_offset, lookback_length, global_ids, local_ids)
+        except (struct.error, TypeError, ValueError):
+            return None
+
+
+    def save(self, speaker_name, signature, forward_transitions, reverse_transitions):
+        path = self.get_path(speaker_name)
+        temp_path = None
+
+        try:
+            os.makedirs(self.dir_path, exist_ok=True)
+            temp_descriptor, temp_path = tempfile.mkstemp(dir=self.dir_path, prefix=speaker_name, suffix=".tmp")
+            with os.fdopen(temp_descriptor, "wb") as compiled_file:
+                self.write(compiled_file, signature, forward_transitions, reverse_transitions)
+            os.replace(temp_path, path)
+        except OSError:
+            if temp_path:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            return False
+
+        return True
+
+
+    def write(self, compiled_file, signature, forward_transitions, reverse_transitions):
+        global_ids = self.collect_token_ids(forward_transitions)
+        local_ids = {global_id : i for i, global_id in enumerate(global_ids)}
+        vocabulary = "\n".join(self.vocabulary.decode(global_ids)).encode("utf8")
+
+        vocabulary_offset = CompiledTransitionStore.HEADER.size
+        ngram_offset = self.align(vocabulary_offset + len(vocabulary))
+        ngram_section = self.encode_ngrams(forward_transitions, reverse_transitions, local_ids)
+
+        compiled_file.write(CompiledTransitionStore.HEADER.pack(CompiledTransitionStore.MAGIC,
+            CompiledTransitionStore.VERSION, config.LOOKBACK_LENGTH, signature[0], signature[1], len(global_ids),
+            vocabulary_offset, len(vocabulary), ngram_offset))
+        compiled_file.write(vocabulary)
+        compiled_file.write(bytes(ngram_offset - vocabulary_offset - len(vocabulary)))
+        compiled_file.write(ngram_section)
+
+
+    def collect_token_ids(self, transitions):
+        token_ids = set()
+        for lookback, follows in transitions.items():
+            token_ids.update(lookback)
+            token_ids.update(follows.counts())
+        return sorted(token_ids)
+
+
+    def encode_ngrams(self, forward_transitions, reverse_transitions, local_ids):
+        lookback_length = forward_transitions.lookback_length
+        weighted_grams = sorted((tuple(local_ids[token_id] for token_id in lookback) + (local_ids[follow],), weight)
+            for lookback, follows in forward_transitions.items() for follow, weight in follows.counts().items())
+
+        grams = array("I")
+        for gram, weight in weighted_grams:
+            grams.extend(gram)
+
+        forward_keys = [gram[:lookback_length] for gram, weight in weighted_grams]
+        forward_key_starts, forward_key_indices = self.index_keys(forward_keys)
+        forward_cumulative_weights = self.accumulate_weights([weight for gram, weight in weighted_grams], forward_key_starts)
+        reverse_order = array("I", sorted(range(len(weighted_grams)), key=lambda i: weighted_grams[i][0][::-1]))
+        reverse_keys = [weighted_grams[i][0][:0:-1] for i in reverse_order]
+        reverse_key_starts, reverse_key_indices = self.index_keys(reverse_keys)
+        reverse_cumulative_weights = self.accumulate_weights([weighted_grams[i][1] for i in reverse_order], reverse_key_starts)
+
+        forward_start_weights, forward_start_keys = self.encode_line_starts(forward_transitions, forward_key_indices, local_ids)
+        reverse_start_weights, reverse_start_keys = self.encode_line_starts(reverse_transitions, reverse_key_indices, local_ids)
+
+        header = CompiledNGrams.SECTION_HEADER.pack(len(weighted_grams), len(forward_key_starts) - 1,
+            len(reverse_key_starts) - 1, len(forward_start_keys), len(reverse_start_keys))
+        return b"".join(section.tobytes() if isinstance(section, array) else section for section in [header,
+            forward_start_weights, reverse_start_weights, grams, forward_cumulative_weights, forward_key_starts,
+            reverse_order, reverse_cumulative_weights, reverse_key_starts, forward_start_keys, reverse_start_keys])
+
+
+    def index_keys(self, keys):
+        key_starts = array("I")
+        key_indices = {}
+        for position, key in enumerate(keys):
+            if not key in key_indices:
+                key_indices[key] = len(key_starts)
+                key_starts.append(position)
+        key_starts.append(len(keys))
+        return key_starts, key_indices
+
+
+    def accumulate_weights(self, weights, key_starts):
+        cumulative_weights = array("I")
+        for start, end in zip(key_starts, key_starts[1:]):
+            total = 0
+            for weight in weights[start:end]:
+                total += weight
+                cumulative_weights.append(total)
+        return cumulative_weights
+
+
+    def encode_line_starts(self, transitions, key_indices, local_ids):
+        start_weights = array("Q")
+        start_keys = array("I")
+        for lookback, weight in transitions.line_starts.counts().items():
+            start_weights.append(weight + (start_weights[-1] if start_weights else 0))
+            start_keys.append(key_indices[tuple(local_ids[token_id] for token_id in lookback)])
+        return start_weights, start_keys
+
+
+    @staticmethod
+    def align(offset):
+        return -(-offset // CompiledTransitionStore.ALIGNMENT) * CompiledTransitionStore.ALIGNMENT
+
+
+def compile_speaker(source_dir, compiled_dir, speaker_name):
+    vocabulary = Vocabulary()
+    source_retriever = SourceRetriever(source_dir)
+    transition_builder = TransitionBuilder(vocabulary)
+    store = CompiledTransitionStore(compiled_dir, vocabulary)
+
+    signature = source_retriever.get_signature(speaker_name)
+    if store.is_fresh(speaker_name, signature):
+        return True
+
+    source = source_retriever.retrieve(speaker_name)
+    if not signature or not source:
+        return False
+
+    return store.save(speaker_name, signature, *transition_builder.build_both(source, config.LOOKBACK_LENGTH))
+
+
+if __name__ == "__main__":
+
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument("source_dir")
+    argparser.add_argument("--processes", type=int, default=config.BUILD_PROCESSES)
+    args = argparser.parse_args()
+
+    compiled_dir = os.path.join(args.source_dir, config.COMPILED_DIR_NAME)
+    speaker_names = SourceRetriever(args.source_dir).list_speakers()
+
+    with ProcessPoolExecutor(max_workers=max(args.processes, 1)) as pool:
+        CompiledTransitionStore(compiled_dir, Vocabulary()).compile_in_parallel(args.source_dir, speaker_names, pool)
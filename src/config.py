@@ -2,14 +2,54 @@ BOT_NAME = "Pasadóir"
 BOT_NICK = "pasadoir"
 
 LOOKBACK_LENGTH = 2
-CACHE_CAPACITY = 12
+UNSEEDED_FROM_LINE_STARTS = False
+CACHE_BUDGET_BYTES = 1024 * 1024 * 1024
 CACHE_MIN_LOOKBACKS = 5000
+MAX_MERGED_SPEAKERS = 5
+BUILD_PROCESSES = 4
+MERGE_EQUAL_WEIGHT = False
+FOLLOW_LIST_MAX_EXTRA = 8 # Follows totalling at most twice their distinct count plus this are kept as plain tuples
+POPULARITY_FILENAME = "popularity.lst"
+POPULARITY_MAX_ENTRIES = 1000
+POPULARITY_SAVE_SECONDS = 300
+WARMUP_ENTRIES = 50
+QUOTE_RESERVOIR_SIZE = 0 # Set above 0 to keep this many pre-generated quotes for each popular request
+QUOTE_RESERVOIR_ENTRIES = 20
+QUOTE_RESERVOIR_REFILL_SECONDS = 5
+LATENCY_WINDOW = 1000
+PERF_LISTED_ENTRY_COUNT = 5
+TRACE_BUCKETS = [0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30]
+CHANNEL_SEPARATOR = ","
+SSL_PORT_PREFIX = "+"
+METRICS_PORT = 0 # Set above 0 to serve Prometheus metrics over HTTP on this port
+METRICS_INTERFACE = "127.0.0.1"
+PROFILE_DIR_NAME = ".profiles"
+PROFILE_EXTENSION = ".prof"
+PROFILE_REQUEST_EXTENSION = ".txt"
+PROFILE_EVERY = 0 # Set above 0 to profile every nth request
+PROFILE_THRESHOLD_SECONDS = 0 # Set above 0 to profile requests taking at least this long
+PROFILE_MIN_THRESHOLD_SECONDS = 0.5
+PROFILE_MAX_DUMPS = 100
 
 SOURCE_EXTENSION = ".src"
+SOURCE_MMAP = True
+SOURCE_TAIL_CHECK_BYTES = 64 # Bytes before a tailed file's offset that must be unchanged for it to count as appended to
+SOURCE_ARCHIVE_FILENAME = "sources.pack"
+SPEAKER_MANIFEST_FILENAME = "speakers.lst"
+SPEAKER_STATS_FILENAME = "stats.lst"
+SPEAKER_STATS_UPDATE_SECONDS = 5
+SPEAKER_STATS_UPDATE_BATCH = 20
 MERGE_INFO_FILENAME = "merge.lst"
 SOURCE_INFO_FILENAME = "source.info"
 SOURCE_INFO_KEY_DATE = "date"
 SOURCE_INFO_KEY_CHANNELS = "channels"
+COMPILED_DIR_NAME = ".compiled"
+COMPILED_EXTENSION = ".tbl"
+
+WORKER_THREADS = 4
+REQUEST_TIMEOUT_SECONDS = 30
+MAX_PENDING_REQUESTS = 32
+TAIL_INTERVAL_SECONDS = 0 # Set above 0 to pick up lines appended to source files while running
 
 GENERATE_REQUEST_TRIGGER = "!"
 GENERATE_FORWARD_REQUEST_TRIGGER = "^"
@@ -17,3 +57,4 @@ GENERATE_REVERSE_REQUEST_TRIGGER = "~"
 META_REQUEST_TRIGGER = "@"
 
 STATS_SPEAKER_ALIAS_COUNT = 3 # This must be greater than or equal to 2
+REFRESH_LISTED_NAME_COUNT = 5
@@ -0,0 +1,164 @@
+import sys
+from bisect import bisect_right
+from itertools import accumulate
+
+import config
+
+
+def merge_counts(follows, other):
+    counts = follows.counts()
+    for token, count in other.counts().items():
+        counts[token] = counts.get(token, 0) + count
+    return FollowDistribution.from_counts(counts)
+
+
+class SingleFollow:
+
+    __slots__ = ("token", "total")
+
+    def __init__(self, token, total):
+        self.token = token
+        self.total = total
+
+
+    def __len__(self):
+        return self.total
+
+
+    def __eq__(self, other):
+        if not hasattr(other, "counts"):
+            return NotImplemented
+        return self.counts() == other.counts()
+
+
+    def __repr__(self):
+        return "SingleFollow({0})".format(self.counts())
+
+
+    def counts(self):
+        return {self.token : self.total}
+
+
+    def estimate_size(self):
+        return sys.getsizeof(self)
+
+
+    def merged(self, other):
+        return merge_counts(self, other)
+
+
+    def sample(self, rand):
+        return self.token
+
+
+# Every occurrence of every follow, in a plain tuple; for follows seen only a few times each,
+#  this is smaller than keeping their weights apart
+class FollowList(tuple):
+
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if not hasattr(other, "counts"):
+            return NotImplemented
+        return self.counts() == other.counts()
+
+
+    def __ne__(self, other):
+        if not hasattr(other, "counts"):
+            return NotImplemented
+        return self.counts() != other.counts()
+
+
+    def __repr__(self):
+        return "FollowList({0})".format(self.counts())
+
+
+    def counts(self):
+        counts = {}
+        for token in self:
+            counts[token] = counts.get(token, 0) + 1
+        return counts
+
+
+    def estimate_size(self):
+        return sys.getsizeof(self)
+
+
+    def merged(self, other):
+        return merge_counts(self, other)
+
+
+    def sample(self, rand):
+        return self[rand.rand_index(len(self))]
+
+
+class FollowDistribution:
+
+    # weights is the weight shared by every token when they are all equal, otherwise the running totals of their weights,
+    #  so that a weighted draw is a single bisection
+    __slots__ = ("tokens", "weights")
+
+    def __init__(self, counts):
+        self.tokens = tuple(counts.keys())
+        weights = tuple(counts.values())
+        if len(set(weights)) > 1:
+            self.weights = tuple(accumulate(weights))
+        else:
+            self.weights = weights[0] if weights else 0
+
+
+    @classmethod
+    def from_counts(cls, counts):
+        if len(counts) == 1:
+            token, total = next(iter(counts.items()))
+            return SingleFollow(token, total)
+        if sum(counts.values()) <= 2 * len(counts) + config.FOLLOW_LIST_MAX_EXTRA:
+            return FollowList(token for token, count in counts.items() for i in range(count))
+        return cls(counts)
+
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        return cls.from_counts(counts)
+
+
+    def __len__(self):
+        if isinstance(self.weights, tuple):
+            return self.weights[-1]
+        return self.weights * len(self.tokens)
+
+
+    def __eq__(self, other):
+        if not hasattr(other, "counts"):
+            return NotImplemented
+        return self.counts() == other.counts()
+
+
+    def __repr__(self):
+        return "FollowDistribution({0})".format(self.counts())
+
+
+    def counts(self):
+        if not isinstance(self.weights, tuple):
+            return dict.fromkeys(self.tokens, self.weights)
+        return dict(zip(self.tokens, (weight - previous for weight, previous in zip(self.weights, (0,) + self.weights))))
+
+
+    def estimate_size(self):
+        size = sys.getsizeof(self) + sys.getsizeof(self.tokens)
+        if isinstance(self.weights, tuple):
+            size += sys.getsizeof(self.weights)
+        return size
+
+
+    def merged(self, other):
+        return merge_counts(self, other)
+
+
+    def sample(self, rand):
+        if not isinstance(self.weights, tuple):
+            return self.tokens[rand.rand_index(len(self.tokens))]
+        return self.tokens[bisect_right(self.weights, rand.rand_index(self.weights[-1]))]
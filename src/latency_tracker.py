@@ -0,0 +1,25 @@
+import math
+from collections import deque
+
+import config
+
+
+class LatencyTracker:
+
+    def __init__(self, window=config.LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+
+
+    def __len__(self):
+        return len(self.samples)
+
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+
+    def percentile(self, percent):
+        samples = sorted(self.samples)
+        if not samples:
+            return None
+        return samples[max(0, math.ceil(len(samples) * percent / 100) - 1)]
@@ -0,0 +1,118 @@
+from collections.abc import Mapping
+
+
+class MergedDistribution:
+
+    def __init__(self, parts, equal_weight=False):
+        self.parts = [part for part in parts if part]
+        self.equal_weight = equal_weight
+        self.total = sum(len(part) for part in self.parts)
+
+
+    def __len__(self):
+        return self.total
+
+
+    def __eq__(self, other):
+        if not hasattr(other, "counts"):
+            return NotImplemented
+        return self.counts() == other.counts()
+
+
+    def __repr__(self):
+        return "MergedDistribution({0})".format(self.counts())
+
+
+    def counts(self):
+        counts = {}
+        for part in self.parts:
+            for token, count in part.counts().items():
+                counts[token] = counts.get(token, 0) + count
+        return counts
+
+
+    def sample(self, rand):
+        if self.equal_weight:
+            return self.parts[rand.rand_index(len(self.parts))].sample(rand)
+
+        draw = rand.rand_index(self.total)
+        for part in self.parts:
+            if draw < len(part):
+                return part.sample(rand)
+            draw -= len(part)
+
+
+class MergedTransitions(Mapping):
+
+    def __init__(self, components, equal_weight=False):
+        self.components = components
+        self.equal_weight = equal_weight
+        self.lookback_length = components[0].lookback_length
+        self.line_starts = MergedDistribution([component.line_starts for component in components], equal_weight)
+        self.lookback_total = sum(len(component) for component in components)
+        self.distinct_count = None
+
+
+    def __len__(self):
+        if self.distinct_count is None:
+            self.distinct_count = len(self.components[0]) + sum(1 for i, component in enumerate(self.components[1:], 1)
+                for lookback in component if not self.in_earlier_component(lookback, i))
+        return self.distinct_count
+
+
+    def __bool__(self):
+        return self.lookback_total > 0
+
+
+    def __iter__(self):
+        for i, component in enumerate(self.components):
+            for lookback in component:
+                if not self.in_earlier_component(lookback, i):
+                    yield lookback
+
+
+    def __contains__(self, lookback):
+        return any(lookback in component for component in self.components)
+
+
+    def __getitem__(self, lookback):
+        parts = [part for part in (component.get(lookback) for component in self.components) if part is not None]
+        if not parts:
+            raise KeyError(lookback)
+        if len(parts) == 1:
+            return parts[0]
+        return MergedDistribution(parts, self.equal_weight)
+
+
+    def estimate_size(self):
+        return sum(component.estimate_size() for component in self.components)
+
+
+    def lookbacks_with_prefix(self, prefix):
+        candidates = {}
+        for component in self.components:
+            candidates.update(dict.fromkeys(component.lookbacks_with_prefix(prefix)))
+        return list(candidates)
+
+
+    # Unless blending equally, a lookback found in several components is only accepted from the first of them,
+    #  so that every distinct lookback is equally likely
+    def sample_lookback(self, rand):
+        if self.equal_weight:
+            components = [component for component in self.components if component]
+            return components[rand.rand_index(len(components))].sample_lookback(rand)
+
+        while True:
+            draw = rand.rand_index(self.lookback_total)
+            for i, component in enumerate(self.components):
+                if draw < len(component):
+                    break
+                draw -= len(component)
+
+            lookback = component.sample_lookback(rand)
+            if not self.in_earlier_component(lookback, i):
+                return lookback
+
+
+    def in_earlier_component(self, lookback, i):
+        return any(lookback in component for component in self.components[:i])
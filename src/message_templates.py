@@ -1,4 +1,13 @@
 META_HELP = "{0} is a bot that impersonates people based on their history."
 META_REFRESH = "Refreshed."
+META_REFRESH_CHANGES = "Refreshed. Changed: {0}. Added: {1}. Removed: {2}."
+META_PERF = "Cache: {0} entries using {1} of {2}. Hits: {3} forward, {4} reverse. Misses: {5} forward, {6} reverse. Evictions: {7}. Builds: {8}. Quotes: {9}. Largest entries: {10}."
+META_PERF_ENTRY = "{0} {1} ({2} lookbacks, {3})"
+META_PERF_LATENCY = "p50 {0:.1f} ms, p99 {1:.1f} ms ({2} samples)"
+META_PROFILE_OFF = "Profiling is off."
+META_PROFILE_ON = "Profiling {0}, keeping the latest {1}."
+META_PROFILE_EVERY = "1 in every {0} requests"
+META_PROFILE_OVER = "any request taking {0} seconds or more"
+META_PROFILE_USAGE = "Usage: profile [every <n> | over <seconds> | off]"
 META_STATS_GENERAL = "I have material from {0} speakers. I have been running since {1}. My source material was generated on {2}. Its source channels were {3}."
-META_STATS_SPEAKER = "The speaker {0} {1}has {2} transitions."
+META_STATS_SPEAKER = "The speaker {0} {1}has {2} transitions ({3} lines, {4} words, {5} distinct words, {6} distinct lookbacks)."
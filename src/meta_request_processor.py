@@ -4,12 +4,23 @@ import message_templates
 class MetaRequestProcessor:
 
     STATS_DATE_FORMAT = "%Y-%m-%d at %H.%M.%S"
-
-    def __init__(self, transition_retriever, speaker_collection, rand, start_time):
+    REFRESH_ALL = "all"
+    PROFILE_OFF = "off"
+    PROFILE_EVERY = "every"
+    PROFILE_OVER = "over"
+    NONE_LABEL = "none"
+    DIRECTION_LABELS = {False : "forward", True : "reverse"}
+
+    def __init__(self, transition_retriever, speaker_collection, rand, start_time, generation_latency=None, profiler=None,
+            speaker_statistics=None, quote_reservoir=None):
         self.transition_retriever = transition_retriever
         self.speaker_collection = speaker_collection
         self.rand = rand
         self.start_time = start_time
+        self.generation_latency = generation_latency
+        self.profiler = profiler
+        self.speaker_statistics = speaker_statistics
+        self.quote_reservoir = quote_reservoir
 
 
     def process(self, request, options={}):
@@ -28,9 +39,99 @@ class MetaRequestProcessor:
 
 
     def process_refresh(self, arguments):
-        self.speaker_collection.refresh()
-        self.transition_retriever.refresh()
-        return message_templates.META_REFRESH
+        added_names, removed_names = self.speaker_collection.refresh()
+        if arguments and arguments[0] == MetaRequestProcessor.REFRESH_ALL:
+            self.transition_retriever.clear()
+            if self.speaker_statistics:
+                self.speaker_statistics.invalidate(added_names, removed_names)
+            if self.quote_reservoir:
+                self.quote_reservoir.clear()
+            return message_templates.META_REFRESH
+
+        changed_names = [name for name in self.transition_retriever.refresh() if not name in removed_names]
+        if self.speaker_statistics:
+            self.speaker_statistics.invalidate(changed_names + added_names, removed_names)
+        if self.quote_reservoir:
+            self.quote_reservoir.invalidate(changed_names + removed_names)
+        if not changed_names and not added_names and not removed_names:
+            return message_templates.META_REFRESH
+
+        return message_templates.META_REFRESH_CHANGES.format(self.format_names_for_refresh(changed_names),
+            self.format_names_for_refresh(added_names), self.format_names_for_refresh(removed_names))
+
+
+    def format_names_for_refresh(self, names):
+        if not names:
+            return MetaRequestProcessor.NONE_LABEL
+
+        listed_names = ", ".join(names[:config.REFRESH_LISTED_NAME_COUNT])
+        if len(names) > config.REFRESH_LISTED_NAME_COUNT:
+            return "{0} (+{1})".format(listed_names, len(names) - config.REFRESH_LISTED_NAME_COUNT)
+        return listed_names
+
+
+    def process_perf(self, arguments):
+        retriever = self.transition_retriever
+        entries = retriever.list_cache_entries()
+        entries.sort(key=lambda entry: -entry[3])
+        largest_entries = ", ".join(message_templates.META_PERF_ENTRY.format(speaker_name,
+            MetaRequestProcessor.DIRECTION_LABELS[reverse], lookback_count, self.format_size_for_perf(size))
+            for speaker_name, reverse, lookback_count, size in entries[:config.PERF_LISTED_ENTRY_COUNT])
+
+        return message_templates.META_PERF.format(len(entries), self.format_size_for_perf(retriever.cache_size),
+            self.format_size_for_perf(retriever.budget), retriever.hit_counts[False], retriever.hit_counts[True],
+            retriever.miss_counts[False], retriever.miss_counts[True], retriever.eviction_count,
+            self.format_latency_for_perf(retriever.build_latency), self.format_latency_for_perf(self.generation_latency),
+            largest_entries or MetaRequestProcessor.NONE_LABEL)
+
+
+    def format_size_for_perf(self, size):
+        return "{0:.1f} MiB".format(size / (1024 * 1024))
+
+
+    def format_latency_for_perf(self, latency):
+        if not latency:
+            return MetaRequestProcessor.NONE_LABEL
+        return message_templates.META_PERF_LATENCY.format(latency.percentile(50) * 1000, latency.percentile(99) * 1000, len(latency))
+
+
+    def process_profile(self, arguments):
+        if not self.profiler:
+            return ""
+
+        if arguments:
+            every, threshold = self.parse_profile_arguments(arguments)
+            if every is None:
+                return message_templates.META_PROFILE_USAGE
+            self.profiler.configure(every, threshold)
+
+        if not self.profiler.is_enabled():
+            return message_templates.META_PROFILE_OFF
+
+        modes = []
+        if self.profiler.every > 0:
+            modes.append(message_templates.META_PROFILE_EVERY.format(self.profiler.every))
+        if self.profiler.threshold > 0:
+            modes.append(message_templates.META_PROFILE_OVER.format(self.profiler.threshold))
+        return message_templates.META_PROFILE_ON.format(" and ".join(modes), self.profiler.max_dumps)
+
+
+    def parse_profile_arguments(self, arguments):
+        if arguments[0] == MetaRequestProcessor.PROFILE_OFF:
+            return 0, 0
+
+        if len(arguments) != 2:
+            return None, None
+
+        try:
+            if arguments[0] == MetaRequestProcessor.PROFILE_EVERY:
+                return max(int(arguments[1]), 0), self.profiler.threshold
+            if arguments[0] == MetaRequestProcessor.PROFILE_OVER:
+                return self.profiler.every, max(float(arguments[1]), 0)
+        except ValueError:
+            pass
+
+        return None, None
 
 
     def process_stats(self, arguments):
@@ -63,10 +164,11 @@ class MetaRequestProcessor:
 
         speaker_aliases = self.format_speaker_aliases_for_stats(list(speaker.aliases), speaker_nick, speaker.name)
 
-        transitions = self.transition_retriever.get_by_name(speaker.name)
-        transition_count = self.count_transitions(transitions)
+        stats = self.speaker_statistics.get(speaker.name) if self.speaker_statistics else None
+        if not stats:
+            return ""
 
-        return message_templates.META_STATS_SPEAKER.format(speaker.name, speaker_aliases, transition_count)
+        return message_templates.META_STATS_SPEAKER.format(speaker.name, speaker_aliases, *stats)
 
 
     #TODO: fix this up and put elsewhere
@@ -102,12 +204,10 @@ class MetaRequestProcessor:
         return outer_template.format(inner_template.format(", ".join(speaker_aliases), additional_alias_count))
 
 
-    def count_transitions(self, transitions):
-        return sum(len(follows) for follows in transitions.values())
-
-
     COMMANDS = {
         "help" : process_help,
+        "perf" : process_perf,
+        "profile" : process_profile,
         "refresh" : process_refresh,
         "stats" : process_stats,
     }
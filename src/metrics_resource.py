@@ -0,0 +1,16 @@
+from twisted.web import resource
+
+
+class MetricsResource(resource.Resource):
+
+    isLeaf = True
+    CONTENT_TYPE = b"text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, tracer):
+        super().__init__()
+        self.tracer = tracer
+
+
+    def render_GET(self, request):
+        request.setHeader(b"Content-Type", MetricsResource.CONTENT_TYPE)
+        return self.tracer.render().encode("utf8")
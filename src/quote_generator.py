@@ -1,9 +1,13 @@
+import config
+
+
 class QuoteGenerator:
 
     MAX_QUOTE_TOKENS = 100
 
-    def __init__(self, rand):
+    def __init__(self, rand, from_line_starts=config.UNSEEDED_FROM_LINE_STARTS):
         self.rand = rand
+        self.from_line_starts = from_line_starts
 
 
     def generate(self, transitions, initial=None):
@@ -21,14 +25,12 @@ class QuoteGenerator:
         if not given_initial:
             return self.generate_initial_lookback(transitions)
 
-        lookback_length = len(next(iter(transitions.keys())))
-
-        if len(given_initial) >= lookback_length:
+        if len(given_initial) >= transitions.lookback_length:
             if given_initial in transitions:
                 return given_initial
             return None
 
-        initial_candidates = self.list_initial_lookback_candidates(transitions, given_initial)
+        initial_candidates = transitions.lookbacks_with_prefix(given_initial)
         if initial_candidates:
             return initial_candidates[self.rand.rand_index(len(initial_candidates))]
 
@@ -36,24 +38,19 @@ class QuoteGenerator:
 
 
     def generate_initial_lookback(self, transitions):
-        transition_keys = list(transitions.keys())
-        return transition_keys[self.rand.rand_index(len(transition_keys))]
-
-
-    def list_initial_lookback_candidates(self, transitions, partial_lookback):
-        return [lookback for lookback in transitions.keys() if self.matches_partially(partial_lookback, lookback)]
-
-
-    def matches_partially(self, partial, tup):
-        return all(partial[i] == tup[i] for i in range(0, len(partial)))
+        if self.from_line_starts and transitions.line_starts:
+            return transitions.line_starts.sample(self.rand)
+        return transitions.sample_lookback(self.rand)
 
 
     def generate_from_initial(self, transitions, lookback):
         quote = list(lookback)
         i = len(quote)
 
-        while i < QuoteGenerator.MAX_QUOTE_TOKENS and lookback in transitions:
+        while i < QuoteGenerator.MAX_QUOTE_TOKENS:
             follow = self.get_follow(transitions, lookback)
+            if follow is None:
+                break
             quote.append(follow)
             lookback = self.update_lookback(lookback, follow)
             i += 1
@@ -62,8 +59,10 @@ class QuoteGenerator:
 
 
     def get_follow(self, transitions, lookback):
-        lookback_transitions = transitions[lookback]
-        return lookback_transitions[self.rand.rand_index(len(lookback_transitions))]
+        follows = transitions.get(lookback)
+        if follows is None:
+            return None
+        return follows.sample(self.rand)
 
 
     def update_lookback(self, lookback, follow):
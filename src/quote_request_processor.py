@@ -1,5 +1,9 @@
+import time
 from enum import Enum
 
+from latency_tracker import LatencyTracker
+from request_tracer import RequestTracer
+
 
 class QuoteDirection(Enum):
     BIDI = 0
@@ -36,9 +40,13 @@ class QuoteRequestProcessor:
 
     SEED_HIGHLIGHT_TEMPLATE = QuoteStyle.BOLD + QuoteStyle.COLOUR + QuoteColour.YELLOW + "{0}" + QuoteStyle.CLEAR
 
-    def __init__(self, transition_retriever, generator):
+    def __init__(self, transition_retriever, generator, vocabulary, tracer=None, reservoir=None):
         self.transition_retriever = transition_retriever
         self.generator = generator
+        self.vocabulary = vocabulary
+        self.reservoir = reservoir
+        self.generation_latency = LatencyTracker()
+        self.tracer = tracer if tracer else RequestTracer()
 
 
     def process(self, request, options={}):
@@ -47,45 +55,70 @@ class QuoteRequestProcessor:
         if direction == QuoteDirection.BIDI and not seed_tokens:
             direction = QuoteDirection.FORWARD
 
+        if direction == QuoteDirection.FORWARD and not seed_tokens and self.reservoir:
+            response = self.process_from_reservoir(speaker_nicks)
+            if response:
+                return response
+
         speaker_names = []
         forward_transitions = {}
         reverse_transitions = {}
 
-        if direction == QuoteDirection.FORWARD or direction == QuoteDirection.BIDI:
+        if direction == QuoteDirection.FORWARD:
             speaker_names, forward_transitions = self.transition_retriever.get(speaker_nicks, reverse=False)
-        if direction == QuoteDirection.REVERSE or direction == QuoteDirection.BIDI:
+        elif direction == QuoteDirection.REVERSE:
             speaker_names, reverse_transitions = self.transition_retriever.get(speaker_nicks, reverse=True)
+        else:
+            speaker_names, forward_transitions, reverse_transitions = self.transition_retriever.get_both(speaker_nicks)
 
         if not forward_transitions and not reverse_transitions:
             return ""
 
+        seed_token_ids = self.vocabulary.encode(seed_tokens)
+
         seed_start_index = 0
         seed_end_index = 0
+        start_time = time.perf_counter()
 
         if direction == QuoteDirection.FORWARD:
-            quote = self.generator.generate(forward_transitions, seed_tokens)
+            quote = self.generator.generate(forward_transitions, seed_token_ids)
             seed_start_index = 0
             seed_end_index = len(seed_tokens)
 
         elif direction == QuoteDirection.REVERSE:
-            reversed_seed_tokens = tuple(list(reversed(seed_tokens)))
-            quote = self.generator.generate(reverse_transitions, reversed_seed_tokens)
+            reversed_seed_token_ids = tuple(reversed(seed_token_ids))
+            quote = self.generator.generate(reverse_transitions, reversed_seed_token_ids)
             quote = list(reversed(quote))
             seed_start_index = len(quote) - len(seed_tokens)
             seed_end_index = len(quote)
 
         elif direction == QuoteDirection.BIDI:
-            quote_forward = self.generator.generate(forward_transitions, seed_tokens)
-            reversed_seed_tokens = tuple(list(reversed(seed_tokens)))
-            quote_reverse = self.generator.generate(reverse_transitions, reversed_seed_tokens)
+            quote_forward = self.generator.generate(forward_transitions, seed_token_ids)
+            reversed_seed_token_ids = tuple(reversed(seed_token_ids))
+            quote_reverse = self.generator.generate(reverse_transitions, reversed_seed_token_ids)
             quote_reverse = list(reversed(quote_reverse))
             word_cutoff_index, seed_start_index, seed_end_index = self.get_bidi_quote_indices(quote_forward, quote_reverse, seed_tokens)
             quote = quote_reverse + quote_forward[word_cutoff_index:]
 
+        generation_time = time.perf_counter() - start_time
+        self.generation_latency.record(generation_time)
+        self.tracer.observe("generate", generation_time)
         if not quote:
             return ""
 
-        return self.format_quote(quote, speaker_names, seed_tokens, seed_start_index, seed_end_index)
+        with self.tracer.stage("format"):
+            return self.format_quote(quote, speaker_names, seed_tokens, seed_start_index, seed_end_index)
+
+
+    def process_from_reservoir(self, speaker_nicks):
+        speaker_names = self.transition_retriever.resolve_speaker_names(speaker_nicks)
+        quote = self.reservoir.pop(speaker_names) if speaker_names else None
+        if not quote:
+            return None
+
+        self.transition_retriever.record_popularity(speaker_names, False)
+        with self.tracer.stage("format"):
+            return self.format_quote(quote, speaker_names, (), 0, 0)
 
 
     def split_request(self, request):
@@ -107,6 +140,7 @@ class QuoteRequestProcessor:
 
 
     def format_quote(self, quote, speaker_names, seed_tokens, seed_start_index, seed_end_index):
+        quote = self.vocabulary.decode(quote)
         highlighted_quote = quote
         if seed_start_index != seed_end_index:
             before_seed = quote[0:seed_start_index]
@@ -0,0 +1,70 @@
+import threading
+from collections import deque
+
+import config
+
+
+class QuoteReservoir:
+
+    def __init__(self, transition_retriever, generator, popularity, size=config.QUOTE_RESERVOIR_SIZE,
+            entry_count=config.QUOTE_RESERVOIR_ENTRIES):
+        self.transition_retriever = transition_retriever
+        self.generator = generator
+        self.popularity = popularity
+        self.size = size
+        self.entry_count = entry_count
+        self.quotes = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+
+
+    def pop(self, speaker_names):
+        with self.lock:
+            quotes = self.quotes.get(tuple(speaker_names), None)
+            if not quotes:
+                return None
+            return quotes.popleft()
+
+
+    def clear(self):
+        with self.lock:
+            self.quotes = {}
+            self.generation += 1
+
+
+    def invalidate(self, speaker_names):
+        speaker_names = set(speaker_names)
+        with self.lock:
+            self.quotes = {key : quotes for key, quotes in self.quotes.items() if speaker_names.isdisjoint(key)}
+            self.generation += 1
+
+
+    def refill(self):
+        entries = [speaker_names for speaker_names, reverse in self.popularity.most_popular(self.entry_count) if not reverse]
+
+        filled = []
+        for speaker_names in entries:
+            key = tuple(speaker_names)
+            with self.lock:
+                generation = self.generation
+                missing = self.size - len(self.quotes.get(key, ()))
+            if missing <= 0:
+                continue
+
+            transitions = self.get_transitions(speaker_names)
+            quotes = [quote for quote in (self.generator.generate(transitions) for i in range(missing)) if quote]
+            if not quotes:
+                continue
+
+            with self.lock:
+                if self.generation == generation:
+                    self.quotes.setdefault(key, deque(maxlen=self.size)).extend(quotes)
+                    filled.append(speaker_names)
+
+        return filled
+
+
+    def get_transitions(self, speaker_names):
+        if len(speaker_names) == 1:
+            return self.transition_retriever.get_by_name(speaker_names[0], False)
+        return self.transition_retriever.get_merged(speaker_names, False)
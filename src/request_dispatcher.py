@@ -0,0 +1,59 @@
+from twisted.internet import defer, task, threads
+from twisted.python import log
+from twisted.python.threadpool import ThreadPool
+
+import config
+
+
+class RequestDispatcher:
+
+    def __init__(self, reactor, pool_size=config.WORKER_THREADS, timeout=config.REQUEST_TIMEOUT_SECONDS,
+            max_pending=config.MAX_PENDING_REQUESTS):
+        self.reactor = reactor
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pending = 0
+        self.pool = ThreadPool(minthreads=0, maxthreads=pool_size, name="pasadoir-requests")
+        self.reactor.callWhenRunning(self.pool.start)
+        self.reactor.addSystemEventTrigger("during", "shutdown", self.pool.stop)
+
+
+    def dispatch(self, handler, request):
+        if self.pending >= self.max_pending:
+            return defer.succeed("")
+
+        self.pending += 1
+        deferred = threads.deferToThreadPool(self.reactor, self.pool, self.run, handler, request)
+        if self.timeout:
+            deferred.addTimeout(self.timeout, self.reactor)
+        return deferred
+
+
+    def run(self, handler, request):
+        try:
+            return handler.handle(request)
+        finally:
+            self.reactor.callFromThread(self.finish)
+
+
+    def finish(self):
+        self.pending -= 1
+
+
+    def repeat(self, interval, function, idle_only=False):
+        call = task.LoopingCall(self.run_when_idle if idle_only else self.run_in_background, function)
+        call.clock = self.reactor
+        call.start(interval, now=False)
+        return call
+
+
+    def run_when_idle(self, function):
+        if self.pending > 0:
+            return None
+        return self.run_in_background(function)
+
+
+    def run_in_background(self, function):
+        deferred = threads.deferToThreadPool(self.reactor, self.pool, function)
+        deferred.addErrback(log.err)
+        return deferred
@@ -1,28 +1,56 @@
 import datetime
+import multiprocessing
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import config
 from cached_transition_retriever import CachedTransitionRetriever
+from compiled_transition_store import CompiledTransitionStore
 from meta_request_processor import MetaRequestProcessor
 from quote_generator import QuoteGenerator
+from quote_reservoir import QuoteReservoir
 from rand import Rand
 from quote_request_processor import QuoteDirection, QuoteRequestProcessor
+from request_popularity import RequestPopularity
+from request_profiler import RequestProfiler
+from request_tracer import RequestTracer
 from source_retriever import SourceRetriever
 from speaker_collection import SpeakerCollection
+from speaker_statistics import SpeakerStatistics
 from transition_builder import TransitionBuilder
+from vocabulary import Vocabulary
 
 class RequestHandler:
 
-    def __init__(self, source_dir):
+    def __init__(self, source_dir, tracer=None):
+        self.tracer = tracer if tracer else RequestTracer()
+        self.profiler = RequestProfiler(os.path.join(source_dir, config.PROFILE_DIR_NAME))
+        vocabulary = Vocabulary()
         source_retriever = SourceRetriever(source_dir)
-        transition_builder = TransitionBuilder()
-        speaker_collection = SpeakerCollection(source_retriever)
-        transition_retriever = CachedTransitionRetriever(source_retriever, transition_builder, speaker_collection)
+        transition_builder = TransitionBuilder(vocabulary)
+        self.speaker_collection = SpeakerCollection(source_retriever)
+        transition_store = CompiledTransitionStore(os.path.join(source_dir, config.COMPILED_DIR_NAME), vocabulary)
+        build_pool = None
+        if config.BUILD_PROCESSES > 1:
+            build_pool = ProcessPoolExecutor(max_workers=config.BUILD_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+        self.popularity = RequestPopularity(os.path.join(source_dir, config.COMPILED_DIR_NAME, config.POPULARITY_FILENAME))
+        self.transition_retriever = CachedTransitionRetriever(source_retriever, transition_builder, self.speaker_collection,
+            transition_store=transition_store, build_pool=build_pool, save_pool=ThreadPoolExecutor(max_workers=1),
+            popularity=self.popularity, tracer=self.tracer)
+        self.speaker_statistics = SpeakerStatistics(source_retriever,
+            os.path.join(source_dir, config.COMPILED_DIR_NAME, config.SPEAKER_STATS_FILENAME))
         rand = Rand()
         quote_generator = QuoteGenerator(rand)
-        self.quote_processor = QuoteRequestProcessor(transition_retriever, quote_generator)
+        self.quote_reservoir = None
+        if config.QUOTE_RESERVOIR_SIZE > 0:
+            self.quote_reservoir = QuoteReservoir(self.transition_retriever, quote_generator, self.popularity)
+        self.quote_processor = QuoteRequestProcessor(self.transition_retriever, quote_generator, vocabulary, tracer=self.tracer,
+            reservoir=self.quote_reservoir)
         start_time = datetime.datetime.fromtimestamp(time.time())
-        self.meta_processor = MetaRequestProcessor(transition_retriever, speaker_collection, rand, start_time)
+        self.meta_processor = MetaRequestProcessor(self.transition_retriever, self.speaker_collection, rand, start_time,
+            generation_latency=self.quote_processor.generation_latency, profiler=self.profiler,
+            speaker_statistics=self.speaker_statistics, quote_reservoir=self.quote_reservoir)
         self.processors = {
             config.GENERATE_REQUEST_TRIGGER : (self.quote_processor, {"direction" : QuoteDirection.BIDI}),
             config.GENERATE_FORWARD_REQUEST_TRIGGER : (self.quote_processor, {"direction" : QuoteDirection.FORWARD}),
@@ -31,15 +59,41 @@ class RequestHandler:
         }
 
 
-    def handle(self, request):
+    def tail(self):
+        return self.transition_retriever.tail()
+
+
+    def warm(self):
+        return self.transition_retriever.warm(self.popularity.most_popular(config.WARMUP_ENTRIES))
+
+
+    def refill_quotes(self):
+        if not self.quote_reservoir:
+            return []
+        return self.quote_reservoir.refill()
+
+
+    def update_statistics(self):
+        return self.speaker_statistics.update()
+
+
+    def save_popularity(self):
+        return self.popularity.save()
+
+
+    def accepts(self, request):
         request = request.strip()
-        if not request:
-            return ""
+        return request[:1] in self.processors and len(request) > 1
 
-        if request[0] in self.processors:
-            processor, options = self.processors[request[0]]
+
+    def handle(self, request):
+        with self.tracer.stage("dispatch"):
+            request = request.strip()
+            processor, options = self.processors.get(request[:1], (None, None))
             request = request[1:]
-            if request:
-                return processor.process(request, options)
 
-        return ""
+        if not processor or not request:
+            return ""
+
+        with self.tracer.stage("request"):
+            return self.profiler.run(processor.process, request, options)
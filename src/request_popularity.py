@@ -0,0 +1,73 @@
+import os
+import tempfile
+import threading
+
+import config
+
+
+class RequestPopularity:
+
+    FORWARD = "f"
+    REVERSE = "r"
+
+    def __init__(self, path, max_entries=config.POPULARITY_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.counts = self.load()
+
+
+    def load(self):
+        counts = {}
+
+        try:
+            with open(self.path, encoding="utf8") as popularity_file:
+                lines = popularity_file.readlines()
+        except OSError:
+            return counts
+
+        for line in lines:
+            tokens = line.split()
+            if len(tokens) == 3 and tokens[1] in (RequestPopularity.FORWARD, RequestPopularity.REVERSE) and tokens[2].isdigit():
+                counts[(tokens[0], tokens[1] == RequestPopularity.REVERSE)] = int(tokens[2])
+
+        return counts
+
+
+    def save(self):
+        lines = ["{0} {1} {2}\n".format(key, RequestPopularity.REVERSE if reverse else RequestPopularity.FORWARD, count)
+            for (key, reverse), count in self.most_popular_keys(self.max_entries)]
+
+        temp_path = None
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            with os.fdopen(temp_descriptor, "w", encoding="utf8") as popularity_file:
+                popularity_file.writelines(lines)
+            os.replace(temp_path, self.path)
+        except OSError:
+            if temp_path:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            return False
+
+        return True
+
+
+    def record(self, speaker_names, reverse):
+        key = (":".join(speaker_names), reverse)
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+
+    def most_popular(self, count):
+        return [(key.split(":"), reverse) for (key, reverse), key_count in self.most_popular_keys(count)]
+
+
+    def most_popular_keys(self, count):
+        with self.lock:
+            items = list(self.counts.items())
+        items.sort(key=lambda item: (-item[1], item[0]))
+        return items[:count]
@@ -0,0 +1,81 @@
+import cProfile
+import itertools
+import os
+import threading
+import time
+
+import config
+
+
+class RequestProfiler:
+
+    def __init__(self, dir_path, every=config.PROFILE_EVERY, threshold=config.PROFILE_THRESHOLD_SECONDS,
+            max_dumps=config.PROFILE_MAX_DUMPS):
+        self.dir_path = dir_path
+        self.max_dumps = max_dumps
+        self.configure(every, threshold)
+        self.request_count = 0
+        self.dump_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+
+    def is_enabled(self):
+        return self.every > 0 or self.threshold > 0
+
+
+    def configure(self, every=0, threshold=0):
+        self.every = every
+        self.threshold = max(threshold, config.PROFILE_MIN_THRESHOLD_SECONDS) if threshold > 0 else 0
+
+
+    def run(self, function, request, *args):
+        if not self.is_enabled():
+            return function(request, *args)
+
+        with self.lock:
+            self.request_count += 1
+            sampled = self.every > 0 and self.request_count % self.every == 0
+
+        if not sampled and self.threshold <= 0:
+            return function(request, *args)
+
+        profiler = cProfile.Profile()
+        start_time = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            return function(request, *args)
+
+        try:
+            return function(request, *args)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start_time
+            if sampled or elapsed >= self.threshold:
+                self.dump(profiler, request, elapsed)
+
+
+    def dump(self, profiler, request, elapsed):
+        name = "{0}-{1}".format(time.strftime("%Y%m%d-%H%M%S"), next(self.dump_ids))
+        try:
+            os.makedirs(self.dir_path, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.dir_path, name + config.PROFILE_EXTENSION))
+            with open(os.path.join(self.dir_path, name + config.PROFILE_REQUEST_EXTENSION), "w", encoding="utf8") as request_file:
+                request_file.write("{0}\n{1:.6f}\n".format(request, elapsed))
+            self.remove_oldest_dumps()
+        except OSError:
+            return None
+        return name
+
+
+    def remove_oldest_dumps(self):
+        with self.lock:
+            paths = [os.path.join(self.dir_path, file_name) for file_name in os.listdir(self.dir_path)
+                if file_name.endswith(config.PROFILE_EXTENSION)]
+            paths.sort(key=lambda path: (os.stat(path).st_mtime_ns, path))
+            for path in paths[:max(len(paths) - self.max_dumps, 0)]:
+                for dump_path in [path, path[:-len(config.PROFILE_EXTENSION)] + config.PROFILE_REQUEST_EXTENSION]:
+                    try:
+                        os.remove(dump_path)
+                    except OSError:
+                        pass
@@ -0,0 +1,66 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+import config
+
+
+class StageHistogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+    def observe(self, seconds):
+        self.bucket_counts[bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class RequestTracer:
+
+    METRIC_NAME = "pasadoir_stage_seconds"
+    METRIC_HELP = "Time spent in each stage of handling a request."
+
+    def __init__(self, buckets=config.TRACE_BUCKETS):
+        self.buckets = sorted(buckets)
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            if not stage in self.histograms:
+                self.histograms[stage] = StageHistogram(self.buckets)
+            self.histograms[stage].observe(seconds)
+
+
+    @contextmanager
+    def stage(self, stage):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start_time)
+
+
+    def render(self):
+        lines = [
+            "# HELP {0} {1}".format(RequestTracer.METRIC_NAME, RequestTracer.METRIC_HELP),
+            "# TYPE {0} histogram".format(RequestTracer.METRIC_NAME),
+        ]
+
+        with self.lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative_count = 0
+                for bucket, bucket_count in zip(self.buckets + ["+Inf"], histogram.bucket_counts):
+                    cumulative_count += bucket_count
+                    lines.append('{0}_bucket{{stage="{1}",le="{2}"}} {3}'.format(RequestTracer.METRIC_NAME, stage, bucket, cumulative_count))
+                lines.append('{0}_sum{{stage="{1}"}} {2}'.format(RequestTracer.METRIC_NAME, stage, histogram.total))
+                lines.append('{0}_count{{stage="{1}"}} {2}'.format(RequestTracer.METRIC_NAME, stage, histogram.count))
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,131 @@
+import argparse
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+
+import config
+from source_lines import ArchiveLines
+
+
+class SourceArchive:
+
+    MAGIC = 0x4b415053
+    VERSION = 1
+    HEADER = struct.Struct("=IHHQQ")
+    INDEX_SEPARATOR = "\t"
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = None
+        self.mapped = None
+        self.entries = {}
+
+
+    def is_open(self):
+        return self.mapped is not None
+
+
+    def refresh(self):
+        try:
+            stat = os.stat(self.path)
+            signature = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            signature = None
+
+        if signature != self.signature:
+            self.signature = signature
+            self.mapped, self.entries = self.load() if signature else (None, {})
+
+        return self.is_open()
+
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as archive_file:
+                mapped = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None, {}
+
+        if len(mapped) < SourceArchive.HEADER.size:
+            return None, {}
+
+        magic, version, reserved, index_offset, index_length = SourceArchive.HEADER.unpack_from(mapped, 0)
+        if magic != SourceArchive.MAGIC or version != SourceArchive.VERSION or index_offset + index_length > len(mapped):
+            return None, {}
+
+        entries = {}
+        for line in mapped[index_offset:index_offset + index_length].decode("utf8").splitlines():
+            fields = line.split(SourceArchive.INDEX_SEPARATOR)
+            if len(fields) == 4:
+                entries[fields[0]] = tuple(int(field) for field in fields[1:])
+        return mapped, entries
+
+
+    def list_filenames(self):
+        return list(self.entries)
+
+
+    def get_signature(self, filename):
+        entry = self.entries.get(filename, None)
+        if not entry:
+            return None
+        offset, length, checksum = entry
+        return length, checksum
+
+
+    def retrieve(self, filename):
+        entry = self.entries.get(filename, None)
+        if not entry:
+            return []
+        offset, length, checksum = entry
+        return ArchiveLines(self.mapped, offset, length)
+
+
+def pack_sources(source_dir, archive_path):
+    filenames = sorted(filename for filename in os.listdir(source_dir)
+        if filename.endswith(config.SOURCE_EXTENSION) or filename in (config.MERGE_INFO_FILENAME, config.SOURCE_INFO_FILENAME))
+
+    temp_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(archive_path)), suffix=".tmp")
+    try:
+        with os.fdopen(temp_descriptor, "wb") as archive_file:
+            archive_file.write(bytes(SourceArchive.HEADER.size))
+            index = []
+            for filename in filenames:
+                offset, length, checksum = pack_file(os.path.join(source_dir, filename), archive_file)
+                index.append(SourceArchive.INDEX_SEPARATOR.join([filename, str(offset), str(length), str(checksum)]) + "\n")
+
+            index = "".join(index).encode("utf8")
+            index_offset = archive_file.tell()
+            archive_file.write(index)
+            archive_file.seek(0)
+            archive_file.write(SourceArchive.HEADER.pack(SourceArchive.MAGIC, SourceArchive.VERSION, 0, index_offset, len(index)))
+        os.replace(temp_path, archive_path)
+    except OSError:
+        os.remove(temp_path)
+        raise
+
+    return len(filenames)
+
+
+def pack_file(path, archive_file):
+    offset = archive_file.tell()
+    length = 0
+    checksum = 0
+    with open(path, "rb") as source_file:
+        for chunk in iter(lambda: source_file.read(SourceArchive.CHUNK_SIZE), b""):
+            archive_file.write(chunk)
+            length += len(chunk)
+            checksum = zlib.crc32(chunk, checksum)
+    return offset, length, checksum
+
+
+if __name__ == "__main__":
+
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument("source_dir")
+    args = argparser.parse_args()
+
+    pack_sources(args.source_dir, os.path.join(args.source_dir, config.SOURCE_ARCHIVE_FILENAME))
@@ -0,0 +1,68 @@
+import io
+import mmap
+import os
+
+import config
+
+
+class SourceLines():
+
+    def __init__(self, path, size, use_mmap=config.SOURCE_MMAP):
+        self.path = path
+        self.size = size
+        self.use_mmap = use_mmap
+
+
+    def __bool__(self):
+        return self.size > 0
+
+
+    def __iter__(self):
+        with open(self.path, "rb") as source_file:
+            size = min(self.size, os.fstat(source_file.fileno()).st_size)
+            if size <= 0:
+                return
+
+            if self.use_mmap:
+                with mmap.mmap(source_file.fileno(), size, access=mmap.ACCESS_READ) as buffer:
+                    yield from self.decode_lines(iter(buffer.readline, b""))
+            else:
+                yield from self.decode_lines(self.read_lines(source_file, size))
+
+
+    def read_lines(self, source_file, size):
+        while size > 0:
+            line = source_file.readline(size)
+            if not line:
+                return
+            size -= len(line)
+            yield line
+
+
+    def decode_lines(self, raw_lines):
+        for raw_line in raw_lines:
+            line = raw_line.decode("utf8", errors="ignore")
+            if "\r" in line:
+                yield from io.StringIO(line, newline=None)
+            else:
+                yield line
+
+
+class ArchiveLines(SourceLines):
+
+    def __init__(self, mapped, offset, size):
+        self.mapped = mapped
+        self.offset = offset
+        self.size = size
+
+
+    def __iter__(self):
+        return self.decode_lines(self.read_lines(self.mapped, self.offset, self.offset + self.size))
+
+
+    def read_lines(self, mapped, start, end):
+        while start < end:
+            line_end = mapped.find(b"\n", start, end)
+            line_end = end if line_end < 0 else line_end + 1
+            yield mapped[start:line_end]
+            start = line_end
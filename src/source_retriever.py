@@ -1,19 +1,82 @@
 import config
 
+import io
 import os
+import tempfile
+from collections import namedtuple
+
+from source_archive import SourceArchive
+from source_lines import SourceLines
+
+SourceOffset = namedtuple("SourceOffset", ["offset", "inode", "tail"])
 
 class SourceRetriever():
 
     def __init__(self, dir_path):
         self.dir_path = dir_path
+        self.offsets = {}
+        self.archive = SourceArchive(os.path.join(dir_path, config.SOURCE_ARCHIVE_FILENAME))
+        self.refresh()
+
+
+    def refresh(self):
+        return self.archive.refresh()
 
 
     def list_speakers(self):
+        filenames = self.archive.list_filenames() if self.archive.is_open() else self.list_source_filenames()
         return [filename[:len(filename)-len(config.SOURCE_EXTENSION)]
-            for filename in os.listdir(self.dir_path)
+            for filename in filenames
             if filename.endswith(config.SOURCE_EXTENSION)]
 
 
+    def list_source_filenames(self):
+        try:
+            directory_signature = str(os.stat(self.dir_path).st_mtime_ns)
+        except OSError:
+            return []
+
+        filenames = self.read_manifest(directory_signature)
+        if filenames is None:
+            filenames = [filename for filename in os.listdir(self.dir_path) if filename.endswith(config.SOURCE_EXTENSION)]
+            self.write_manifest(directory_signature, filenames)
+        return filenames
+
+
+    def get_manifest_path(self):
+        return os.path.join(self.dir_path, config.COMPILED_DIR_NAME, config.SPEAKER_MANIFEST_FILENAME)
+
+
+    def read_manifest(self, directory_signature):
+        try:
+            with open(self.get_manifest_path(), encoding="utf8") as manifest_file:
+                if manifest_file.readline().rstrip("\n") != directory_signature:
+                    return None
+                return manifest_file.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+
+    def write_manifest(self, directory_signature, filenames):
+        manifest_path = self.get_manifest_path()
+        temp_path = None
+        try:
+            os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+            temp_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(manifest_path), suffix=".tmp")
+            with os.fdopen(temp_descriptor, "w", encoding="utf8") as manifest_file:
+                manifest_file.write(directory_signature + "\n")
+                manifest_file.writelines(filename + "\n" for filename in filenames)
+            os.replace(temp_path, manifest_path)
+        except OSError:
+            if temp_path:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            return False
+        return True
+
+
     def get_merge_info(self):
         return self.get_meta_info(config.MERGE_INFO_FILENAME)
 
@@ -23,6 +86,9 @@ class SourceRetriever():
 
 
     def get_meta_info(self, filename):
+        if self.archive.is_open():
+            return list(self.archive.retrieve(filename))
+
         filepath = os.path.join(self.dir_path, filename)
         if not os.path.isfile(filepath):
             return []
@@ -31,11 +97,95 @@ class SourceRetriever():
             return f.readlines()
 
 
-    def retrieve(self, speaker_name):
-        speaker_filename = os.path.join(self.dir_path, speaker_name + config.SOURCE_EXTENSION)
+    def get_source_path(self, speaker_name):
+        return os.path.join(self.dir_path, speaker_name + config.SOURCE_EXTENSION)
+
+
+    def get_signature(self, speaker_name):
+        if self.archive.is_open():
+            return self.archive.get_signature(speaker_name + config.SOURCE_EXTENSION)
+
+        try:
+            stat = os.stat(self.get_source_path(speaker_name))
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+
+    def retrieve(self, speaker_name, record_offset=True):
+        if self.archive.is_open():
+            return self.archive.retrieve(speaker_name + config.SOURCE_EXTENSION)
+
+        speaker_filename = self.get_source_path(speaker_name)
 
         if not os.path.isfile(speaker_filename):
             return []
 
-        with open(speaker_filename, encoding="utf8", errors="ignore") as speaker_file:
-            return speaker_file.readlines()
+        try:
+            with open(speaker_filename, "rb") as speaker_file:
+                source_offset = self.find_line_end(speaker_file, os.fstat(speaker_file.fileno()).st_size)
+        except OSError:
+            return []
+
+        if record_offset:
+            self.offsets[speaker_name] = source_offset
+        return SourceLines(speaker_filename, source_offset.offset)
+
+
+    def set_offset(self, speaker_name, size):
+        try:
+            with open(self.get_source_path(speaker_name), "rb") as speaker_file:
+                self.offsets[speaker_name] = self.find_line_end(speaker_file, size)
+        except OSError:
+            self.offsets.pop(speaker_name, None)
+
+
+    # Only complete lines are read, so the offset is kept just past the last line end before size
+    def find_line_end(self, speaker_file, size):
+        end = size
+        while end > 0:
+            start = max(0, end - io.DEFAULT_BUFFER_SIZE)
+            speaker_file.seek(start)
+            line_end = speaker_file.read(end - start).rfind(b"\n")
+            if line_end >= 0:
+                end = start + line_end + 1
+                break
+            end = start
+
+        return SourceOffset(end, os.fstat(speaker_file.fileno()).st_ino, self.read_tail(speaker_file, end))
+
+
+    def read_tail(self, speaker_file, offset):
+        start = max(0, offset - config.SOURCE_TAIL_CHECK_BYTES)
+        speaker_file.seek(start)
+        return speaker_file.read(offset - start)
+
+
+    def retrieve_appended(self, speaker_name):
+        source_offset = self.offsets.get(speaker_name, None)
+        if source_offset is None or self.archive.is_open():
+            return []
+
+        offset = source_offset.offset
+        try:
+            with open(self.get_source_path(speaker_name), "rb") as speaker_file:
+                stat = os.fstat(speaker_file.fileno())
+                if (stat.st_ino != source_offset.inode or stat.st_size < offset
+                        or self.read_tail(speaker_file, offset) != source_offset.tail):
+                    self.offsets.pop(speaker_name, None)
+                    return None
+                speaker_file.seek(offset)
+                appended = speaker_file.read(stat.st_size - offset)
+        except OSError:
+            self.offsets.pop(speaker_name, None)
+            return None
+
+        complete_length = appended.rfind(b"\n") + 1
+        if complete_length:
+            tail = (source_offset.tail + appended[:complete_length])[-config.SOURCE_TAIL_CHECK_BYTES:]
+            self.offsets[speaker_name] = SourceOffset(offset + complete_length, source_offset.inode, tail)
+        return self.decode_lines(appended[:complete_length])
+
+
+    def decode_lines(self, content):
+        return io.StringIO(content.decode("utf8", errors="ignore"), newline=None).readlines()
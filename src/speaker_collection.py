@@ -17,13 +17,20 @@ class SpeakerCollection:
 
     def __init__(self, source_retriever):
         self.source_retriever = source_retriever
+        self.speaker_names = []
         self.refresh()
 
 
     def refresh(self):
+        previous_names = set(self.speaker_names)
+        self.source_retriever.refresh()
         self.source_info = self.build_source_info()
         self.speaker_names, self.speakers = self.build_speaker_map()
 
+        added_names = sorted(set(self.speaker_names) - previous_names)
+        removed_names = sorted(previous_names - set(self.speaker_names))
+        return added_names, removed_names
+
 
     def build_source_info(self):
         info = {}
@@ -65,9 +72,10 @@ class SpeakerCollection:
         for name in speaker_names:
             speakers[name] = Speaker(name)
 
+        name_set = set(speaker_names)
         merge_info_lines = self.source_retriever.get_merge_info()
         for line in merge_info_lines:
-            self.add_alias_line(speakers, speaker_names, line)
+            self.add_alias_line(speakers, name_set, line)
 
         return speaker_names, speakers
 
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+import config
+
+SpeakerStats = namedtuple("SpeakerStats", ["transitions", "lines", "tokens", "vocabulary", "lookbacks"])
+
+class SpeakerStatistics:
+
+    FIELD_SEPARATOR = "\t"
+
+    def __init__(self, source_retriever, path, lookback_length=config.LOOKBACK_LENGTH):
+        self.source_retriever = source_retriever
+        self.path = path
+        self.lookback_length = lookback_length
+        self.entries = {}
+        self.pending_names = {}
+        self.changed = False
+        self.lock = threading.Lock()
+        self.load()
+
+
+    def get(self, speaker_name):
+        signature = self.source_retriever.get_signature(speaker_name)
+        if not signature:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(speaker_name, None)
+        if entry and entry[0] == tuple(signature):
+            return entry[1]
+        return self.recount(speaker_name, signature)
+
+
+    def recount(self, speaker_name, signature):
+        stats = self.count(self.source_retriever.retrieve(speaker_name, record_offset=False))
+        with self.lock:
+            self.entries[speaker_name] = (tuple(signature), stats)
+            self.changed = True
+        return stats
+
+
+    def invalidate(self, changed_names, removed_names):
+        with self.lock:
+            self.pending_names.update(dict.fromkeys(changed_names))
+            for speaker_name in removed_names:
+                self.pending_names.pop(speaker_name, None)
+                if self.entries.pop(speaker_name, None):
+                    self.changed = True
+
+
+    def update(self, max_count=config.SPEAKER_STATS_UPDATE_BATCH):
+        with self.lock:
+            speaker_names = list(self.pending_names)[:max_count]
+
+        updated_names = []
+        for speaker_name in speaker_names:
+            signature = self.source_retriever.get_signature(speaker_name)
+            with self.lock:
+                entry = self.entries.get(speaker_name, None)
+            if signature and not (entry and entry[0] == tuple(signature)):
+                self.recount(speaker_name, signature)
+                updated_names.append(speaker_name)
+            with self.lock:
+                self.pending_names.pop(speaker_name, None)
+
+        if self.changed:
+            self.save()
+        return updated_names
+
+
+    def count(self, lines):
+        line_count = 0
+        token_count = 0
+        transition_count = 0
+        word_ids = {}
+        lookbacks = set()
+
+        for line in lines:
+            words = line.split()
+            if len(words) < self.lookback_length:
+                continue
+
+            line_count += 1
+            token_count += len(words)
+            transition_count += len(words) - self.lookback_length
+            ids = [word_ids.setdefault(word, len(word_ids)) for word in words]
+            for i in range(len(ids) - self.lookback_length):
+                lookbacks.add(tuple(ids[i:i + self.lookback_length]))
+
+        return SpeakerStats(transition_count, line_count, token_count, len(word_ids), len(lookbacks))
+
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf8") as stats_file:
+                lines = stats_file.readlines()
+        except (OSError, UnicodeDecodeError):
+            return
+
+        for line in lines:
+            fields = line.rstrip("\n").split(SpeakerStatistics.FIELD_SEPARATOR)
+            if len(fields) != 3 + len(SpeakerStats._fields):
+                continue
+            try:
+                numbers = [int(field) for field in fields[1:]]
+            except ValueError:
+                continue
+            self.entries[fields[0]] = (tuple(numbers[:2]), SpeakerStats(*numbers[2:]))
+
+
+    def save(self):
+        with self.lock:
+            self.changed = False
+            lines = [SpeakerStatistics.FIELD_SEPARATOR.join([speaker_name] + [str(number) for number in signature + stats]) + "\n"
+                for speaker_name, (signature, stats) in self.entries.items()]
+
+        temp_path = None
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            with os.fdopen(temp_descriptor, "w", encoding="utf8") as stats_file:
+                stats_file.writelines(lines)
+            os.replace(temp_path, self.path)
+        except OSError:
+            if temp_path:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            with self.lock:
+                self.changed = True
+            return False
+        return True
@@ -1,30 +1,66 @@
+from follow_distribution import FollowDistribution
+from transition_table import TransitionTable
+
+
 class TransitionBuilder:
 
+    def __init__(self, vocabulary):
+        self.vocabulary = vocabulary
+
+
     def build(self, lines, lookback_length, reverse=False):
-        transitions = {}
+        transitions = TransitionTable(lookback_length)
+        line_start_counts = {}
 
         for line in lines:
             words = line.split()
             if len(words) >= lookback_length:
+                words = self.vocabulary.intern_all(words)
                 if reverse:
                     words = list(reversed(words))
-                self.process_source_line(words, transitions, lookback_length)
+                self.add_line(words, transitions, line_start_counts, lookback_length)
 
-        return transitions
+        return self.finish(transitions, line_start_counts)
 
 
-    def process_source_line(self, words, transitions, lookback_length):
-        lookback = tuple(words[:lookback_length])
+    def build_both(self, lines, lookback_length):
+        forward_transitions = TransitionTable(lookback_length)
+        reverse_transitions = TransitionTable(lookback_length)
+        forward_line_start_counts = {}
+        reverse_line_start_counts = {}
+
+        for line in lines:
+            words = line.split()
+            if len(words) >= lookback_length:
+                words = self.vocabulary.intern_all(words)
+                self.add_line(words, forward_transitions, forward_line_start_counts, lookback_length)
+                self.add_line(list(reversed(words)), reverse_transitions, reverse_line_start_counts, lookback_length)
+
+        return self.finish(forward_transitions, forward_line_start_counts), self.finish(reverse_transitions, reverse_line_start_counts)
+
 
-        for i, follow in enumerate(words[lookback_length:]):
-            if not lookback in transitions:
-                transitions[lookback] = []
-            transitions[lookback].append(follow)
+    def add_line(self, words, transitions, line_start_counts, lookback_length):
+        self.process_source_line(words, transitions, lookback_length)
+        if len(words) > lookback_length:
+            line_start = tuple(words[:lookback_length])
+            line_start_counts[line_start] = line_start_counts.get(line_start, 0) + 1
 
-            lookback = self.update_lookback(lookback, follow, lookback_length)
 
+    def finish(self, transitions, line_start_counts):
+        for lookback, follow_counts in transitions.items():
+            transitions[lookback] = FollowDistribution.from_counts(follow_counts)
+        transitions.line_starts = FollowDistribution.from_counts(line_start_counts)
+        transitions.index()
 
-    def update_lookback(self, lookback, follow, lookback_length):
-        next_lookback = list(lookback[1:lookback_length])
-        next_lookback.append(follow)
-        return tuple(next_lookback)
+        return transitions
+
+
+    def process_source_line(self, words, transitions, lookback_length):
+        for i in range(len(words) - lookback_length):
+            lookback = tuple(words[i:i + lookback_length])
+            follow = words[i + lookback_length]
+            follow_counts = transitions.get(lookback, None)
+            if follow_counts is None:
+                transitions[lookback] = {follow : 1}
+            else:
+                follow_counts[follow] = follow_counts.get(follow, 0) + 1
@@ -0,0 +1,63 @@
+import sys
+
+from follow_distribution import FollowDistribution
+
+
+class TransitionTable(dict):
+
+    DICT_ENTRY_BYTES = 40
+
+    def __init__(self, lookback_length, *args):
+        super().__init__(*args)
+        self.lookback_length = lookback_length
+        self.lookbacks = []
+        self.line_starts = FollowDistribution({})
+        self.prefix_index = {}
+
+
+    def index(self):
+        self.lookbacks = list(self)
+        self.prefix_index = {}
+        for lookback in self.lookbacks:
+            for length in range(1, self.lookback_length):
+                prefix = lookback[:length]
+                if not prefix in self.prefix_index:
+                    self.prefix_index[prefix] = []
+                self.prefix_index[prefix].append(lookback)
+
+
+    def extended(self, additions):
+        transitions = TransitionTable(self.lookback_length, self)
+        new_lookbacks = [lookback for lookback in additions if not lookback in self]
+        for lookback, follows in additions.items():
+            transitions[lookback] = self[lookback].merged(follows) if lookback in self else follows
+        transitions.line_starts = self.line_starts.merged(additions.line_starts)
+
+        transitions.lookbacks = self.lookbacks + new_lookbacks
+        transitions.prefix_index = dict(self.prefix_index)
+        copied_prefixes = set()
+        for lookback in new_lookbacks:
+            for length in range(1, self.lookback_length):
+                prefix = lookback[:length]
+                if not prefix in copied_prefixes:
+                    transitions.prefix_index[prefix] = list(self.prefix_index.get(prefix, ()))
+                    copied_prefixes.add(prefix)
+                transitions.prefix_index[prefix].append(lookback)
+
+        return transitions
+
+
+    def lookbacks_with_prefix(self, prefix):
+        return self.prefix_index.get(tuple(prefix), ())
+
+
+    def sample_lookback(self, rand):
+        return self.lookbacks[rand.rand_index(len(self.lookbacks))]
+
+
+    def estimate_size(self):
+        key_size = sys.getsizeof((0,) * self.lookback_length) + TransitionTable.DICT_ENTRY_BYTES
+        prefix_size = sys.getsizeof((0,)) + sys.getsizeof([]) + TransitionTable.DICT_ENTRY_BYTES
+        index_size = len(self.prefix_index) * prefix_size + sys.getsizeof(self.lookbacks) + len(self) * (self.lookback_length - 1) * 8
+        index_size += self.line_starts.estimate_size()
+        return sum(key_size + follows.estimate_size() for follows in self.values()) + index_size
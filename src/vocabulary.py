@@ -0,0 +1,37 @@
+import threading
+
+
+class Vocabulary:
+
+    def __init__(self):
+        self.token_ids = {}
+        self.tokens = []
+        self.lock = threading.Lock()
+
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+    def intern(self, token):
+        token_id = self.token_ids.get(token, None)
+        if token_id is None:
+            with self.lock:
+                token_id = self.token_ids.get(token, None)
+                if token_id is None:
+                    token_id = len(self.tokens)
+                    self.tokens.append(token)
+                    self.token_ids[token] = token_id
+        return token_id
+
+
+    def intern_all(self, tokens):
+        return [self.intern(token) for token in tokens]
+
+
+    def encode(self, tokens):
+        return tuple(self.token_ids.get(token, None) for token in tokens)
+
+
+    def decode(self, token_ids):
+        return [self.tokens[token_id] for token_id in token_ids]
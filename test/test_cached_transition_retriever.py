@@ -1,7 +1,11 @@
 import unittest
+from concurrent.futures.process import BrokenProcessPool
 from unittest.mock import call, Mock
 
 from cached_transition_retriever import CachedTransitionRetriever
+from compiled_transition_store import compile_speaker
+from follow_distribution import FollowDistribution
+from transition_table import TransitionTable
 
 class TestCachedTransitionRetriever(unittest.TestCase):
 
@@ -11,7 +15,8 @@ class TestCachedTransitionRetriever(unittest.TestCase):
         self.setup_transition_builder()
         self.setup_speaker_collection()
         self.transition_retriever = CachedTransitionRetriever(self.source_retriever, self.transition_builder, self.speaker_collection,
-            capacity=6, min_lookbacks=2)
+            budget=6, min_lookbacks=2, max_merged_speakers=2)
+        self.transition_retriever.estimate_size = Mock(return_value=1)
 
 
     def tearDown(self):
@@ -28,16 +33,26 @@ class TestCachedTransitionRetriever(unittest.TestCase):
         self.asarlai_source = ["bíonn an fhírinne searbh"]
         self.beag_source = ["bailíonn brobh beart"]
         self.folamh_source = []
-        self.saoi_transitions = {("fillean", "an") : ["feall"], ("an", "feall") : ["ar"], ("feall", "ar") : ["an"], ("ar", "an") : ["bhfeallaire"]}
-        self.saoi_transitions_reversed = {("feall", "an") : ["filleann"], ("ar", "feall") : ["an"], ("an", "ar") : ["feall"], ("bhfeallaire", "an") : ["ar"]}
-        self.faidh_transitions = {("is", "leor") : ["nod"], ("leor", "nod") : ["don"], ("nod", "don") : ["eolach"]}
-        self.eolai_transitions = {("bíonn", "blas") : ["ar"], ("blas", "ar") : ["an"], ("ar", "an") : ["mbeagán"]}
-        self.eagnai_transitions = {("bíonn", "gach") : ["tosú"], ("gach", "tosú") : ["lag"]}
-        self.draoi_transitions = {("tús", "maith") : ["leath"], ("maith", "leath") : ["na"], ("leath", "na") : ["hoibre"]}
-        self.cailleach_transitions = {("ní", "bhíonn") : ["treán"], ("bhíonn", "tréan") : ["buan"]}
-        self.asarlai_transitions = {("bíonn", "an") : ["fhírinne"], ("an", "fhírinne") : ["searbh"]}
-        self.beag_transitions = {("bailíonn", "brobh") : ["beart"]}
-        self.eolai_saoi_transitions = {("bíonn", "blas") : ["ar"], ("blas", "ar") : ["an"], ("ar", "an") : ["mbeagán", "bhfeallaire"], ("fillean", "an") : ["feall"], ("an", "feall") : ["ar"], ("feall", "ar") : ["an"]}
+        self.saoi_transitions = self.make_transitions({("fillean", "an") : ["feall"], ("an", "feall") : ["ar"], ("feall", "ar") : ["an"], ("ar", "an") : ["bhfeallaire"]})
+        self.saoi_transitions_reversed = self.make_transitions({("feall", "an") : ["filleann"], ("ar", "feall") : ["an"], ("an", "ar") : ["feall"], ("bhfeallaire", "an") : ["ar"]})
+        self.faidh_transitions = self.make_transitions({("is", "leor") : ["nod"], ("leor", "nod") : ["don"], ("nod", "don") : ["eolach"]})
+        self.eolai_transitions = self.make_transitions({("bíonn", "blas") : ["ar"], ("blas", "ar") : ["an"], ("ar", "an") : ["mbeagán"]})
+        self.eagnai_transitions = self.make_transitions({("bíonn", "gach") : ["tosú"], ("gach", "tosú") : ["lag"]})
+        self.draoi_transitions = self.make_transitions({("tús", "maith") : ["leath"], ("maith", "leath") : ["na"], ("leath", "na") : ["hoibre"]})
+        self.cailleach_transitions = self.make_transitions({("ní", "bhíonn") : ["treán"], ("bhíonn", "tréan") : ["buan"]})
+        self.asarlai_transitions = self.make_transitions({("bíonn", "an") : ["fhírinne"], ("an", "fhírinne") : ["searbh"]})
+        self.beag_transitions = self.make_transitions({("bailíonn", "brobh") : ["beart"]})
+        self.eolai_saoi_transitions = self.make_transitions({("bíonn", "blas") : ["ar"], ("blas", "ar") : ["an"], ("ar", "an") : ["mbeagán", "bhfeallaire"], ("fillean", "an") : ["feall"], ("an", "feall") : ["ar"], ("feall", "ar") : ["an"]})
+
+
+    def make_transitions(self, transitions):
+        table = TransitionTable(2, ((lookback, FollowDistribution.from_tokens(follows)) for lookback, follows in transitions.items()))
+        table.index()
+        return table
+
+
+    def cache_contents(self):
+        return [(key, reverse, item.value) for (key, reverse), item in self.transition_retriever.cache.items()]
 
 
     def setup_source_retriever(self):
@@ -61,10 +76,7 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertIsNone(speaker_names)
         self.assertEqual(transitions, {})
-        self.assertEqual(self.transition_retriever.cache[0], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[1], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[2], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.age_counter, 0)
+        self.assertEqual(self.cache_contents(), [])
         self.speaker_collection.resolve_names.assert_called_once_with(["anaithnid"])
         self.source_retriever.retrieve.assert_not_called()
         self.transition_builder.build.assert_not_called()
@@ -78,10 +90,7 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["folamh"])
         self.assertEqual(transitions, {})
-        self.assertEqual(self.transition_retriever.cache[0], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[1], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[2], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.age_counter, 0)
+        self.assertEqual(self.cache_contents(), [])
         self.speaker_collection.resolve_names.assert_called_once_with(["folamh"])
         self.source_retriever.retrieve.assert_called_once_with("folamh")
         self.transition_builder.build.assert_not_called()
@@ -96,10 +105,7 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["saoi"])
         self.assertEqual(transitions, {})
-        self.assertEqual(self.transition_retriever.cache[0], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[1], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[2], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.age_counter, 0)
+        self.assertEqual(self.cache_contents(), [])
         self.speaker_collection.resolve_names.assert_called_once_with(["saoi"])
         self.source_retriever.retrieve.assert_called_once_with("saoi")
         self.transition_builder.build.assert_called_once_with(self.saoi_source, 2, False)
@@ -114,10 +120,9 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["saoi"])
         self.assertEqual(transitions, self.saoi_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[2], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.age_counter, 1)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+        ])
         self.speaker_collection.resolve_names.assert_called_once_with(["saoi"])
         self.source_retriever.retrieve.assert_called_once_with("saoi")
         self.transition_builder.build.assert_called_once_with(self.saoi_source, 2, False)
@@ -134,10 +139,11 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["eolaí"])
         self.assertEqual(transitions, self.eolai_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (1, "fáidh", self.faidh_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[2], (2, "eolaí", self.eolai_transitions, False))
-        self.assertEqual(self.transition_retriever.age_counter, 3)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+            ("fáidh", False, self.faidh_transitions),
+            ("eolaí", False, self.eolai_transitions),
+        ])
         self.assertEqual(self.source_retriever.retrieve.call_count, 3)
         self.speaker_collection.resolve_names.assert_has_calls([call(["saoi"]), call(["fáidh"]), call(["eolaí"])], any_order=False)
         self.source_retriever.retrieve.assert_has_calls([call("saoi"), call("fáidh"), call("eolaí")], any_order=False)
@@ -154,10 +160,7 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["beag"])
         self.assertEqual(transitions, self.beag_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[1], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[2], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.age_counter, 0)
+        self.assertEqual(self.cache_contents(), [])
         self.speaker_collection.resolve_names.assert_called_once_with(["beag"])
         self.source_retriever.retrieve.assert_called_once_with("beag")
         self.transition_builder.build.assert_called_once_with(self.beag_source, 2, False)
@@ -173,10 +176,9 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["saoi"])
         self.assertEqual(transitions, self.saoi_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (1, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[2], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.age_counter, 2)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+        ])
         self.speaker_collection.resolve_names.assert_has_calls([call(["saoi"]), call(["saoi"])], any_order=False)
         self.source_retriever.retrieve.assert_called_once_with("saoi")
         self.transition_builder.build.assert_called_once_with(self.saoi_source, 2, False)
@@ -197,11 +199,12 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["fáidh"])
         self.assertEqual(transitions, self.faidh_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (6, "fáidh", self.faidh_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[2], (4, "eolaí", self.eolai_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[3], (5, "saoi", self.saoi_transitions_reversed, True))
-        self.assertEqual(self.transition_retriever.age_counter, 7)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+            ("eolaí", False, self.eolai_transitions),
+            ("saoi", True, self.saoi_transitions_reversed),
+            ("fáidh", False, self.faidh_transitions),
+        ])
         self.assertEqual(self.source_retriever.retrieve.call_count, 4)
         self.speaker_collection.resolve_names.assert_has_calls([call(["saoi"]), call(["fáidh"]), call(["eolaí"]), call(["eolaí"]), call(["eolaí"]), call(["saoi"]), call(["fáidh"])], any_order=False)
         self.source_retriever.retrieve.assert_has_calls([call("saoi"), call("fáidh"), call("eolaí")], any_order=False)
@@ -225,13 +228,14 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["eagnaí"])
         self.assertEqual(transitions, self.eagnai_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (3, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (7, "eagnaí", self.eagnai_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[2], (2, "eolaí", self.eolai_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[3], (4, "draoi", self.draoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[4], (5, "cailleach", self.cailleach_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[5], (6, "asarlaí", self.asarlai_transitions, False))
-        self.assertEqual(self.transition_retriever.age_counter, 8)
+        self.assertEqual(self.cache_contents(), [
+            ("eolaí", False, self.eolai_transitions),
+            ("saoi", False, self.saoi_transitions),
+            ("draoi", False, self.draoi_transitions),
+            ("cailleach", False, self.cailleach_transitions),
+            ("asarlaí", False, self.asarlai_transitions),
+            ("eagnaí", False, self.eagnai_transitions),
+        ])
         self.assertEqual(self.source_retriever.retrieve.call_count, 7)
         self.speaker_collection.resolve_names.assert_has_calls([call(["saoi"]), call(["fáidh"]), call(["eolaí"]), call(["saoi"]), call(["draoi"]), call(["cailleach"]), call(["asarlaí"]), call(["eagnaí"])], any_order=False)
         self.source_retriever.retrieve.assert_has_calls([call("saoi"), call("fáidh"), call("eolaí"), call("draoi"), call("cailleach"), call("asarlaí"), call("eagnaí")], any_order=False)
@@ -248,10 +252,9 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["saoi"])
         self.assertEqual(transitions, self.saoi_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[2], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.age_counter, 1)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+        ])
         self.speaker_collection.resolve_names.assert_called_once_with(["saoi0"])
         self.source_retriever.retrieve.assert_called_once_with("saoi")
         self.transition_builder.build.assert_called_once_with(self.saoi_source, 2, False)
@@ -267,15 +270,105 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["saoi"])
         self.assertEqual(transitions, self.saoi_transitions_reversed)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (1, "saoi", self.saoi_transitions_reversed, True))
-        self.assertEqual(self.transition_retriever.cache[2], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.age_counter, 2)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+            ("saoi", True, self.saoi_transitions_reversed),
+        ])
         self.speaker_collection.resolve_names.assert_has_calls([call(["saoi"]), call(["saoi"])], any_order=False)
         self.source_retriever.retrieve.assert_has_calls([call("saoi"), call("saoi")], any_order=False)
         self.transition_builder.build.assert_has_calls([call(self.saoi_source, 2, False), call(self.saoi_source, 2, True)], any_order=False)
 
 
+    def test_get_both_uncached(self):
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build_both.return_value = (self.saoi_transitions, self.saoi_transitions_reversed)
+
+        speaker_names, forward_transitions, reverse_transitions = self.transition_retriever.get_both(["saoi"])
+
+        self.assertEqual(speaker_names, ["saoi"])
+        self.assertEqual(forward_transitions, self.saoi_transitions)
+        self.assertEqual(reverse_transitions, self.saoi_transitions_reversed)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+            ("saoi", True, self.saoi_transitions_reversed),
+        ])
+        self.source_retriever.retrieve.assert_called_once_with("saoi")
+        self.transition_builder.build_both.assert_called_once_with(self.saoi_source, 2)
+        self.transition_builder.build.assert_not_called()
+
+
+    def test_get_both_uncached_too_few_lookbacks(self):
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build_both.return_value = (self.saoi_transitions, self.beag_transitions)
+
+        speaker_names, forward_transitions, reverse_transitions = self.transition_retriever.get_both(["saoi"])
+
+        self.assertIs(forward_transitions, self.saoi_transitions)
+        self.assertIs(reverse_transitions, self.beag_transitions)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+        ])
+        self.source_retriever.retrieve.assert_called_once_with("saoi")
+        self.transition_builder.build.assert_not_called()
+
+
+    def test_get_both_uncached_over_budget(self):
+        self.transition_retriever.estimate_size.return_value = 7
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build_both.return_value = (self.saoi_transitions, self.saoi_transitions_reversed)
+
+        speaker_names, forward_transitions, reverse_transitions = self.transition_retriever.get_both(["saoi"])
+
+        self.assertIs(forward_transitions, self.saoi_transitions)
+        self.assertIs(reverse_transitions, self.saoi_transitions_reversed)
+        self.assertEqual(self.cache_contents(), [])
+        self.source_retriever.retrieve.assert_called_once_with("saoi")
+        self.transition_builder.build_both.assert_called_once_with(self.saoi_source, 2)
+        self.transition_builder.build.assert_not_called()
+
+
+    def test_get_both_forward_cached(self):
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.transition_retriever.update_cache_line("saoi", self.saoi_transitions, False)
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.return_value = self.saoi_transitions_reversed
+
+        speaker_names, forward_transitions, reverse_transitions = self.transition_retriever.get_both(["saoi"])
+
+        self.assertIs(forward_transitions, self.saoi_transitions)
+        self.assertIs(reverse_transitions, self.saoi_transitions_reversed)
+        self.transition_builder.build.assert_called_once_with(self.saoi_source, 2, True)
+        self.transition_builder.build_both.assert_not_called()
+
+
+    def test_get_both_unknown_speaker(self):
+        self.speaker_collection.resolve_names.return_value = []
+
+        speaker_names, forward_transitions, reverse_transitions = self.transition_retriever.get_both(["anaithnid"])
+
+        self.assertIsNone(speaker_names)
+        self.assertEqual(forward_transitions, {})
+        self.assertEqual(reverse_transitions, {})
+        self.source_retriever.retrieve.assert_not_called()
+
+
+    def test_get_both_merged(self):
+        self.speaker_collection.resolve_names.return_value = ["eolaí", "saoi"]
+        self.source_retriever.retrieve.side_effect = [self.eolai_source, self.saoi_source]
+        self.transition_builder.build_both.side_effect = [(self.eolai_transitions, self.eolai_transitions), (self.saoi_transitions, self.saoi_transitions_reversed)]
+
+        speaker_names, forward_transitions, reverse_transitions = self.transition_retriever.get_both(["eolaí", "saoi"])
+
+        self.assertEqual(speaker_names, ["eolaí", "saoi"])
+        self.assertEqual(forward_transitions, self.eolai_saoi_transitions)
+        self.assertEqual(reverse_transitions.components, [self.eolai_transitions, self.saoi_transitions_reversed])
+        self.assertEqual(self.source_retriever.retrieve.call_count, 2)
+        self.transition_builder.build.assert_not_called()
+
+
     def test_get_merged_in_order(self):
         self.speaker_collection.resolve_names.return_value = ["eolaí", "saoi"]
         self.source_retriever.retrieve.side_effect = [self.eolai_source, self.saoi_source]
@@ -285,10 +378,10 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["eolaí", "saoi"])
         self.assertEqual(transitions, self.eolai_saoi_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "eolaí", self.eolai_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (1, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[2], (2, "eolaí:saoi", self.eolai_saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.age_counter, 3)
+        self.assertEqual(self.cache_contents(), [
+            ("eolaí", False, self.eolai_transitions),
+            ("saoi", False, self.saoi_transitions),
+        ])
         self.speaker_collection.resolve_names.assert_called_once_with(["eolaí", "saoi"])
         self.source_retriever.retrieve.assert_has_calls([call("eolaí"), call("saoi")], any_order=False)
         self.transition_builder.build.assert_has_calls([call(self.eolai_source, 2, False), call(self.saoi_source, 2, False)], any_order=False)
@@ -303,10 +396,10 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["eolaí", "saoi"])
         self.assertEqual(transitions, self.eolai_saoi_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "eolaí", self.eolai_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (1, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[2], (2, "eolaí:saoi", self.eolai_saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.age_counter, 3)
+        self.assertEqual(self.cache_contents(), [
+            ("eolaí", False, self.eolai_transitions),
+            ("saoi", False, self.saoi_transitions),
+        ])
         self.speaker_collection.resolve_names.assert_called_once_with(["saoi", "eolaí"])
         self.source_retriever.retrieve.assert_has_calls([call("eolaí"), call("saoi")], any_order=False)
         self.transition_builder.build.assert_has_calls([call(self.eolai_source, 2, False), call(self.saoi_source, 2, False)], any_order=False)
@@ -321,10 +414,10 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["eolaí", "saoi"])
         self.assertEqual(transitions, self.eolai_saoi_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "eolaí", self.eolai_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (1, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[2], (2, "eolaí:saoi", self.eolai_saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.age_counter, 3)
+        self.assertEqual(self.cache_contents(), [
+            ("eolaí", False, self.eolai_transitions),
+            ("saoi", False, self.saoi_transitions),
+        ])
         self.speaker_collection.resolve_names.assert_called_once_with(["eolaí", "saoi", "anaithnid"])
         self.source_retriever.retrieve.assert_has_calls([call("eolaí"), call("saoi")], any_order=False)
         self.transition_builder.build.assert_has_calls([call(self.eolai_source, 2, False), call(self.saoi_source, 2, False)], any_order=False)
@@ -339,10 +432,10 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["eolaí", "saoi"])
         self.assertEqual(transitions, self.eolai_saoi_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "eolaí", self.eolai_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (1, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[2], (2, "eolaí:saoi", self.eolai_saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.age_counter, 3)
+        self.assertEqual(self.cache_contents(), [
+            ("eolaí", False, self.eolai_transitions),
+            ("saoi", False, self.saoi_transitions),
+        ])
         self.speaker_collection.resolve_names.assert_called_once_with(["eolaí", "saoi", "fáidh"])
         self.source_retriever.retrieve.assert_has_calls([call("eolaí"), call("saoi")], any_order=False)
         self.transition_builder.build.assert_has_calls([call(self.eolai_source, 2, False), call(self.saoi_source, 2, False)], any_order=False)
@@ -358,10 +451,10 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["eolaí", "saoi"])
         self.assertEqual(transitions, self.eolai_saoi_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "eolaí", self.eolai_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (1, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[2], (3, "eolaí:saoi", self.eolai_saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.age_counter, 4)
+        self.assertEqual(self.cache_contents(), [
+            ("eolaí", False, self.eolai_transitions),
+            ("saoi", False, self.saoi_transitions),
+        ])
         self.speaker_collection.resolve_names.assert_has_calls([call(["eolaí", "saoi"]), call(["eolaí", "saoi"])], any_order=False)
         self.source_retriever.retrieve.assert_has_calls([call("eolaí"), call("saoi")], any_order=False)
         self.transition_builder.build.assert_has_calls([call(self.eolai_source, 2, False), call(self.saoi_source, 2, False)], any_order=False)
@@ -377,10 +470,10 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["eolaí", "saoi"])
         self.assertEqual(transitions, self.eolai_saoi_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "eolaí", self.eolai_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (1, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[2], (3, "eolaí:saoi", self.eolai_saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.age_counter, 4)
+        self.assertEqual(self.cache_contents(), [
+            ("eolaí", False, self.eolai_transitions),
+            ("saoi", False, self.saoi_transitions),
+        ])
         self.speaker_collection.resolve_names.assert_has_calls([call(["saoi", "eolaí"]), call(["eolaí", "saoi"])], any_order=False)
         self.source_retriever.retrieve.assert_has_calls([call("eolaí"), call("saoi")], any_order=False)
         self.transition_builder.build.assert_has_calls([call(self.eolai_source, 2, False), call(self.saoi_source, 2, False)], any_order=False)
@@ -395,10 +488,9 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["saoi"])
         self.assertEqual(transitions, self.saoi_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[2], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.age_counter, 1)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+        ])
         self.speaker_collection.resolve_names.assert_called_once_with(["saoi", "saoi0"])
         self.source_retriever.retrieve.assert_called_once_with("saoi")
         self.transition_builder.build.assert_called_once_with(self.saoi_source, 2, False)
@@ -413,16 +505,492 @@ class TestCachedTransitionRetriever(unittest.TestCase):
 
         self.assertEqual(speaker_names, ["eolaí", "saoi"])
         self.assertEqual(transitions, self.eolai_saoi_transitions)
-        self.assertEqual(self.transition_retriever.cache[0], (0, "eolaí", self.eolai_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[1], (1, "saoi", self.saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.cache[2], (2, "eolaí:saoi", self.eolai_saoi_transitions, False))
-        self.assertEqual(self.transition_retriever.age_counter, 3)
+        self.assertEqual(self.cache_contents(), [
+            ("eolaí", False, self.eolai_transitions),
+            ("saoi", False, self.saoi_transitions),
+        ])
         self.speaker_collection.resolve_names.assert_called_once_with(["saoi", "saoi0", "eolaí"])
         self.source_retriever.retrieve.assert_has_calls([call("eolaí"), call("saoi")], any_order=False)
         self.transition_builder.build.assert_has_calls([call(self.eolai_source, 2, False), call(self.saoi_source, 2, False)], any_order=False)
 
 
-    def test_refresh(self):
+    def test_get_compiled(self):
+        transition_store = Mock()
+        transition_store.load.return_value = self.saoi_transitions
+        self.source_retriever.get_signature.return_value = (27, 695280768)
+        self.transition_retriever.transition_store = transition_store
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+
+        speaker_names, transitions = self.transition_retriever.get(["saoi"])
+
+        self.assertEqual(speaker_names, ["saoi"])
+        self.assertEqual(transitions, self.saoi_transitions)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+        ])
+        self.source_retriever.get_signature.assert_called_once_with("saoi")
+        transition_store.load.assert_called_once_with("saoi", (27, 695280768), False)
+        self.source_retriever.retrieve.assert_not_called()
+        self.transition_builder.build.assert_not_called()
+        transition_store.save.assert_not_called()
+
+
+    def test_get_compiled_missing_or_stale(self):
+        transition_store = Mock()
+        transition_store.load.return_value = None
+        transition_store.load_both.return_value = None
+        self.source_retriever.get_signature.return_value = (27, 695280768)
+        self.transition_retriever.transition_store = transition_store
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.return_value = self.saoi_transitions_reversed
+        self.transition_builder.build_both.return_value = (self.saoi_transitions, self.saoi_transitions_reversed)
+
+        speaker_names, transitions = self.transition_retriever.get(["saoi"], reverse=True)
+
+        self.assertEqual(speaker_names, ["saoi"])
+        self.assertEqual(transitions, self.saoi_transitions_reversed)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", True, self.saoi_transitions_reversed),
+        ])
+        transition_store.load.assert_called_once_with("saoi", (27, 695280768), True)
+        self.source_retriever.retrieve.assert_has_calls([call("saoi"), call("saoi", record_offset=False)], any_order=False)
+        self.transition_builder.build.assert_called_once_with(self.saoi_source, 2, True)
+        self.transition_builder.build_both.assert_called_once_with(self.saoi_source, 2)
+        transition_store.save.assert_called_once_with("saoi", (27, 695280768), self.saoi_transitions, self.saoi_transitions_reversed)
+
+
+    def test_get_compiled_after_save(self):
+        transition_store = Mock()
+        transition_store.load.return_value = None
+        transition_store.save.return_value = True
+        transition_store.load_both.side_effect = [None, (self.eolai_transitions, self.saoi_transitions_reversed)]
+        self.source_retriever.get_signature.return_value = (27, 695280768)
+        self.transition_retriever.transition_store = transition_store
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build_both.return_value = (self.saoi_transitions, self.saoi_transitions_reversed)
+
+        speaker_names, forward_transitions, reverse_transitions = self.transition_retriever.get_both(["saoi"])
+
+        self.assertIs(forward_transitions, self.saoi_transitions)
+        self.assertIs(reverse_transitions, self.saoi_transitions_reversed)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.eolai_transitions),
+            ("saoi", True, self.saoi_transitions_reversed),
+        ])
+        self.assertEqual(transition_store.load_both.call_count, 2)
+        self.transition_builder.build_both.assert_called_once_with(self.saoi_source, 2)
+        transition_store.save.assert_called_once_with("saoi", (27, 695280768), self.saoi_transitions, self.saoi_transitions_reversed)
+        self.source_retriever.retrieve.assert_called_once_with("saoi")
+
+
+    def test_get_both_compiled(self):
+        transition_store = Mock()
+        transition_store.load_both.return_value = (self.saoi_transitions, self.saoi_transitions_reversed)
+        self.source_retriever.get_signature.return_value = (27, 695280768)
+        self.transition_retriever.transition_store = transition_store
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+
+        speaker_names, forward_transitions, reverse_transitions = self.transition_retriever.get_both(["saoi"])
+
+        self.assertIs(forward_transitions, self.saoi_transitions)
+        self.assertIs(reverse_transitions, self.saoi_transitions_reversed)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+            ("saoi", True, self.saoi_transitions_reversed),
+        ])
+        transition_store.load_both.assert_called_once_with("saoi", (27, 695280768))
+        transition_store.load.assert_not_called()
+        self.source_retriever.retrieve.assert_not_called()
+
+
+    def test_get_compiled_save_failed(self):
+        transition_store = Mock()
+        transition_store.load.return_value = None
+        transition_store.save.return_value = False
+        self.source_retriever.get_signature.return_value = (27, 695280768)
+        self.transition_retriever.transition_store = transition_store
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.return_value = self.saoi_transitions
+        self.transition_builder.build_both.return_value = (self.saoi_transitions, self.saoi_transitions_reversed)
+
+        speaker_names, transitions = self.transition_retriever.get(["saoi"])
+
+        self.assertIs(transitions, self.saoi_transitions)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+        ])
+        transition_store.load_both.assert_not_called()
+
+
+    def test_get_compiled_in_save_pool(self):
+        transition_store = Mock()
+        transition_store.load.return_value = None
+        transition_store.save.return_value = True
+        transition_store.load_both.return_value = (self.eolai_transitions, self.faidh_transitions)
+        save_pool = Mock()
+        self.transition_retriever.transition_store = transition_store
+        self.transition_retriever.save_pool = save_pool
+        self.source_retriever.get_signature.return_value = (27, 695280768)
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.return_value = self.saoi_transitions
+
+        speaker_names, transitions = self.transition_retriever.get(["saoi"])
+        self.transition_retriever.get_by_name("saoi", reverse=True)
+
+        self.assertIs(transitions, self.saoi_transitions)
+        save_pool.submit.assert_called_once_with(self.transition_retriever.compile, "saoi", (27, 695280768), None)
+        transition_store.save.assert_not_called()
+        self.transition_builder.build_both.assert_not_called()
+        self.assertEqual(self.transition_retriever.compiling_names, {"saoi"})
+
+        future = save_pool.submit.return_value
+        future.result.return_value = True
+        future.add_done_callback.call_args[0][0](future)
+
+        self.assertEqual(self.transition_retriever.compiling_names, set())
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.eolai_transitions),
+            ("saoi", True, self.faidh_transitions),
+        ])
+
+
+    def test_get_compiled_in_build_pool(self):
+        transition_store = Mock()
+        transition_store.load.return_value = None
+        build_pool = Mock()
+        self.transition_retriever.transition_store = transition_store
+        self.transition_retriever.build_pool = build_pool
+        self.transition_retriever.save_pool = Mock()
+        self.source_retriever.get_signature.return_value = (27, 695280768)
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.return_value = self.saoi_transitions
+
+        self.transition_retriever.get(["saoi"])
+
+        build_pool.submit.assert_called_once_with(compile_speaker, self.source_retriever.dir_path, transition_store.dir_path, "saoi")
+        self.transition_retriever.save_pool.submit.assert_not_called()
+        future = build_pool.submit.return_value
+        future.result.side_effect = BrokenProcessPool()
+        future.add_done_callback.call_args[0][0](future)
+
+        transition_store.load_both.assert_not_called()
+        self.assertEqual(self.transition_retriever.compiling_names, set())
+
+
+    def test_get_merged_equal_weight(self):
+        self.transition_retriever.equal_weight = True
+        self.speaker_collection.resolve_names.return_value = ["eolaí", "saoi"]
+        self.source_retriever.retrieve.side_effect = [self.eolai_source, self.saoi_source]
+        self.transition_builder.build.side_effect = [self.eolai_transitions, self.saoi_transitions]
+
+        speaker_names, transitions = self.transition_retriever.get(["eolaí", "saoi"])
+
+        self.assertEqual(transitions, self.eolai_saoi_transitions)
+        self.assertTrue(transitions.equal_weight)
+        self.assertEqual(transitions.components, [self.eolai_transitions, self.saoi_transitions])
+
+
+    def test_get_merged_one_empty(self):
+        self.speaker_collection.resolve_names.return_value = ["folamh", "saoi"]
+        self.source_retriever.retrieve.side_effect = [self.folamh_source, self.saoi_source]
+        self.transition_builder.build.side_effect = [self.saoi_transitions]
+
+        speaker_names, transitions = self.transition_retriever.get(["folamh", "saoi"])
+
+        self.assertEqual(speaker_names, ["folamh", "saoi"])
+        self.assertIs(transitions, self.saoi_transitions)
+
+
+    def test_get_merged_compiles_in_parallel(self):
+        transition_store = Mock()
+        transition_store.is_fresh.side_effect = [False, False]
+        transition_store.load.side_effect = [self.eolai_transitions, self.saoi_transitions]
+        build_pool = Mock()
+        self.source_retriever.dir_path = "foinsí"
+        self.source_retriever.get_signature.return_value = (27, 695280768)
+        self.transition_retriever.transition_store = transition_store
+        self.transition_retriever.build_pool = build_pool
+        self.speaker_collection.resolve_names.return_value = ["eolaí", "saoi"]
+
+        speaker_names, transitions = self.transition_retriever.get(["eolaí", "saoi"])
+
+        self.assertEqual(speaker_names, ["eolaí", "saoi"])
+        self.assertEqual(transitions, self.eolai_saoi_transitions)
+        transition_store.compile_in_parallel.assert_called_once_with("foinsí", ["eolaí", "saoi"], build_pool)
+        self.source_retriever.retrieve.assert_not_called()
+        self.transition_builder.build.assert_not_called()
+
+
+    def test_get_merged_broken_pool(self):
+        transition_store = Mock()
+        transition_store.is_fresh.return_value = False
+        transition_store.compile_in_parallel.return_value = None
+        transition_store.load.return_value = None
+        self.source_retriever.get_signature.return_value = None
+        self.source_retriever.dir_path = "foinsí"
+        self.transition_retriever.transition_store = transition_store
+        build_pool = Mock()
+        self.transition_retriever.build_pool = build_pool
+        self.speaker_collection.resolve_names.return_value = ["eolaí", "saoi"]
+        self.source_retriever.retrieve.side_effect = [self.eolai_source, self.saoi_source]
+        self.transition_builder.build.side_effect = [self.eolai_transitions, self.saoi_transitions]
+
+        speaker_names, transitions = self.transition_retriever.get(["eolaí", "saoi"])
+
+        self.assertEqual(transitions, self.eolai_saoi_transitions)
+        self.assertIsNone(self.transition_retriever.build_pool)
+        build_pool.shutdown.assert_called_once_with(wait=False)
+        self.transition_retriever.clear()
+        self.source_retriever.retrieve.side_effect = [self.eolai_source, self.saoi_source]
+        self.transition_builder.build.side_effect = [self.eolai_transitions, self.saoi_transitions]
+        self.transition_retriever.get(["eolaí", "saoi"])
+        transition_store.compile_in_parallel.assert_called_once()
+
+
+    def test_get_merged_compiles_only_stale(self):
+        transition_store = Mock()
+        transition_store.is_fresh.side_effect = [True, False]
+        transition_store.load.side_effect = [self.eolai_transitions, self.saoi_transitions]
+        self.source_retriever.get_signature.return_value = (27, 695280768)
+        self.transition_retriever.transition_store = transition_store
+        self.transition_retriever.build_pool = Mock()
+        self.speaker_collection.resolve_names.return_value = ["eolaí", "saoi"]
+
+        speaker_names, transitions = self.transition_retriever.get(["eolaí", "saoi"])
+
+        self.assertEqual(transitions, self.eolai_saoi_transitions)
+        transition_store.compile_in_parallel.assert_not_called()
+
+
+    def test_get_merged_keeps_indexes(self):
+        self.eolai_transitions.line_starts = FollowDistribution.from_tokens([("bíonn", "blas")])
+        self.saoi_transitions.line_starts = FollowDistribution.from_tokens([("fillean", "an"), ("fillean", "an")])
+        self.speaker_collection.resolve_names.return_value = ["eolaí", "saoi"]
+        self.source_retriever.retrieve.side_effect = [self.eolai_source, self.saoi_source]
+        self.transition_builder.build.side_effect = [self.eolai_transitions, self.saoi_transitions]
+
+        speaker_names, transitions = self.transition_retriever.get(["eolaí", "saoi"])
+
+        self.assertEqual(speaker_names, ["eolaí", "saoi"])
+        self.assertEqual(sorted(transitions), sorted(self.eolai_saoi_transitions.keys()))
+        self.assertEqual(list(transitions.lookbacks_with_prefix(("ar",))), [("ar", "an")])
+        self.assertEqual(transitions.line_starts.counts(), {("bíonn", "blas") : 1, ("fillean", "an") : 2})
+        self.assertEqual(self.eolai_transitions.line_starts.counts(), {("bíonn", "blas") : 1})
+
+
+    def test_get_budget_evicts_by_size(self):
+        self.transition_retriever.estimate_size.side_effect = [2, 1, 2, 4]
+        self.speaker_collection.resolve_names.side_effect = [["saoi"], ["fáidh"], ["eolaí"], ["draoi"]]
+        self.source_retriever.retrieve.side_effect = [self.saoi_source, self.faidh_source, self.eolai_source, self.draoi_source]
+        self.transition_builder.build.side_effect = [self.saoi_transitions, self.faidh_transitions, self.eolai_transitions, self.draoi_transitions]
+
+        self.transition_retriever.get(["saoi"])
+        self.transition_retriever.get(["fáidh"])
+        self.transition_retriever.get(["eolaí"])
+        speaker_names, transitions = self.transition_retriever.get(["draoi"])
+
+        self.assertEqual(speaker_names, ["draoi"])
+        self.assertEqual(transitions, self.draoi_transitions)
+        self.assertEqual(self.cache_contents(), [
+            ("eolaí", False, self.eolai_transitions),
+            ("draoi", False, self.draoi_transitions),
+        ])
+        self.assertEqual(self.transition_retriever.cache_size, 6)
+
+
+    def test_get_budget_too_large(self):
+        self.transition_retriever.estimate_size.side_effect = [2, 7]
+        self.speaker_collection.resolve_names.side_effect = [["saoi"], ["fáidh"]]
+        self.source_retriever.retrieve.side_effect = [self.saoi_source, self.faidh_source]
+        self.transition_builder.build.side_effect = [self.saoi_transitions, self.faidh_transitions]
+
+        self.transition_retriever.get(["saoi"])
+        speaker_names, transitions = self.transition_retriever.get(["fáidh"])
+
+        self.assertEqual(speaker_names, ["fáidh"])
+        self.assertEqual(transitions, self.faidh_transitions)
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+        ])
+        self.assertEqual(self.transition_retriever.cache_size, 2)
+
+
+    def test_estimate_size(self):
+        retriever = CachedTransitionRetriever(self.source_retriever, self.transition_builder, self.speaker_collection)
+
+        self.assertGreater(retriever.estimate_size(self.saoi_transitions), retriever.estimate_size(TransitionTable(2)))
+        self.assertGreater(retriever.estimate_size(self.eolai_saoi_transitions), retriever.estimate_size(self.saoi_transitions))
+
+
+    def test_tail(self):
+        self.source_retriever.get_signature.side_effect = [(27, 695280768), (50, 695280769)]
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.return_value = self.saoi_transitions
+        appended_transitions = self.make_transitions({("ar", "an") : ["mbeagán"], ("an", "mbeagán") : ["ar"]})
+        appended_transitions_reversed = self.make_transitions({("mbeagán", "an") : ["ar"]})
+        self.source_retriever.retrieve_appended.return_value = ["ar an mbeagán\n"]
+        self.transition_builder.build_both.return_value = (appended_transitions, appended_transitions_reversed)
+
+        self.transition_retriever.get(["saoi"])
+        updated_names = self.transition_retriever.tail()
+        speaker_names, transitions = self.transition_retriever.get(["saoi"])
+
+        self.assertEqual(updated_names, ["saoi"])
+        self.assertEqual(transitions.components, [self.saoi_transitions, appended_transitions])
+        self.assertEqual(transitions[("ar", "an")].counts(), {"bhfeallaire" : 1, "mbeagán" : 1})
+        self.assertEqual(len(transitions), 5)
+        self.assertEqual(self.transition_retriever.cache[("saoi", False)].signature, (50, 695280769))
+        self.assertEqual(self.transition_retriever.cache_size, 2)
+        self.source_retriever.retrieve_appended.assert_called_once_with("saoi")
+        self.transition_builder.build_both.assert_called_once_with(["ar an mbeagán\n"], 2)
+        self.transition_builder.build.assert_called_once_with(self.saoi_source, 2, False)
+
+
+    def test_tail_extends_appended(self):
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.return_value = self.saoi_transitions
+        self.source_retriever.retrieve_appended.side_effect = [["ar an mbeagán\n"], ["ar an mbeagán\n"]]
+        self.transition_builder.build_both.side_effect = [
+            (self.make_transitions({("ar", "an") : ["mbeagán"]}), TransitionTable(2)),
+            (self.make_transitions({("ar", "an") : ["mbeagán"]}), TransitionTable(2)),
+        ]
+
+        self.transition_retriever.get(["saoi"])
+        self.transition_retriever.tail()
+        self.transition_retriever.tail()
+        speaker_names, transitions = self.transition_retriever.get(["saoi"])
+
+        self.assertEqual(len(transitions.components), 2)
+        self.assertIs(transitions.components[0], self.saoi_transitions)
+        self.assertEqual(transitions[("ar", "an")].counts(), {"bhfeallaire" : 1, "mbeagán" : 2})
+        self.assertEqual(self.transition_retriever.cache_size, 2)
+
+
+    def test_tail_nothing_appended(self):
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.return_value = self.saoi_transitions
+        self.source_retriever.retrieve_appended.return_value = []
+
+        self.transition_retriever.get(["saoi"])
+        updated_names = self.transition_retriever.tail()
+
+        self.assertEqual(updated_names, [])
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+        ])
+        self.transition_builder.build_both.assert_not_called()
+
+
+    def test_tail_truncated(self):
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.return_value = self.saoi_transitions
+        self.source_retriever.retrieve_appended.return_value = None
+
+        self.transition_retriever.get(["saoi"])
+        updated_names = self.transition_retriever.tail()
+
+        self.assertEqual(updated_names, [])
+        self.assertEqual(self.cache_contents(), [])
+        self.assertEqual(self.transition_retriever.cache_size, 0)
+
+
+    def test_get_compiled_sets_offset(self):
+        transition_store = Mock()
+        transition_store.load.return_value = self.saoi_transitions
+        self.source_retriever.get_signature.return_value = (27, 695280768)
+        self.transition_retriever.transition_store = transition_store
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+
+        self.transition_retriever.get(["saoi"])
+
+        self.source_retriever.set_offset.assert_called_once_with("saoi", 27)
+
+
+    def test_get_records_popularity(self):
+        popularity = Mock()
+        self.transition_retriever.popularity = popularity
+        self.speaker_collection.resolve_names.side_effect = [["saoi"], ["eolaí", "saoi"], []]
+
+        self.transition_retriever.get(["saoi"], reverse=True)
+        self.transition_retriever.get_both(["saoi", "eolaí"])
+        self.transition_retriever.get(["anaithnid"])
+
+        popularity.record.assert_has_calls([call(["saoi"], True), call(["eolaí", "saoi"], False), call(["eolaí", "saoi"], True)], any_order=False)
+        self.assertEqual(popularity.record.call_count, 3)
+
+
+    def test_warm(self):
+        self.speaker_collection.resolve_speaker.side_effect = lambda speaker_name: speaker_name != "anaithnid"
+        self.source_retriever.retrieve.side_effect = [self.saoi_source, self.eolai_source, self.faidh_source]
+        self.transition_builder.build.side_effect = [self.saoi_transitions, self.eolai_transitions, self.faidh_transitions]
+
+        warmed = self.transition_retriever.warm([(["saoi"], False), (["eolaí", "saoi", "anaithnid"], False), (["fáidh"], False)])
+
+        self.assertEqual(warmed, [("saoi", False), ("eolaí", False), ("fáidh", False)])
+        self.assertEqual(self.cache_contents(), [
+            ("fáidh", False, self.faidh_transitions),
+            ("eolaí", False, self.eolai_transitions),
+            ("saoi", False, self.saoi_transitions),
+        ])
+        self.assertEqual(self.source_retriever.retrieve.call_count, 3)
+
+
+    def test_warm_stops_at_budget(self):
+        self.transition_retriever.estimate_size.return_value = 3
+        self.speaker_collection.resolve_speaker.return_value = True
+        self.source_retriever.retrieve.side_effect = [self.saoi_source, self.eolai_source, self.faidh_source]
+        self.transition_builder.build.side_effect = [self.saoi_transitions, self.eolai_transitions, self.faidh_transitions]
+
+        warmed = self.transition_retriever.warm([(["saoi"], False), (["eolaí"], False), (["fáidh"], False), (["draoi"], False)])
+
+        self.assertEqual(warmed, [("saoi", False), ("eolaí", False)])
+        self.assertEqual(self.cache_contents(), [
+            ("eolaí", False, self.eolai_transitions),
+            ("saoi", False, self.saoi_transitions),
+        ])
+        self.assertEqual(self.transition_retriever.eviction_count, 0)
+        self.assertEqual(self.transition_retriever.overflow_count, 1)
+        self.assertEqual(self.source_retriever.retrieve.call_count, 3)
+
+
+    def test_counts_hits_and_misses(self):
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.side_effect = [self.saoi_transitions, self.saoi_transitions_reversed]
+
+        self.transition_retriever.get(["saoi"])
+        self.transition_retriever.get(["saoi"])
+        self.transition_retriever.get(["saoi"])
+        self.transition_retriever.get(["saoi"], reverse=True)
+
+        self.assertEqual(self.transition_retriever.hit_counts, {False : 2, True : 0})
+        self.assertEqual(self.transition_retriever.miss_counts, {False : 1, True : 1})
+        self.assertEqual(len(self.transition_retriever.build_latency), 2)
+        self.assertEqual(self.transition_retriever.list_cache_entries(), [("saoi", False, 4, 1), ("saoi", True, 4, 1)])
+
+
+    def test_traces_stages(self):
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.return_value = self.saoi_transitions
+
+        self.transition_retriever.get(["saoi"])
+        self.transition_retriever.get(["saoi"])
+
+        histograms = self.transition_retriever.tracer.histograms
+        self.assertEqual({stage : histogram.count for stage, histogram in histograms.items()}, {"resolve" : 2, "lookup" : 2, "open" : 1, "build" : 1})
+
+
+    def test_clear(self):
         self.speaker_collection.resolve_names.side_effect = [["saoi"], ["fáidh"], ["eolaí"]]
         self.source_retriever.retrieve.side_effect = [self.saoi_source, self.faidh_source, self.eolai_source]
         self.transition_builder.build.side_effect = [self.saoi_transitions, self.faidh_transitions, self.eolai_transitions]
@@ -430,12 +998,10 @@ class TestCachedTransitionRetriever(unittest.TestCase):
         self.transition_retriever.get(["saoi"])
         self.transition_retriever.get(["fáidh"])
         self.transition_retriever.get(["eolaí"])
-        self.transition_retriever.refresh()
+        self.transition_retriever.clear()
 
-        self.assertEqual(self.transition_retriever.cache[0], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[1], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.cache[2], (-1, "", {}, False))
-        self.assertEqual(self.transition_retriever.age_counter, 0)
+        self.assertEqual(self.cache_contents(), [])
+        self.assertEqual(self.transition_retriever.cache_size, 0)
         self.assertEqual(self.source_retriever.retrieve.call_count, 3)
         self.speaker_collection.resolve_names.assert_has_calls([call(["saoi"]), call(["fáidh"]), call(["eolaí"])], any_order=False)
         self.source_retriever.retrieve.assert_has_calls([call("saoi"), call("fáidh"), call("eolaí")], any_order=False)
@@ -443,5 +1009,58 @@ class TestCachedTransitionRetriever(unittest.TestCase):
         self.transition_builder.build.assert_has_calls([call(self.saoi_source, 2, False), call(self.faidh_source, 2, False), call(self.eolai_source, 2, False)], any_order=False)
 
 
+    def test_refresh_unchanged(self):
+        self.source_retriever.get_signature.side_effect = lambda speaker_name: (len(speaker_name), 695280768)
+        self.speaker_collection.resolve_names.side_effect = [["saoi"], ["fáidh"]]
+        self.source_retriever.retrieve.side_effect = [self.saoi_source, self.faidh_source]
+        self.transition_builder.build.side_effect = [self.saoi_transitions, self.faidh_transitions]
+
+        self.transition_retriever.get(["saoi"])
+        self.transition_retriever.get(["fáidh"])
+        changed_names = self.transition_retriever.refresh()
+
+        self.assertEqual(changed_names, [])
+        self.assertEqual(self.cache_contents(), [
+            ("saoi", False, self.saoi_transitions),
+            ("fáidh", False, self.faidh_transitions),
+        ])
+        self.assertEqual(self.transition_retriever.cache_size, 2)
+
+
+    def test_refresh_evicts_changed(self):
+        signatures = {"saoi" : (27, 695280768), "fáidh" : (22, 695280768)}
+        self.source_retriever.get_signature.side_effect = lambda speaker_name: signatures.get(speaker_name, None)
+        self.speaker_collection.resolve_names.side_effect = [["saoi"], ["saoi"], ["fáidh"]]
+        self.source_retriever.retrieve.side_effect = [self.saoi_source, self.saoi_source, self.faidh_source]
+        self.transition_builder.build.side_effect = [self.saoi_transitions, self.saoi_transitions_reversed, self.faidh_transitions]
+
+        self.transition_retriever.get(["saoi"])
+        self.transition_retriever.get(["saoi"], reverse=True)
+        self.transition_retriever.get(["fáidh"])
+        signatures["saoi"] = (28, 695280769)
+        changed_names = self.transition_retriever.refresh()
+
+        self.assertEqual(changed_names, ["saoi"])
+        self.assertEqual(self.cache_contents(), [
+            ("fáidh", False, self.faidh_transitions),
+        ])
+        self.assertEqual(self.transition_retriever.cache_size, 1)
+
+
+    def test_refresh_evicts_removed(self):
+        signatures = {"saoi" : (27, 695280768)}
+        self.source_retriever.get_signature.side_effect = lambda speaker_name: signatures.get(speaker_name, None)
+        self.speaker_collection.resolve_names.return_value = ["saoi"]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.transition_builder.build.return_value = self.saoi_transitions
+
+        self.transition_retriever.get(["saoi"])
+        del signatures["saoi"]
+        changed_names = self.transition_retriever.refresh()
+
+        self.assertEqual(changed_names, ["saoi"])
+        self.assertEqual(self.cache_contents(), [])
+
+
 if __name__ == "__main__":
     unittest.main()
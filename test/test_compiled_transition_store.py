@@ -0,0 +1,276 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import Mock
+
+from compiled_transition_store import CompiledTransitionStore, compile_speaker
+from follow_distribution import FollowDistribution
+from transition_builder import TransitionBuilder
+from transition_table import TransitionTable
+from vocabulary import Vocabulary
+
+class TestCompiledTransitionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.vocabulary = Vocabulary()
+        self.store = CompiledTransitionStore(os.path.join(self.temp_dir.name, "compiled"), self.vocabulary)
+        self.signature = (27, 695280768000000000)
+        builder = TransitionBuilder(self.vocabulary)
+        self.source = [
+            "is binn béal ina thost",
+            "is leor nod don eolach",
+            "is binn an fhírinne",
+        ]
+        self.forward_transitions = builder.build(self.source, 2)
+        self.reverse_transitions = builder.build(self.source, 2, reverse=True)
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def test_is_fresh(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+
+        self.assertTrue(self.store.is_fresh("saoi", self.signature))
+        self.assertFalse(self.store.is_fresh("saoi", (28, 695280768000000000)))
+        self.assertFalse(self.store.is_fresh("saoi", None))
+        self.assertFalse(self.store.is_fresh("anaithnid", self.signature))
+
+
+    def test_compile_speaker(self):
+        with open(os.path.join(self.temp_dir.name, "saoi.src"), "w", encoding="utf8") as source_file:
+            source_file.write("\n".join(self.source) + "\n")
+        stat = os.stat(os.path.join(self.temp_dir.name, "saoi.src"))
+        signature = (stat.st_size, stat.st_mtime_ns)
+
+        compiled = compile_speaker(self.temp_dir.name, self.store.dir_path, "saoi")
+
+        self.assertTrue(compiled)
+        self.assertTrue(self.store.is_fresh("saoi", signature))
+        transitions = self.store.load("saoi", signature)
+        self.assertEqual(dict(transitions), self.forward_transitions)
+        self.assertFalse(compile_speaker(self.temp_dir.name, self.store.dir_path, "anaithnid"))
+
+
+    def test_compile_in_parallel(self):
+        pool = Mock()
+        pool.submit.return_value.result.return_value = True
+
+        results = self.store.compile_in_parallel(self.temp_dir.name, ["saoi", "eolaí"], pool)
+
+        self.assertEqual(results, [True, True])
+        pool.submit.assert_any_call(compile_speaker, self.temp_dir.name, self.store.dir_path, "saoi")
+        pool.submit.assert_any_call(compile_speaker, self.temp_dir.name, self.store.dir_path, "eolaí")
+
+
+    def test_compile_in_parallel_broken_pool(self):
+        pool = Mock()
+        pool.submit.side_effect = BrokenProcessPool()
+
+        self.assertIsNone(self.store.compile_in_parallel(self.temp_dir.name, ["saoi", "eolaí"], pool))
+
+        pool.submit.side_effect = None
+        pool.submit.return_value.result.side_effect = BrokenProcessPool()
+        self.assertIsNone(self.store.compile_in_parallel(self.temp_dir.name, ["saoi", "eolaí"], pool))
+
+
+    def test_compile_in_parallel_worker_failed(self):
+        pool = Mock()
+        pool.submit.return_value.result.side_effect = [True, OSError()]
+
+        self.assertEqual(self.store.compile_in_parallel(self.temp_dir.name, ["saoi", "eolaí"], pool), [True, False])
+
+
+    def test_load_missing(self):
+        transitions = self.store.load("anaithnid", self.signature)
+
+        self.assertIsNone(transitions)
+
+
+    def test_load_no_signature(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+
+        transitions = self.store.load("saoi", None)
+
+        self.assertIsNone(transitions)
+
+
+    def test_load_stale(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+
+        transitions = self.store.load("saoi", (28, 695280768000000000))
+
+        self.assertIsNone(transitions)
+
+
+    def test_load_corrupt(self):
+        os.makedirs(self.store.dir_path)
+        with open(self.store.get_path("saoi"), "wb") as compiled_file:
+            compiled_file.write("raiméis".encode("utf8"))
+
+        transitions = self.store.load("saoi", self.signature)
+
+        self.assertIsNone(transitions)
+
+
+    def test_load_forward(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+
+        transitions = self.store.load("saoi", self.signature)
+
+        self.assertEqual(len(transitions), len(self.forward_transitions))
+        self.assertEqual(dict(transitions), self.forward_transitions)
+        self.assertEqual(transitions[self.vocabulary.encode(("is", "binn"))], FollowDistribution.from_tokens(self.vocabulary.intern_all(["béal", "an"])))
+        self.assertTrue(self.vocabulary.encode(("leor", "nod")) in transitions)
+        self.assertFalse(self.vocabulary.encode(("nod", "leor")) in transitions)
+        self.assertFalse(self.vocabulary.encode(("anaithnid", "leor")) in transitions)
+        self.assertFalse(self.vocabulary.encode(("is",)) in transitions)
+
+
+    def test_load_lookbacks_with_prefix(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+
+        transitions = self.store.load("saoi", self.signature)
+
+        self.assertEqual(sorted(transitions.lookbacks_with_prefix(self.vocabulary.encode(("is",)))),
+            sorted([self.vocabulary.encode(("is", "binn")), self.vocabulary.encode(("is", "leor"))]))
+        self.assertEqual(sorted(transitions.lookbacks_with_prefix(self.vocabulary.encode(("binn",)))),
+            sorted([self.vocabulary.encode(("binn", "béal")), self.vocabulary.encode(("binn", "an"))]))
+        self.assertEqual(transitions.lookbacks_with_prefix(self.vocabulary.encode(("thost",))), [])
+        self.assertEqual(transitions.lookbacks_with_prefix(self.vocabulary.encode(("anaithnid",))), ())
+
+
+    def test_load_lookbacks(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+
+        transitions = self.store.load("saoi", self.signature)
+
+        self.assertEqual(len(transitions.lookbacks), len(self.forward_transitions))
+        self.assertEqual(sorted(transitions.lookbacks), sorted(self.forward_transitions.lookbacks))
+        with self.assertRaises(IndexError):
+            transitions.lookbacks[len(self.forward_transitions)]
+
+
+    def test_load_line_starts(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+        rand = Mock()
+
+        transitions = self.store.load("saoi", self.signature)
+
+        self.assertEqual(len(transitions.line_starts), 3)
+        self.assertEqual(transitions.line_starts.counts(), self.forward_transitions.line_starts.counts())
+        samples = []
+        for draw in range(3):
+            rand.rand_index.return_value = draw
+            samples.append(transitions.line_starts.sample(rand))
+        self.assertEqual(sorted(samples), sorted([self.vocabulary.encode(("is", "binn"))] * 2 + [self.vocabulary.encode(("is", "leor"))]))
+
+
+    def test_sample_follows(self):
+        builder = TransitionBuilder(self.vocabulary)
+        source = ["is binn béal ina thost", "is binn an fhírinne", "is binn béal", "ní binn béal"]
+        self.store.save("saoi", self.signature, builder.build(source, 2), builder.build(source, 2, reverse=True))
+        rand = Mock()
+
+        forward_transitions, reverse_transitions = self.store.load_both("saoi", self.signature)
+
+        for transitions, lookback, expected_samples in [
+                (forward_transitions, ("is", "binn"), ["béal", "béal", "an"]),
+                (reverse_transitions, ("béal", "binn"), ["is", "is", "ní"])]:
+            follows = transitions[self.vocabulary.encode(lookback)]
+            self.assertEqual(len(follows), 3)
+            samples = []
+            for draw in range(3):
+                rand.rand_index.return_value = draw
+                samples.append(follows.sample(rand))
+            self.assertEqual(sorted(self.vocabulary.decode(samples)), sorted(expected_samples))
+            self.assertEqual(follows, FollowDistribution.from_tokens(self.vocabulary.intern_all(expected_samples)))
+
+
+    def test_load_reverse(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+
+        transitions = self.store.load("saoi", self.signature, reverse=True)
+
+        self.assertEqual(dict(transitions), self.reverse_transitions)
+        self.assertEqual(transitions[self.vocabulary.encode(("thost", "ina"))], FollowDistribution.from_tokens(self.vocabulary.intern_all(["béal"])))
+
+
+    def test_load_both(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+
+        forward_transitions, reverse_transitions = self.store.load_both("saoi", self.signature)
+
+        self.assertEqual(dict(forward_transitions), self.forward_transitions)
+        self.assertEqual(dict(reverse_transitions), self.reverse_transitions)
+        self.assertIsNone(self.store.load_both("saoi", (28, 695280768000000000)))
+        self.assertIsNone(self.store.load_both("anaithnid", self.signature))
+
+
+    def test_load_reverse_lookbacks_and_line_starts(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+
+        transitions = self.store.load("saoi", self.signature, reverse=True)
+
+        self.assertEqual(sorted(transitions.lookbacks), sorted(self.reverse_transitions.lookbacks))
+        self.assertEqual(sorted(transitions.lookbacks_with_prefix(self.vocabulary.encode(("béal",)))),
+            sorted([self.vocabulary.encode(("béal", "binn"))]))
+        self.assertEqual(transitions.line_starts.counts(), self.reverse_transitions.line_starts.counts())
+
+
+    def test_load_both_shares_ngrams(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+
+        forward_transitions, reverse_transitions = self.store.load_both("saoi", self.signature)
+
+        self.assertIs(forward_transitions.ngrams, reverse_transitions.ngrams)
+        shared_size = forward_transitions.ngrams.estimate_shared_size()
+        self.assertLess(forward_transitions.estimate_size() + reverse_transitions.estimate_size(),
+            2 * shared_size + reverse_transitions.order.nbytes + 1024)
+        self.assertGreater(forward_transitions.estimate_size() + reverse_transitions.estimate_size(), shared_size)
+
+
+    def test_save_replaces_mapped(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+        transitions = self.store.load("saoi", self.signature)
+
+        self.assertTrue(self.store.save("saoi", (28, 695280768000000000), self.reverse_transitions, self.forward_transitions))
+
+        self.assertEqual(dict(transitions), self.forward_transitions)
+        self.assertEqual(dict(self.store.load("saoi", (28, 695280768000000000))), self.reverse_transitions)
+        self.assertEqual(os.listdir(self.store.dir_path), ["saoi.tbl"])
+
+
+    def test_load_other_vocabulary(self):
+        self.store.save("saoi", self.signature, self.forward_transitions, self.reverse_transitions)
+        other_vocabulary = Vocabulary()
+        other_vocabulary.intern_all(["tús", "maith"])
+        other_store = CompiledTransitionStore(self.store.dir_path, other_vocabulary)
+
+        transitions = other_store.load("saoi", self.signature)
+
+        self.assertEqual(len(transitions), len(self.forward_transitions))
+        self.assertEqual(transitions[other_vocabulary.encode(("binn", "béal"))], FollowDistribution.from_tokens(other_vocabulary.intern_all(["ina"])))
+        decoded_transitions = {tuple(other_vocabulary.decode(lookback)) : other_vocabulary.decode(follows.counts())
+            for lookback, follows in transitions.items()}
+        expected_transitions = {tuple(self.vocabulary.decode(lookback)) : self.vocabulary.decode(follows.counts())
+            for lookback, follows in self.forward_transitions.items()}
+        self.assertEqual(decoded_transitions, expected_transitions)
+
+
+    def test_load_empty(self):
+        self.store.save("folamh", self.signature, TransitionTable(2), TransitionTable(2))
+
+        transitions = self.store.load("folamh", self.signature)
+
+        self.assertEqual(len(transitions), 0)
+        self.assertFalse(self.vocabulary.encode(("is", "binn")) in transitions)
+        self.assertEqual(len(transitions.lookbacks), 0)
+        self.assertEqual(len(transitions.line_starts), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
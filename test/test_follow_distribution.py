@@ -0,0 +1,127 @@
+import unittest
+from unittest.mock import Mock
+
+from follow_distribution import FollowDistribution, FollowList, SingleFollow
+
+class TestFollowDistribution(unittest.TestCase):
+
+    def setUp(self):
+        self.rand = Mock()
+
+
+    def tearDown(self):
+        pass
+
+
+    def sample_all(self, follows):
+        if isinstance(follows, FollowList) or isinstance(follows.weights, tuple):
+            draw_count = len(follows)
+        else:
+            draw_count = len(follows.tokens)
+        results = {}
+        for draw in range(draw_count):
+            self.rand.rand_index.return_value = draw
+            token = follows.sample(self.rand)
+            results[token] = results.get(token, 0) + 1
+        self.rand.rand_index.assert_called_with(draw_count)
+        return results, draw_count
+
+
+    def test_from_tokens(self):
+        follows = FollowDistribution.from_tokens(["an", "an", "ar", "an"])
+
+        self.assertEqual(follows, FollowList(["an", "an", "an", "ar"]))
+        self.assertEqual(follows.counts(), {"an" : 3, "ar" : 1})
+        self.assertEqual(len(follows), 4)
+
+
+    def test_uniform(self):
+        follows = FollowDistribution({"an" : 2, "ar" : 2, "feall" : 2})
+
+        self.assertEqual(follows.weights, 2)
+        self.assertEqual(follows.counts(), {"an" : 2, "ar" : 2, "feall" : 2})
+        self.assertEqual(len(follows), 6)
+
+
+    def test_weighted(self):
+        follows = FollowDistribution({"an" : 3, "ar" : 1, "feall" : 2})
+
+        self.assertEqual(follows.weights, (3, 4, 6))
+        self.assertEqual(follows.counts(), {"an" : 3, "ar" : 1, "feall" : 2})
+        self.assertEqual(len(follows), 6)
+
+
+    def test_single(self):
+        follows = FollowDistribution.from_tokens(["feall", "feall"])
+
+        self.assertIsInstance(follows, SingleFollow)
+        self.assertEqual(follows.counts(), {"feall" : 2})
+        self.assertEqual(len(follows), 2)
+        self.assertEqual(follows, FollowDistribution({"feall" : 2}))
+        self.assertIsInstance(follows.merged(FollowDistribution.from_tokens(["an"])), FollowList)
+
+
+    def test_many_follows(self):
+        follows = FollowDistribution.from_tokens(["an"] * 20 + ["ar"])
+
+        self.assertIsInstance(follows, FollowDistribution)
+        self.assertEqual(follows.weights, (20, 21))
+        self.assertEqual(follows.merged(FollowDistribution.from_tokens(["feall"])).counts(), {"an" : 20, "ar" : 1, "feall" : 1})
+
+
+    def test_sample_single(self):
+        follows = FollowDistribution.from_tokens(["feall"])
+
+        self.assertEqual(follows.sample(self.rand), "feall")
+        self.rand.rand_index.assert_not_called()
+
+
+    def test_sample_uniform_distribution(self):
+        follows = FollowDistribution.from_tokens(["an", "ar", "feall"])
+
+        results, draw_count = self.sample_all(follows)
+
+        self.assertEqual(draw_count, 3)
+        self.assertEqual(results, {"an" : 1, "ar" : 1, "feall" : 1})
+
+
+    def test_sample_weighted_distribution(self):
+        counts = {"an" : 7, "ar" : 1, "feall" : 3, "bhfeallaire" : 1, "filleann" : 12}
+        follows = FollowDistribution(counts)
+
+        results, draw_count = self.sample_all(follows)
+
+        total = sum(counts.values())
+        self.assertEqual({token : count * total for token, count in results.items()},
+            {token : count * draw_count for token, count in counts.items()})
+
+
+    def test_merged(self):
+        follows = FollowDistribution.from_tokens(["an", "ar"])
+        other_follows = FollowDistribution.from_tokens(["ar", "feall", "ar"])
+
+        merged_follows = follows.merged(other_follows)
+
+        self.assertEqual(merged_follows.counts(), {"an" : 1, "ar" : 3, "feall" : 1})
+        self.assertEqual(len(merged_follows), 5)
+        self.assertEqual(follows.counts(), {"an" : 1, "ar" : 1})
+        self.assertEqual(other_follows.counts(), {"ar" : 2, "feall" : 1})
+
+
+    def test_merged_distribution(self):
+        follows = FollowDistribution.from_tokens(["an", "an", "ar"]).merged(FollowDistribution.from_tokens(["ar", "feall"]))
+
+        results, draw_count = self.sample_all(follows)
+
+        self.assertEqual({token : count * 5 for token, count in results.items()},
+            {"an" : 2 * draw_count, "ar" : 2 * draw_count, "feall" : draw_count})
+
+
+    def test_equal_ignores_order(self):
+        self.assertEqual(FollowDistribution.from_tokens(["an", "ar", "an"]), FollowDistribution.from_tokens(["ar", "an", "an"]))
+        self.assertNotEqual(FollowDistribution.from_tokens(["an", "ar"]), FollowDistribution.from_tokens(["an", "an", "ar"]))
+        self.assertFalse(FollowList(["an", "ar"]) != FollowList(["ar", "an"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from latency_tracker import LatencyTracker
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = LatencyTracker(window=100)
+
+
+    def tearDown(self):
+        pass
+
+
+    def test_empty(self):
+        self.assertEqual(len(self.tracker), 0)
+        self.assertIsNone(self.tracker.percentile(50))
+
+
+    def test_single(self):
+        self.tracker.record(0.25)
+
+        self.assertEqual(self.tracker.percentile(50), 0.25)
+        self.assertEqual(self.tracker.percentile(99), 0.25)
+
+
+    def test_percentiles(self):
+        for i in range(100, 0, -1):
+            self.tracker.record(i / 1000)
+
+        self.assertEqual(len(self.tracker), 100)
+        self.assertEqual(self.tracker.percentile(50), 0.05)
+        self.assertEqual(self.tracker.percentile(99), 0.099)
+        self.assertEqual(self.tracker.percentile(100), 0.1)
+
+
+    def test_window(self):
+        for i in range(150):
+            self.tracker.record(i)
+
+        self.assertEqual(len(self.tracker), 100)
+        self.assertEqual(self.tracker.percentile(0), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+from unittest.mock import Mock
+
+from follow_distribution import FollowDistribution
+from merged_transitions import MergedDistribution, MergedTransitions
+from transition_table import TransitionTable
+
+class TestMergedTransitions(unittest.TestCase):
+
+    def setUp(self):
+        self.rand = Mock()
+        self.eolai_transitions = self.make_transitions({("bíonn", "blas") : ["ar"], ("blas", "ar") : ["an"], ("ar", "an") : ["mbeagán"]},
+            [("bíonn", "blas")])
+        self.saoi_transitions = self.make_transitions({("fillean", "an") : ["feall"], ("an", "feall") : ["ar"], ("feall", "ar") : ["an"],
+            ("ar", "an") : ["bhfeallaire", "bhfeallaire", "bhfeallaire"]}, [("fillean", "an"), ("fillean", "an")])
+        self.transitions = MergedTransitions([self.eolai_transitions, self.saoi_transitions])
+
+
+    def tearDown(self):
+        pass
+
+
+    def make_transitions(self, transitions, line_starts):
+        table = TransitionTable(2, ((lookback, FollowDistribution.from_tokens(follows)) for lookback, follows in transitions.items()))
+        table.line_starts = FollowDistribution.from_tokens(line_starts)
+        table.index()
+        return table
+
+
+    def test_lookups(self):
+        self.assertEqual(len(self.transitions), 6)
+        self.assertEqual(self.transitions.lookback_length, 2)
+        self.assertTrue(("bíonn", "blas") in self.transitions)
+        self.assertTrue(("fillean", "an") in self.transitions)
+        self.assertFalse(("an", "bíonn") in self.transitions)
+        self.assertEqual(sorted(self.transitions), sorted(set(self.eolai_transitions) | set(self.saoi_transitions)))
+        with self.assertRaises(KeyError):
+            self.transitions[("an", "bíonn")]
+
+
+    def test_single_component_follows_shared(self):
+        self.assertIs(self.transitions[("blas", "ar")], self.eolai_transitions[("blas", "ar")])
+
+
+    def test_merged_follows(self):
+        follows = self.transitions[("ar", "an")]
+
+        self.assertEqual(len(follows), 4)
+        self.assertEqual(follows, FollowDistribution({"mbeagán" : 1, "bhfeallaire" : 3}))
+
+
+    def test_sample_proportional(self):
+        follows = self.transitions[("ar", "an")]
+        results = {}
+        for draw in range(4):
+            self.rand.rand_index.side_effect = [draw, 0]
+            token = follows.sample(self.rand)
+            results[token] = results.get(token, 0) + 1
+
+        self.assertEqual(results, {"mbeagán" : 1, "bhfeallaire" : 3})
+
+
+    def test_sample_equal_weight(self):
+        follows = MergedTransitions([self.eolai_transitions, self.saoi_transitions], equal_weight=True)[("ar", "an")]
+        results = {}
+        for draw in range(2):
+            self.rand.rand_index.side_effect = [draw, 0]
+            token = follows.sample(self.rand)
+            results[token] = results.get(token, 0) + 1
+
+        self.assertEqual(results, {"mbeagán" : 1, "bhfeallaire" : 1})
+
+
+    def test_line_starts(self):
+        self.assertEqual(len(self.transitions.line_starts), 3)
+        self.assertEqual(self.transitions.line_starts.counts(), {("bíonn", "blas") : 1, ("fillean", "an") : 2})
+        samples = []
+        for draw in range(3):
+            self.rand.rand_index.side_effect = [draw, 0]
+            samples.append(self.transitions.line_starts.sample(self.rand))
+        self.assertEqual(sorted(samples), [("bíonn", "blas"), ("fillean", "an"), ("fillean", "an")])
+
+
+    def test_lookbacks_with_prefix(self):
+        self.assertEqual(self.transitions.lookbacks_with_prefix(("ar",)), [("ar", "an")])
+        self.assertEqual(sorted(self.transitions.lookbacks_with_prefix(("an",))), [("an", "feall")])
+        self.assertEqual(self.transitions.lookbacks_with_prefix(("anaithnid",)), [])
+
+
+    def test_sample_lookback_uniform(self):
+        results = {}
+        eolai_count = len(self.eolai_transitions)
+        for draw in range(7):
+            local_draw = draw if draw < eolai_count else draw - eolai_count
+            self.rand.rand_index.side_effect = [draw, local_draw, 0, 0]
+            lookback = self.transitions.sample_lookback(self.rand)
+            results[lookback] = results.get(lookback, 0) + 1
+
+        self.assertEqual(sorted(results), sorted(self.transitions))
+        self.assertEqual(sum(results.values()), 7)
+        self.assertTrue(all(count == 1 for lookback, count in results.items() if lookback != ("bíonn", "blas")))
+
+
+    def test_sample_lookback_skips_duplicate(self):
+        duplicate_draw = self.saoi_transitions.lookbacks.index(("ar", "an"))
+        self.rand.rand_index.side_effect = [len(self.eolai_transitions) + duplicate_draw, duplicate_draw, 0, 0]
+
+        lookback = self.transitions.sample_lookback(self.rand)
+
+        self.assertEqual(lookback, self.eolai_transitions.lookbacks[0])
+
+
+    def test_nested(self):
+        transitions = MergedTransitions([self.transitions, self.make_transitions({("ar", "an") : ["mbeagán"], ("an", "bíonn") : ["blas"]}, [])])
+
+        self.assertEqual(len(transitions), 7)
+        self.assertEqual(transitions[("ar", "an")].counts(), {"mbeagán" : 2, "bhfeallaire" : 3})
+        self.assertEqual(transitions.lookbacks_with_prefix(("an",)), [("an", "feall"), ("an", "bíonn")])
+
+
+    def test_empty_parts_ignored(self):
+        follows = MergedDistribution([FollowDistribution({}), FollowDistribution.from_tokens(["an"])], equal_weight=True)
+        self.rand.rand_index.return_value = 0
+
+        self.assertEqual(follows.sample(self.rand), "an")
+        self.assertEqual(len(follows), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,8 +2,11 @@ import datetime
 import unittest
 from unittest.mock import Mock
 
+from latency_tracker import LatencyTracker
 from meta_request_processor import MetaRequestProcessor
+from request_profiler import RequestProfiler
 from speaker_collection import Speaker
+from speaker_statistics import SpeakerStats
 
 class TestMetaRequestProcessor(unittest.TestCase):
 
@@ -12,7 +15,10 @@ class TestMetaRequestProcessor(unittest.TestCase):
         self.speaker_collection = Mock()
         self.rand = Mock()
         time = datetime.datetime.utcfromtimestamp(0)
-        self.processor = MetaRequestProcessor(self.transition_retriever, self.speaker_collection, self.rand, time)
+        self.speaker_statistics = Mock()
+        self.speaker_statistics.get.return_value = SpeakerStats(2, 1, 4, 4, 2)
+        self.processor = MetaRequestProcessor(self.transition_retriever, self.speaker_collection, self.rand, time,
+            speaker_statistics=self.speaker_statistics)
 
 
     def tearDown(self):
@@ -39,13 +45,96 @@ class TestMetaRequestProcessor(unittest.TestCase):
 
 
     def test_process_refresh(self):
+        self.speaker_collection.refresh.return_value = ([], [])
+        self.transition_retriever.refresh.return_value = []
+
         response = self.processor.process("refresh")
 
         self.assertEqual(response, "Refreshed.")
         self.transition_retriever.refresh.assert_called_once()
+        self.transition_retriever.clear.assert_not_called()
         self.speaker_collection.refresh.assert_called_once()
 
 
+    def test_process_refresh_changes(self):
+        self.speaker_collection.refresh.return_value = (["draoi"], ["cailleach", "asarlaí"])
+        self.transition_retriever.refresh.return_value = ["asarlaí", "eolaí", "saoi"]
+
+        response = self.processor.process("refresh")
+
+        self.assertEqual(response, "Refreshed. Changed: eolaí, saoi. Added: draoi. Removed: cailleach, asarlaí.")
+        self.speaker_statistics.invalidate.assert_called_once_with(["eolaí", "saoi", "draoi"], ["cailleach", "asarlaí"])
+
+
+    def test_process_refresh_many_changes(self):
+        self.speaker_collection.refresh.return_value = ([], [])
+        self.transition_retriever.refresh.return_value = ["asarlaí", "cailleach", "draoi", "eagnaí", "eolaí", "fáidh", "saoi"]
+
+        response = self.processor.process("refresh")
+
+        self.assertEqual(response, "Refreshed. Changed: asarlaí, cailleach, draoi, eagnaí, eolaí (+2). Added: none. Removed: none.")
+
+
+    def test_process_refresh_all(self):
+        self.speaker_collection.refresh.return_value = (["draoi"], [])
+
+        response = self.processor.process("refresh all")
+
+        self.assertEqual(response, "Refreshed.")
+        self.transition_retriever.clear.assert_called_once()
+        self.transition_retriever.refresh.assert_not_called()
+        self.speaker_collection.refresh.assert_called_once()
+
+
+    def test_process_refresh_invalidates_reservoir(self):
+        self.processor.quote_reservoir = Mock()
+        self.speaker_collection.refresh.return_value = (["draoi"], ["cailleach"])
+        self.transition_retriever.refresh.return_value = ["cailleach", "saoi"]
+
+        self.processor.process("refresh")
+
+        self.processor.quote_reservoir.invalidate.assert_called_once_with(["saoi", "cailleach"])
+        self.processor.process("refresh all")
+        self.processor.quote_reservoir.clear.assert_called_once()
+
+
+    def test_process_perf(self):
+        self.transition_retriever.list_cache_entries.return_value = [
+            ("saoi", False, 120, 3 * 1024 * 1024),
+            ("eolaí", True, 80, 5 * 1024 * 1024),
+        ]
+        self.transition_retriever.cache_size = 8 * 1024 * 1024
+        self.transition_retriever.budget = 1024 * 1024 * 1024
+        self.transition_retriever.hit_counts = {False : 12, True : 3}
+        self.transition_retriever.miss_counts = {False : 4, True : 1}
+        self.transition_retriever.eviction_count = 2
+        self.transition_retriever.build_latency = LatencyTracker()
+        self.transition_retriever.build_latency.record(0.5)
+        self.transition_retriever.build_latency.record(1.5)
+        self.processor.generation_latency = LatencyTracker()
+
+        response = self.processor.process("perf")
+
+        self.assertEqual(response, "Cache: 2 entries using 8.0 MiB of 1024.0 MiB. Hits: 12 forward, 3 reverse. Misses: 4 forward, 1 reverse. Evictions: 2. "
+            + "Builds: p50 500.0 ms, p99 1500.0 ms (2 samples). Quotes: none. "
+            + "Largest entries: eolaí reverse (80 lookbacks, 5.0 MiB), saoi forward (120 lookbacks, 3.0 MiB).")
+
+
+    def test_process_perf_empty(self):
+        self.transition_retriever.list_cache_entries.return_value = []
+        self.transition_retriever.cache_size = 0
+        self.transition_retriever.budget = 1024 * 1024
+        self.transition_retriever.hit_counts = {False : 0, True : 0}
+        self.transition_retriever.miss_counts = {False : 0, True : 0}
+        self.transition_retriever.eviction_count = 0
+        self.transition_retriever.build_latency = LatencyTracker()
+
+        response = self.processor.process("perf")
+
+        self.assertEqual(response, "Cache: 0 entries using 0.0 MiB of 1.0 MiB. Hits: 0 forward, 0 reverse. Misses: 0 forward, 0 reverse. Evictions: 0. "
+            + "Builds: none. Quotes: none. Largest entries: none.")
+
+
     def test_process_stats_general(self):
         self.speaker_collection.get_speaker_count.return_value = 17
         self.speaker_collection.get_source_generated_date.return_value = datetime.datetime.fromtimestamp(695280768)
@@ -72,96 +161,138 @@ class TestMetaRequestProcessor(unittest.TestCase):
 
     def test_process_stats_speaker_no_aliases(self):
         self.speaker_collection.resolve_speaker.return_value = self.make_speaker("cainteoir", [])
-        self.transition_retriever.get_by_name.return_value = {("bíonn", "gach") : ["tosú"], ("gach", "tosú") : ["lag"]}
 
         response = self.processor.process("stats cainteoir")
 
-        self.assertEqual(response, "The speaker cainteoir has 2 transitions.")
+        self.assertEqual(response, "The speaker cainteoir has 2 transitions (1 lines, 4 words, 4 distinct words, 2 distinct lookbacks).")
         self.speaker_collection.resolve_speaker.assert_called_once_with("cainteoir")
         self.rand.shuffled.assert_not_called()
-        self.transition_retriever.get_by_name.assert_called_once_with("cainteoir")
+        self.speaker_statistics.get.assert_called_once_with("cainteoir")
+        self.transition_retriever.get_by_name.assert_not_called()
+
+
+    def test_process_stats_speaker_no_source(self):
+        self.speaker_collection.resolve_speaker.return_value = self.make_speaker("cainteoir", [])
+        self.speaker_statistics.get.return_value = None
+
+        response = self.processor.process("stats cainteoir")
+
+        self.assertEqual(response, "")
 
 
     def test_process_stats_speaker_one_alias(self):
         self.speaker_collection.resolve_speaker.return_value = self.make_speaker("cainteoir", ["cainteoir_"])
-        self.transition_retriever.get_by_name.return_value = {("bíonn", "gach") : ["tosú"], ("gach", "tosú") : ["lag"]}
 
         response = self.processor.process("stats cainteoir")
 
-        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir_) has 2 transitions.")
+        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir_) has 2 transitions (1 lines, 4 words, 4 distinct words, 2 distinct lookbacks).")
         self.speaker_collection.resolve_speaker.assert_called_once_with("cainteoir")
         self.rand.shuffled.assert_not_called()
-        self.transition_retriever.get_by_name.assert_called_once_with("cainteoir")
+        self.speaker_statistics.get.assert_called_once_with("cainteoir")
+        self.transition_retriever.get_by_name.assert_not_called()
 
 
     def test_process_stats_speaker_two_aliases(self):
         cainteoir_aliases = ["cainteoir0", "cainteoir1"]
         self.speaker_collection.resolve_speaker.return_value = self.make_speaker("cainteoir", cainteoir_aliases)
         self.rand.shuffled.return_value = ["cainteoir1", "cainteoir0"]
-        self.transition_retriever.get_by_name.return_value = {("bíonn", "gach") : ["tosú"], ("gach", "tosú") : ["lag"]}
 
         response = self.processor.process("stats cainteoir")
 
-        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir1 and cainteoir0) has 2 transitions.")
+        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir1 and cainteoir0) has 2 transitions (1 lines, 4 words, 4 distinct words, 2 distinct lookbacks).")
         self.speaker_collection.resolve_speaker.assert_called_once_with("cainteoir")
         self.rand.shuffled.assert_called_once_with(cainteoir_aliases)
-        self.transition_retriever.get_by_name.assert_called_once_with("cainteoir")
+        self.speaker_statistics.get.assert_called_once_with("cainteoir")
+        self.transition_retriever.get_by_name.assert_not_called()
 
 
     def test_process_stats_speaker_three_aliases(self):
         cainteoir_aliases = ["cainteoir0", "cainteoir1", "cainteoir2"]
         self.speaker_collection.resolve_speaker.return_value = self.make_speaker("cainteoir", cainteoir_aliases)
         self.rand.shuffled.return_value = ["cainteoir1", "cainteoir2", "cainteoir0"]
-        self.transition_retriever.get_by_name.return_value = {("bíonn", "gach") : ["tosú"], ("gach", "tosú") : ["lag"]}
 
         response = self.processor.process("stats cainteoir")
 
-        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir1, cainteoir2, and cainteoir0) has 2 transitions.")
+        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir1, cainteoir2, and cainteoir0) has 2 transitions (1 lines, 4 words, 4 distinct words, 2 distinct lookbacks).")
         self.speaker_collection.resolve_speaker.assert_called_once_with("cainteoir")
         self.rand.shuffled.assert_called_once_with(cainteoir_aliases)
-        self.transition_retriever.get_by_name.assert_called_once_with("cainteoir")
+        self.speaker_statistics.get.assert_called_once_with("cainteoir")
+        self.transition_retriever.get_by_name.assert_not_called()
 
 
     def test_process_stats_speaker_four_aliases(self):
         cainteoir_aliases = ["cainteoir0", "cainteoir1", "cainteoir2", "cainteoir3"]
         self.speaker_collection.resolve_speaker.return_value = self.make_speaker("cainteoir", cainteoir_aliases)
         self.rand.shuffled.return_value = ["cainteoir3", "cainteoir1", "cainteoir2", "cainteoir0"]
-        self.transition_retriever.get_by_name.return_value = {("bíonn", "gach") : ["tosú"], ("gach", "tosú") : ["lag"]}
 
         response = self.processor.process("stats cainteoir")
 
-        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir3, cainteoir1, cainteoir2, and 1 other nick) has 2 transitions.")
+        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir3, cainteoir1, cainteoir2, and 1 other nick) has 2 transitions (1 lines, 4 words, 4 distinct words, 2 distinct lookbacks).")
         self.speaker_collection.resolve_speaker.assert_called_once_with("cainteoir")
         self.rand.shuffled.assert_called_once_with(cainteoir_aliases)
-        self.transition_retriever.get_by_name.assert_called_once_with("cainteoir")
+        self.speaker_statistics.get.assert_called_once_with("cainteoir")
+        self.transition_retriever.get_by_name.assert_not_called()
 
 
     def test_process_stats_speaker_multiple_aliases(self):
         cainteoir_aliases = ["cainteoir0", "cainteoir1", "cainteoir2", "cainteoir3", "cainteoir4", "cainteoir5"]
         self.speaker_collection.resolve_speaker.return_value = self.make_speaker("cainteoir", cainteoir_aliases)
         self.rand.shuffled.return_value = ["cainteoir3", "cainteoir5", "cainteoir0", "cainteoir4", "cainteoir2", "cainteoir1"]
-        self.transition_retriever.get_by_name.return_value = {("bíonn", "gach") : ["tosú"], ("gach", "tosú") : ["lag"]}
 
         response = self.processor.process("stats cainteoir")
 
-        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir3, cainteoir5, cainteoir0, and 3 other nicks) has 2 transitions.")
+        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir3, cainteoir5, cainteoir0, and 3 other nicks) has 2 transitions (1 lines, 4 words, 4 distinct words, 2 distinct lookbacks).")
         self.speaker_collection.resolve_speaker.assert_called_once_with("cainteoir")
         self.rand.shuffled.assert_called_once_with(cainteoir_aliases)
-        self.transition_retriever.get_by_name.assert_called_once_with("cainteoir")
+        self.speaker_statistics.get.assert_called_once_with("cainteoir")
+        self.transition_retriever.get_by_name.assert_not_called()
 
 
     def test_process_stats_speaker_called_with_alias(self):
         cainteoir_aliases = ["cainteoir0", "cainteoir1", "cainteoir2", "cainteoir3", "cainteoir4", "cainteoir5"]
         self.speaker_collection.resolve_speaker.return_value = self.make_speaker("cainteoir", cainteoir_aliases)
         self.rand.shuffled.return_value = ["cainteoir3", "cainteoir5", "cainteoir0", "cainteoir4", "cainteoir2", "cainteoir1"]
-        self.transition_retriever.get_by_name.return_value = {("bíonn", "gach") : ["tosú"], ("gach", "tosú") : ["lag"]}
 
         response = self.processor.process("stats cainteoir4")
 
-        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir4, cainteoir3, cainteoir5, and 3 other nicks) has 2 transitions.")
+        self.assertEqual(response, "The speaker cainteoir (AKA cainteoir4, cainteoir3, cainteoir5, and 3 other nicks) has 2 transitions (1 lines, 4 words, 4 distinct words, 2 distinct lookbacks).")
         self.speaker_collection.resolve_speaker.assert_called_once_with("cainteoir4")
         self.rand.shuffled.assert_called_once_with(cainteoir_aliases)
-        self.transition_retriever.get_by_name.assert_called_once_with("cainteoir")
+        self.speaker_statistics.get.assert_called_once_with("cainteoir")
+        self.transition_retriever.get_by_name.assert_not_called()
+
+
+    def test_process_profile_absent(self):
+        self.assertEqual(self.processor.process("profile every 10", {}), "")
+
+
+    def test_process_profile(self):
+        self.processor.profiler = RequestProfiler("/tmp/.profiles", every=0, threshold=0, max_dumps=20)
+
+        self.assertEqual(self.processor.process("profile", {}), "Profiling is off.")
+        self.assertEqual(self.processor.process("profile every 10", {}), "Profiling 1 in every 10 requests, keeping the latest 20.")
+        self.assertEqual(self.processor.process("profile over 2.5", {}),
+            "Profiling 1 in every 10 requests and any request taking 2.5 seconds or more, keeping the latest 20.")
+        self.assertEqual(self.processor.profiler.every, 10)
+        self.assertEqual(self.processor.profiler.threshold, 2.5)
+        self.assertEqual(self.processor.process("profile off", {}), "Profiling is off.")
+        self.assertFalse(self.processor.profiler.is_enabled())
+
+
+    def test_process_profile_minimum_threshold(self):
+        self.processor.profiler = RequestProfiler("/tmp/.profiles", every=0, threshold=0, max_dumps=20)
+
+        self.assertEqual(self.processor.process("profile over 0.000001", {}),
+            "Profiling any request taking 0.5 seconds or more, keeping the latest 20.")
+        self.assertEqual(self.processor.profiler.threshold, 0.5)
+
+
+    def test_process_profile_invalid(self):
+        self.processor.profiler = RequestProfiler("/tmp/.profiles", every=5, threshold=0)
+
+        self.assertEqual(self.processor.process("profile every lots", {}), "Usage: profile [every <n> | over <seconds> | off]")
+        self.assertEqual(self.processor.process("profile sometimes", {}), "Usage: profile [every <n> | over <seconds> | off]")
+        self.assertEqual(self.processor.profiler.every, 5)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+import unittest
+
+from twisted.web.test.requesthelper import DummyRequest
+
+from metrics_resource import MetricsResource
+from request_tracer import RequestTracer
+
+class TestMetricsResource(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer = RequestTracer(buckets=[1])
+        self.resource = MetricsResource(self.tracer)
+
+
+    def tearDown(self):
+        pass
+
+
+    def test_render(self):
+        self.tracer.observe("generate", 0.5)
+        request = DummyRequest([b"metrics"])
+
+        body = self.resource.render_GET(request)
+
+        self.assertEqual(body, self.tracer.render().encode("utf8"))
+        self.assertTrue(b'pasadoir_stage_seconds_count{stage="generate"} 1' in body)
+        self.assertEqual(request.responseHeaders.getRawHeaders(b"Content-Type"), [b"text/plain; version=0.0.4; charset=utf-8"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 import unittest
 from unittest.mock import Mock
 
+from follow_distribution import FollowDistribution
 from quote_generator import QuoteGenerator
+from transition_table import TransitionTable
 
 class TestQuoteGenerator(unittest.TestCase):
 
@@ -14,6 +16,13 @@ class TestQuoteGenerator(unittest.TestCase):
         pass
 
 
+    def make_transitions(self, transitions, line_starts=()):
+        table = TransitionTable(2, ((lookback, FollowDistribution.from_tokens(follows)) for lookback, follows in transitions.items()))
+        table.line_starts = FollowDistribution.from_tokens(line_starts)
+        table.index()
+        return table
+
+
     def test_generate_no_source(self):
         quote = self.generator.generate({})
 
@@ -21,12 +30,12 @@ class TestQuoteGenerator(unittest.TestCase):
 
 
     def test_generate_single_choice(self):
-        transitions = {
+        transitions = self.make_transitions({
             ("the", "cat") : ["sat"],
             ("cat", "sat") : ["on"],
             ("sat", "on") : ["the"],
             ("on", "the") : ["mat"],
-        }
+        })
         self.rand.rand_index.return_value = 0
 
         quote = self.generator.generate(transitions)
@@ -34,13 +43,72 @@ class TestQuoteGenerator(unittest.TestCase):
         self.assertEqual(quote, ["the", "cat", "sat", "on", "the", "mat"])
 
 
+    def test_generate_single_lookup_per_token(self):
+        table = self.make_transitions({
+            ("the", "cat") : ["sat"],
+            ("cat", "sat") : ["on"],
+        })
+        transitions = Mock()
+        transitions.get.side_effect = table.get
+        self.rand.rand_index.return_value = 0
+
+        quote = self.generator.generate_from_initial(transitions, ("the", "cat"))
+
+        self.assertEqual(quote, ["the", "cat", "sat", "on"])
+        self.assertEqual([call[0][0] for call in transitions.get.call_args_list], [("the", "cat"), ("cat", "sat"), ("sat", "on")])
+
+
+    def test_generate_random_initial(self):
+        transitions = self.make_transitions({
+            ("the", "cat") : ["sat"],
+            ("cat", "sat") : ["on"],
+            ("sat", "on") : ["the"],
+            ("on", "the") : ["mat"],
+        }, line_starts=[("the", "cat")])
+        self.rand.rand_index.side_effect = [2, 0, 0]
+
+        quote = self.generator.generate(transitions)
+
+        self.assertEqual(quote, ["sat", "on", "the", "mat"])
+        self.assertEqual(self.rand.rand_index.call_args_list[0][0], (4,))
+
+
+    def test_generate_random_initial_from_line_starts(self):
+        transitions = self.make_transitions({
+            ("the", "cat") : ["sat"],
+            ("cat", "sat") : ["on"],
+            ("sat", "on") : ["the"],
+            ("on", "the") : ["mat"],
+        }, line_starts=[("the", "cat")])
+        self.rand.rand_index.return_value = 0
+        generator = QuoteGenerator(self.rand, from_line_starts=True)
+
+        quote = generator.generate(transitions)
+
+        self.assertEqual(quote, ["the", "cat", "sat", "on", "the", "mat"])
+        self.rand.rand_index.assert_not_called()
+
+
+    def test_generate_random_initial_from_line_starts_none_known(self):
+        transitions = self.make_transitions({
+            ("the", "cat") : ["sat"],
+            ("cat", "sat") : ["on"],
+        })
+        self.rand.rand_index.side_effect = [1, 0]
+        generator = QuoteGenerator(self.rand, from_line_starts=True)
+
+        quote = generator.generate(transitions)
+
+        self.assertEqual(quote, ["cat", "sat", "on"])
+
+
     def test_generate_with_unknown_initial(self):
-        transitions = {
+        transitions = self.make_transitions({
             ("the", "cat") : ["sat"],
             ("cat", "sat") : ["on"],
             ("sat", "on") : ["the"],
             ("on", "the") : ["mat"],
-        }
+        })
         self.rand.rand_index.return_value = 0
 
         quote = self.generator.generate(transitions, ("one", "day"))
@@ -49,12 +117,12 @@ class TestQuoteGenerator(unittest.TestCase):
 
 
     def test_generate_with_overlong_initial(self):
-        transitions = {
+        transitions = self.make_transitions({
             ("the", "cat") : ["sat"],
             ("cat", "sat") : ["on"],
             ("sat", "on") : ["the"],
             ("on", "the") : ["mat"],
-        }
+        })
         self.rand.rand_index.return_value = 0
 
         quote = self.generator.generate(transitions, ("the", "cat", "sat"))
@@ -63,12 +131,12 @@ class TestQuoteGenerator(unittest.TestCase):
 
 
     def test_generate_with_full_valid_initial(self):
-        transitions = {
+        transitions = self.make_transitions({
             ("the", "cat") : ["sat"],
             ("cat", "sat") : ["on"],
             ("sat", "on") : ["the"],
             ("on", "the") : ["mat"],
-        }
+        })
         self.rand.rand_index.return_value = 0
 
         quote = self.generator.generate(transitions, ("sat", "on"))
@@ -77,12 +145,12 @@ class TestQuoteGenerator(unittest.TestCase):
 
 
     def test_generate_with_partial_invalid_initial(self):
-        transitions = {
+        transitions = self.make_transitions({
             ("the", "cat") : ["sat"],
             ("cat", "sat") : ["on"],
             ("sat", "on") : ["the"],
             ("on", "the") : ["mat"],
-        }
+        })
         self.rand.rand_index.return_value = 0
 
         quote = self.generator.generate(transitions, ("blah",))
@@ -91,12 +159,12 @@ class TestQuoteGenerator(unittest.TestCase):
 
 
     def test_generate_with_partial_valid_initial(self):
-        transitions = {
+        transitions = self.make_transitions({
             ("the", "cat") : ["sat"],
             ("cat", "sat") : ["on"],
             ("sat", "on") : ["the"],
             ("on", "the") : ["mat"],
-        }
+        })
         self.rand.rand_index.return_value = 0
 
         quote = self.generator.generate(transitions, ("sat",))
@@ -104,10 +172,26 @@ class TestQuoteGenerator(unittest.TestCase):
         self.assertEqual(quote, ["sat", "on", "the", "mat"])
 
 
+    def test_generate_with_partial_valid_initial_multiple_candidates(self):
+        transitions = self.make_transitions({
+            ("the", "cat") : ["sat"],
+            ("cat", "sat") : ["on"],
+            ("sat", "on") : ["the"],
+            ("on", "the") : ["mat"],
+            ("the", "mat") : ["."],
+        })
+        self.rand.rand_index.side_effect = [1, 0]
+
+        quote = self.generator.generate(transitions, ("the",))
+
+        self.assertEqual(quote, ["the", "mat", "."])
+        self.assertEqual(self.rand.rand_index.call_args_list[0][0], (2,))
+
+
     def test_generate_endless_repetition(self):
-        transitions = {
+        transitions = self.make_transitions({
             ("a", "a") : ["a"],
-        }
+        })
         self.rand.rand_index.return_value = 0
 
         quote = self.generator.generate(transitions)
@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import call, Mock
 
 from quote_request_processor import QuoteDirection, QuoteRequestProcessor
+from vocabulary import Vocabulary
 
 class TestQuoteRequestProcessor(unittest.TestCase):
 
@@ -16,7 +17,10 @@ class TestQuoteRequestProcessor(unittest.TestCase):
         self.generator = Mock()
         self.generator.generate.return_value = ""
 
-        self.processor = QuoteRequestProcessor(self.retriever, self.generator)
+        self.vocabulary = Vocabulary()
+        self.vocabulary.intern_all(["filleann", "an", "feall", "ar", "bhfeallaire", "bíonn", "blas", "mbeagán"])
+
+        self.processor = QuoteRequestProcessor(self.retriever, self.generator, self.vocabulary)
 
 
     def tearDown(self):
@@ -42,25 +46,23 @@ class TestQuoteRequestProcessor(unittest.TestCase):
 
 
     def test_process_generate_request_no_quote(self):
-        self.retriever.get.side_effect = [(["saoi"], self.saoi_transitions), (["saoi"], self.saoi_transitions_reversed)]
+        self.retriever.get_both.return_value = (["saoi"], self.saoi_transitions, self.saoi_transitions_reversed)
         self.generator.generate.side_effect = [[], []]
 
         response = self.processor.process("saoi lá amháin")
 
         self.assertEqual(response, "")
-        self.retriever.get.assert_has_calls([
-            call(["saoi"], reverse=False),
-            call(["saoi"], reverse=True),
-        ])
+        self.retriever.get_both.assert_called_once_with(["saoi"])
+        self.retriever.get.assert_not_called()
         self.generator.generate.assert_has_calls([
-            call(self.saoi_transitions, ("lá", "amháin")),
-            call(self.saoi_transitions_reversed, ("amháin", "lá")),
+            call(self.saoi_transitions, self.vocabulary.encode(("lá", "amháin"))),
+            call(self.saoi_transitions_reversed, self.vocabulary.encode(("amháin", "lá"))),
         ])
 
 
     def test_process_generate_request_valid_no_whitespace(self):
         self.retriever.get.return_value = (["saoi"], self.saoi_transitions)
-        self.generator.generate.return_value = ["feall", "ar", "an", "bhfeallaire"]
+        self.generator.generate.return_value = self.vocabulary.intern_all(["feall", "ar", "an", "bhfeallaire"])
 
         response = self.processor.process("saoi")
 
@@ -71,7 +73,7 @@ class TestQuoteRequestProcessor(unittest.TestCase):
 
     def test_process_generate_request_valid_with_whitespace(self):
         self.retriever.get.return_value = (["saoi"], self.saoi_transitions)
-        self.generator.generate.return_value = ["feall", "ar", "an", "bhfeallaire"]
+        self.generator.generate.return_value = self.vocabulary.intern_all(["feall", "ar", "an", "bhfeallaire"])
 
         response = self.processor.process("     saoi")
 
@@ -82,7 +84,7 @@ class TestQuoteRequestProcessor(unittest.TestCase):
 
     def test_process_generate_request_valid_aliased(self):
         self.retriever.get.return_value = (["saoi"], self.saoi_transitions)
-        self.generator.generate.return_value = ["feall", "ar", "an", "bhfeallaire"]
+        self.generator.generate.return_value = self.vocabulary.intern_all(["feall", "ar", "an", "bhfeallaire"])
 
         response = self.processor.process("saoi_")
 
@@ -93,7 +95,7 @@ class TestQuoteRequestProcessor(unittest.TestCase):
 
     def test_process_generate_request_valid_uppercase(self):
         self.retriever.get.return_value = (["saoi"], self.saoi_transitions)
-        self.generator.generate.return_value = ["feall", "ar", "an", "bhfeallaire"]
+        self.generator.generate.return_value = self.vocabulary.intern_all(["feall", "ar", "an", "bhfeallaire"])
 
         response = self.processor.process("SAOI")
 
@@ -102,77 +104,79 @@ class TestQuoteRequestProcessor(unittest.TestCase):
         self.generator.generate.assert_called_once_with(self.saoi_transitions, ())
 
 
+    def test_process_records_generation_latency(self):
+        self.retriever.get.return_value = (["saoi"], self.saoi_transitions)
+        self.generator.generate.return_value = self.vocabulary.intern_all(["feall", "ar", "an", "bhfeallaire"])
+
+        self.processor.process("saoi")
+        self.processor.process("saoi")
+
+        self.assertEqual(len(self.processor.generation_latency), 2)
+
+
     def test_process_generate_request_valid_with_seed_single(self):
-        self.retriever.get.side_effect = [(["saoi"], self.saoi_transitions), (["saoi"], self.saoi_transitions_reversed)]
-        self.generator.generate.side_effect = [["ar", "an", "bhfeallaire"], ["ar", "feall"]]
+        self.retriever.get_both.return_value = (["saoi"], self.saoi_transitions, self.saoi_transitions_reversed)
+        self.generator.generate.side_effect = [self.vocabulary.intern_all(["ar", "an", "bhfeallaire"]), self.vocabulary.intern_all(["ar", "feall"])]
 
         response = self.processor.process("saoi ar")
 
         self.assertEqual(response, "[saoi] feall \x02\x038ar\x0f an bhfeallaire")
-        self.retriever.get.assert_has_calls([
-            call(["saoi"], reverse=False),
-            call(["saoi"], reverse=True),
-        ])
+        self.retriever.get_both.assert_called_once_with(["saoi"])
+        self.retriever.get.assert_not_called()
         self.generator.generate.assert_has_calls([
-            call(self.saoi_transitions, ("ar",)),
-            call(self.saoi_transitions_reversed, ("ar",)),
+            call(self.saoi_transitions, self.vocabulary.encode(("ar",))),
+            call(self.saoi_transitions_reversed, self.vocabulary.encode(("ar",))),
         ])
 
 
     def test_process_generate_request_valid_with_seed_double(self):
-        self.retriever.get.side_effect = [(["saoi"], self.saoi_transitions), (["saoi"], self.saoi_transitions_reversed)]
-        self.generator.generate.side_effect = [["ar", "an", "bhfeallaire"], ["an", "ar", "feall"]]
+        self.retriever.get_both.return_value = (["saoi"], self.saoi_transitions, self.saoi_transitions_reversed)
+        self.generator.generate.side_effect = [self.vocabulary.intern_all(["ar", "an", "bhfeallaire"]), self.vocabulary.intern_all(["an", "ar", "feall"])]
 
         response = self.processor.process("saoi ar an")
 
         self.assertEqual(response, "[saoi] feall \x02\x038ar an\x0f bhfeallaire")
-        self.retriever.get.assert_has_calls([
-            call(["saoi"], reverse=False),
-            call(["saoi"], reverse=True),
-        ])
+        self.retriever.get_both.assert_called_once_with(["saoi"])
+        self.retriever.get.assert_not_called()
         self.generator.generate.assert_has_calls([
-            call(self.saoi_transitions, ("ar", "an")),
-            call(self.saoi_transitions_reversed, ("an", "ar")),
+            call(self.saoi_transitions, self.vocabulary.encode(("ar", "an"))),
+            call(self.saoi_transitions_reversed, self.vocabulary.encode(("an", "ar"))),
         ])
 
 
     def test_process_generate_request_valid_with_seed_only_startswith(self):
-        self.retriever.get.side_effect = [(["saoi"], self.saoi_transitions), (["saoi"], self.saoi_transitions_reversed)]
-        self.generator.generate.side_effect = [["ar", "an", "bhfeallaire"], []]
+        self.retriever.get_both.return_value = (["saoi"], self.saoi_transitions, self.saoi_transitions_reversed)
+        self.generator.generate.side_effect = [self.vocabulary.intern_all(["ar", "an", "bhfeallaire"]), []]
 
         response = self.processor.process("saoi ar an")
 
         self.assertEqual(response, "[saoi] \x02\x038ar an\x0f bhfeallaire")
-        self.retriever.get.assert_has_calls([
-            call(["saoi"], reverse=False),
-            call(["saoi"], reverse=True),
-        ])
+        self.retriever.get_both.assert_called_once_with(["saoi"])
+        self.retriever.get.assert_not_called()
         self.generator.generate.assert_has_calls([
-            call(self.saoi_transitions, ("ar", "an")),
-            call(self.saoi_transitions_reversed, ("an", "ar")),
+            call(self.saoi_transitions, self.vocabulary.encode(("ar", "an"))),
+            call(self.saoi_transitions_reversed, self.vocabulary.encode(("an", "ar"))),
         ])
 
 
     def test_process_generate_request_valid_with_seed_only_endswith(self):
-        self.retriever.get.side_effect = [(["saoi"], self.saoi_transitions), (["saoi"], self.saoi_transitions_reversed)]
-        self.generator.generate.side_effect = [[], ["an", "ar", "feall"]]
+        self.retriever.get_both.return_value = (["saoi"], self.saoi_transitions, self.saoi_transitions_reversed)
+        self.generator.generate.side_effect = [[], self.vocabulary.intern_all(["an", "ar", "feall"])]
 
         response = self.processor.process("saoi ar an")
 
         self.assertEqual(response, "[saoi] feall \x02\x038ar an\x0f")
-        self.retriever.get.assert_has_calls([
-            call(["saoi"], reverse=False),
-            call(["saoi"], reverse=True),
-        ])
+        self.retriever.get_both.assert_called_once_with(["saoi"])
+        self.retriever.get.assert_not_called()
         self.generator.generate.assert_has_calls([
-            call(self.saoi_transitions, ("ar", "an")),
-            call(self.saoi_transitions_reversed, ("an", "ar")),
+            call(self.saoi_transitions, self.vocabulary.encode(("ar", "an"))),
+            call(self.saoi_transitions_reversed, self.vocabulary.encode(("an", "ar"))),
         ])
 
 
     def test_process_generate_request_valid_merge(self):
         self.retriever.get.return_value = (["eolaí", "saoi"], self.eolai_saoi_transitions)
-        self.generator.generate.return_value = ["bíonn", "blas", "ar", "an", "bhfeallaire"]
+        self.generator.generate.return_value = self.vocabulary.intern_all(["bíonn", "blas", "ar", "an", "bhfeallaire"])
 
         response = self.processor.process("eolaí:saoi")
 
@@ -183,24 +187,66 @@ class TestQuoteRequestProcessor(unittest.TestCase):
 
     def test_process_generate_request_valid_forward(self):
         self.retriever.get.return_value = (["saoi"], self.saoi_transitions)
-        self.generator.generate.return_value = ["filleann", "an", "feall", "ar", "an", "bhfeallaire"]
+        self.generator.generate.return_value = self.vocabulary.intern_all(["filleann", "an", "feall", "ar", "an", "bhfeallaire"])
 
         response = self.processor.process("saoi filleann an", options={"direction" : QuoteDirection.FORWARD})
 
         self.assertEqual(response, "[saoi] \x02\x038filleann an\x0f feall ar an bhfeallaire")
         self.retriever.get.assert_called_once_with(["saoi"], reverse=False)
-        self.generator.generate.assert_called_once_with(self.saoi_transitions, ("filleann", "an"))
+        self.generator.generate.assert_called_once_with(self.saoi_transitions, self.vocabulary.encode(("filleann", "an")))
 
 
     def test_process_generate_request_valid_reverse(self):
         self.retriever.get.return_value = (["saoi"], self.saoi_transitions_reversed)
-        self.generator.generate.return_value = ["bhfeallaire", "an", "ar", "feall", "an", "filleann"]
+        self.generator.generate.return_value = self.vocabulary.intern_all(["bhfeallaire", "an", "ar", "feall", "an", "filleann"])
 
         response = self.processor.process("saoi an bhfeallaire", options={"direction" : QuoteDirection.REVERSE})
 
         self.assertEqual(response, "[saoi] filleann an feall ar \x02\x038an bhfeallaire\x0f")
         self.retriever.get.assert_called_once_with(["saoi"], reverse=True)
-        self.generator.generate.assert_called_once_with(self.saoi_transitions_reversed, ("bhfeallaire", "an"))
+        self.generator.generate.assert_called_once_with(self.saoi_transitions_reversed, self.vocabulary.encode(("bhfeallaire", "an")))
+
+
+    def test_process_generate_request_from_reservoir(self):
+        reservoir = Mock()
+        reservoir.pop.return_value = self.vocabulary.encode(("filleann", "an", "feall", "ar", "an", "bhfeallaire"))
+        self.retriever.resolve_speaker_names.return_value = ["saoi"]
+        processor = QuoteRequestProcessor(self.retriever, self.generator, self.vocabulary, reservoir=reservoir)
+
+        response = processor.process("saoi")
+
+        self.assertEqual(response, "[saoi] filleann an feall ar an bhfeallaire")
+        self.retriever.resolve_speaker_names.assert_called_once_with(["saoi"])
+        reservoir.pop.assert_called_once_with(["saoi"])
+        self.retriever.record_popularity.assert_called_once_with(["saoi"], False)
+        self.retriever.get.assert_not_called()
+        self.generator.generate.assert_not_called()
+
+
+    def test_process_generate_request_reservoir_empty(self):
+        reservoir = Mock()
+        reservoir.pop.return_value = None
+        self.retriever.resolve_speaker_names.return_value = ["saoi"]
+        self.retriever.get.return_value = (["saoi"], self.saoi_transitions)
+        self.generator.generate.return_value = self.vocabulary.encode(("filleann", "an", "feall"))
+        processor = QuoteRequestProcessor(self.retriever, self.generator, self.vocabulary, reservoir=reservoir)
+
+        response = processor.process("saoi")
+
+        self.assertEqual(response, "[saoi] filleann an feall")
+        self.retriever.get.assert_called_once_with(["saoi"], reverse=False)
+        self.retriever.record_popularity.assert_not_called()
+
+
+    def test_process_generate_request_seeded_skips_reservoir(self):
+        reservoir = Mock()
+        self.retriever.get_both.return_value = (["saoi"], self.saoi_transitions, self.saoi_transitions_reversed)
+        self.generator.generate.side_effect = [[], []]
+        processor = QuoteRequestProcessor(self.retriever, self.generator, self.vocabulary, reservoir=reservoir)
+
+        processor.process("saoi an feall")
+
+        reservoir.pop.assert_not_called()
 
 
 if __name__ == "__main__":
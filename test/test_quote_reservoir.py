@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import Mock
+
+from quote_reservoir import QuoteReservoir
+
+class TestQuoteReservoir(unittest.TestCase):
+
+    def setUp(self):
+        self.saoi_transitions = {("is", "binn") : ["béal"], ("binn", "béal") : ["ina"]}
+        self.eolai_saoi_transitions = {("is", "leor") : ["nod"], ("leor", "nod") : ["don"]}
+        self.transition_retriever = Mock()
+        self.transition_retriever.get_by_name.return_value = self.saoi_transitions
+        self.transition_retriever.get_merged.return_value = self.eolai_saoi_transitions
+        self.generator = Mock()
+        self.generator.generate.side_effect = [["is", "binn", "béal", str(i)] for i in range(10)]
+        self.popularity = Mock()
+        self.popularity.most_popular.return_value = [(["saoi"], False), (["saoi"], True), (["eolaí", "saoi"], False)]
+        self.reservoir = QuoteReservoir(self.transition_retriever, self.generator, self.popularity, size=2, entry_count=3)
+
+
+    def tearDown(self):
+        pass
+
+
+    def test_pop_empty(self):
+        self.assertIsNone(self.reservoir.pop(["saoi"]))
+
+
+    def test_refill(self):
+        filled = self.reservoir.refill()
+
+        self.assertEqual(filled, [["saoi"], ["eolaí", "saoi"]])
+        self.popularity.most_popular.assert_called_once_with(3)
+        self.transition_retriever.get_by_name.assert_called_once_with("saoi", False)
+        self.transition_retriever.get_merged.assert_called_once_with(["eolaí", "saoi"], False)
+        self.generator.generate.assert_any_call(self.saoi_transitions)
+        self.generator.generate.assert_any_call(self.eolai_saoi_transitions)
+        self.assertEqual(self.reservoir.pop(["saoi"]), ["is", "binn", "béal", "0"])
+        self.assertEqual(self.reservoir.pop(["saoi"]), ["is", "binn", "béal", "1"])
+        self.assertIsNone(self.reservoir.pop(["saoi"]))
+        self.assertEqual(self.reservoir.pop(["eolaí", "saoi"]), ["is", "binn", "béal", "2"])
+
+
+    def test_refill_tops_up(self):
+        self.reservoir.refill()
+        self.reservoir.pop(["saoi"])
+
+        self.assertEqual(self.reservoir.refill(), [["saoi"]])
+
+        self.assertEqual(self.generator.generate.call_count, 5)
+        self.assertEqual(self.reservoir.pop(["saoi"]), ["is", "binn", "béal", "1"])
+        self.assertEqual(self.reservoir.pop(["saoi"]), ["is", "binn", "béal", "4"])
+
+
+    def test_refill_no_quotes(self):
+        self.generator.generate.side_effect = None
+        self.generator.generate.return_value = []
+
+        self.assertEqual(self.reservoir.refill(), [])
+        self.assertIsNone(self.reservoir.pop(["saoi"]))
+
+
+    def test_invalidate(self):
+        self.reservoir.refill()
+
+        self.reservoir.invalidate(["eolaí"])
+
+        self.assertIsNone(self.reservoir.pop(["eolaí", "saoi"]))
+        self.assertEqual(self.reservoir.pop(["saoi"]), ["is", "binn", "béal", "0"])
+
+
+    def test_clear(self):
+        self.reservoir.refill()
+
+        self.reservoir.clear()
+
+        self.assertIsNone(self.reservoir.pop(["saoi"]))
+        self.assertIsNone(self.reservoir.pop(["eolaí", "saoi"]))
+
+
+    def test_refill_discarded_after_invalidate(self):
+        def generate(transitions):
+            self.reservoir.invalidate(["saoi"])
+            return ["is", "binn", "béal"]
+        self.generator.generate.side_effect = generate
+
+        self.reservoir.refill()
+
+        self.assertIsNone(self.reservoir.pop(["saoi"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import unittest
+from unittest.mock import Mock
+
+from twisted.internet import defer, task
+from twisted.python.failure import Failure
+
+from request_dispatcher import RequestDispatcher
+
+class FakeReactor(task.Clock):
+
+    def callWhenRunning(self, f, *args, **kwargs):
+        pass
+
+
+    def addSystemEventTrigger(self, phase, event_type, f, *args, **kwargs):
+        pass
+
+
+    def callFromThread(self, f, *args, **kwargs):
+        f(*args, **kwargs)
+
+
+class FakeThreadPool:
+
+    def __init__(self):
+        self.queued = []
+
+
+    def callInThreadWithCallback(self, on_result, f, *args, **kwargs):
+        self.queued.append((on_result, f, args, kwargs))
+
+
+    def run_all(self):
+        queued, self.queued = self.queued, []
+        for on_result, f, args, kwargs in queued:
+            try:
+                result = f(*args, **kwargs)
+            except Exception:
+                on_result(False, Failure())
+            else:
+                on_result(True, result)
+
+
+class TestRequestDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.reactor = FakeReactor()
+        self.pool = FakeThreadPool()
+        self.handler = Mock()
+        self.handler.handle.return_value = "[saoi] is binn béal ina thost"
+        self.dispatcher = RequestDispatcher(self.reactor, pool_size=2, timeout=5, max_pending=2)
+        self.dispatcher.pool = self.pool
+
+
+    def tearDown(self):
+        pass
+
+
+    def results_of(self, deferred):
+        results = []
+        deferred.addBoth(results.append)
+        return results
+
+
+    def test_dispatch(self):
+        results = self.results_of(self.dispatcher.dispatch(self.handler, "!saoi"))
+
+        self.assertEqual(results, [])
+        self.assertEqual(self.dispatcher.pending, 1)
+        self.handler.handle.assert_not_called()
+
+        self.pool.run_all()
+
+        self.assertEqual(results, ["[saoi] is binn béal ina thost"])
+        self.assertEqual(self.dispatcher.pending, 0)
+        self.handler.handle.assert_called_once_with("!saoi")
+
+
+    def test_dispatch_too_many_pending(self):
+        self.dispatcher.dispatch(self.handler, "!saoi")
+        self.dispatcher.dispatch(self.handler, "!fáidh")
+
+        results = self.results_of(self.dispatcher.dispatch(self.handler, "!eolaí"))
+
+        self.assertEqual(results, [""])
+        self.assertEqual(len(self.pool.queued), 2)
+
+
+    def test_dispatch_timeout(self):
+        results = self.results_of(self.dispatcher.dispatch(self.handler, "!saoi"))
+
+        self.reactor.advance(6)
+
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0].check(defer.TimeoutError))
+        self.assertEqual(self.dispatcher.pending, 1)
+
+        self.pool.run_all()
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(self.dispatcher.pending, 0)
+
+
+    def test_dispatch_error(self):
+        self.handler.handle.side_effect = ValueError("raiméis")
+
+        results = self.results_of(self.dispatcher.dispatch(self.handler, "!saoi"))
+        self.pool.run_all()
+
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0].check(ValueError))
+        self.assertEqual(self.dispatcher.pending, 0)
+
+
+    def test_repeat(self):
+        function = Mock(return_value=["saoi"])
+
+        call = self.dispatcher.repeat(10, function)
+
+        self.assertEqual(self.pool.queued, [])
+        self.reactor.advance(10)
+        self.assertEqual(len(self.pool.queued), 1)
+        self.reactor.advance(10)
+        self.assertEqual(len(self.pool.queued), 1)
+        self.pool.run_all()
+        self.reactor.advance(10)
+        self.assertEqual(len(self.pool.queued), 1)
+        self.pool.run_all()
+        self.assertEqual(function.call_count, 2)
+
+        call.stop()
+        self.reactor.advance(10)
+        self.assertEqual(self.pool.queued, [])
+
+
+    def test_repeat_idle_only(self):
+        function = Mock(return_value=["saoi"])
+        self.dispatcher.repeat(10, function, idle_only=True)
+        results = self.results_of(self.dispatcher.dispatch(self.handler, "!saoi"))
+
+        self.reactor.advance(10)
+        self.assertEqual(len(self.pool.queued), 1)
+        self.pool.run_all()
+        self.handler.handle.assert_called_once_with("!saoi")
+        self.assertTrue(results[0].check(defer.TimeoutError))
+        function.assert_not_called()
+
+        self.reactor.advance(10)
+        self.pool.run_all()
+        function.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
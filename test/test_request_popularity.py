@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from request_popularity import RequestPopularity
+
+class TestRequestPopularity(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, ".compiled", "popularity.lst")
+        self.popularity = RequestPopularity(self.path, max_entries=3)
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def test_empty(self):
+        self.assertEqual(self.popularity.most_popular(5), [])
+
+
+    def test_most_popular(self):
+        self.popularity.record(["saoi"], False)
+        self.popularity.record(["eolaí", "saoi"], False)
+        self.popularity.record(["saoi"], False)
+        self.popularity.record(["saoi"], True)
+        self.popularity.record(["eolaí", "saoi"], False)
+        self.popularity.record(["saoi"], False)
+
+        self.assertEqual(self.popularity.most_popular(5), [(["saoi"], False), (["eolaí", "saoi"], False), (["saoi"], True)])
+        self.assertEqual(self.popularity.most_popular(1), [(["saoi"], False)])
+
+
+    def test_save_and_load(self):
+        self.popularity.record(["saoi"], False)
+        self.popularity.record(["saoi"], False)
+        self.popularity.record(["eolaí", "saoi"], True)
+        self.popularity.record(["fáidh"], False)
+        self.popularity.record(["fáidh"], False)
+        self.popularity.record(["draoi"], False)
+
+        saved = self.popularity.save()
+        loaded = RequestPopularity(self.path)
+
+        self.assertTrue(saved)
+        self.assertEqual(loaded.most_popular(5), [(["fáidh"], False), (["saoi"], False), (["draoi"], False)])
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["popularity.lst"])
+
+
+    def test_save_leaves_source_dir_unchanged(self):
+        self.popularity.record(["saoi"], False)
+        os.makedirs(os.path.dirname(self.path))
+        mtime = os.stat(self.temp_dir.name).st_mtime_ns
+
+        self.popularity.save()
+        self.popularity.save()
+
+        self.assertEqual(os.stat(self.temp_dir.name).st_mtime_ns, mtime)
+        self.assertEqual(os.listdir(self.temp_dir.name), [".compiled"])
+
+
+    def test_load_ignores_invalid_lines(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w", encoding="utf8") as popularity_file:
+            popularity_file.write("saoi f 4\nraiméis\neolaí x 2\nfáidh r lá\neolaí:saoi r 3\n")
+
+        popularity = RequestPopularity(self.path)
+
+        self.assertEqual(popularity.most_popular(5), [(["saoi"], False), (["eolaí", "saoi"], True)])
+
+
+    def test_save_unwritable(self):
+        with open(os.path.join(self.temp_dir.name, "anaithnid"), "w", encoding="utf8"):
+            pass
+        popularity = RequestPopularity(os.path.join(self.temp_dir.name, "anaithnid", "popularity.lst"))
+        popularity.record(["saoi"], False)
+
+        self.assertFalse(popularity.save())
+
+
+if __name__ == "__main__":
+    unittest.main()
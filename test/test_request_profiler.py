@@ -0,0 +1,109 @@
+import os
+import pstats
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from request_profiler import RequestProfiler
+
+class TestRequestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir_path = os.path.join(self.temp_dir.name, ".profiles")
+        self.profiler = RequestProfiler(self.dir_path, every=0, threshold=0)
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def process(self, request, options):
+        return request + options["suffix"]
+
+
+    def list_dumps(self, extension):
+        if not os.path.isdir(self.dir_path):
+            return []
+        return sorted(file_name for file_name in os.listdir(self.dir_path) if file_name.endswith(extension))
+
+
+    def test_disabled(self):
+        self.assertEqual(self.profiler.run(self.process, "saoi", {"suffix" : "!"}), "saoi!")
+
+        self.assertFalse(self.profiler.is_enabled())
+        self.assertEqual(self.profiler.request_count, 0)
+        self.assertFalse(os.path.exists(self.dir_path))
+
+
+    def test_every(self):
+        self.profiler.configure(every=2)
+
+        results = [self.profiler.run(self.process, request, {"suffix" : "!"}) for request in ["saoi", "eolaí", "fáidh", "file"]]
+
+        self.assertEqual(results, ["saoi!", "eolaí!", "fáidh!", "file!"])
+        self.assertEqual(len(self.list_dumps(".prof")), 2)
+        request_dumps = self.list_dumps(".txt")
+        self.assertEqual(len(request_dumps), 2)
+        with open(os.path.join(self.dir_path, request_dumps[0]), encoding="utf8") as request_file:
+            self.assertEqual(request_file.readline(), "eolaí\n")
+        stats = pstats.Stats(os.path.join(self.dir_path, self.list_dumps(".prof")[0]))
+        self.assertTrue(any(function_name == "process" for _, _, function_name in stats.stats))
+
+
+    @patch("time.perf_counter")
+    def test_threshold(self, perf_counter):
+        self.profiler.configure(threshold=1.5)
+        perf_counter.side_effect = [0, 1, 10, 12]
+
+        self.profiler.run(self.process, "saoi", {"suffix" : "!"})
+        self.profiler.run(self.process, "eolaí", {"suffix" : "!"})
+
+        request_dumps = self.list_dumps(".txt")
+        self.assertEqual(len(request_dumps), 1)
+        with open(os.path.join(self.dir_path, request_dumps[0]), encoding="utf8") as request_file:
+            self.assertEqual(request_file.read(), "eolaí\n2.000000\n")
+
+
+    def test_minimum_threshold(self):
+        self.profiler.configure(threshold=0.000001)
+
+        self.assertEqual(self.profiler.threshold, 0.5)
+
+
+    def test_keeps_latest_dumps(self):
+        self.profiler.max_dumps = 2
+        self.profiler.configure(every=1)
+
+        for request in ["saoi", "eolaí", "fáidh", "file"]:
+            self.profiler.run(self.process, request, {"suffix" : "!"})
+
+        self.assertEqual(len(self.list_dumps(".prof")), 2)
+        request_dumps = self.list_dumps(".txt")
+        self.assertEqual(len(request_dumps), 2)
+        requests = []
+        for request_dump in request_dumps:
+            with open(os.path.join(self.dir_path, request_dump), encoding="utf8") as request_file:
+                requests.append(request_file.readline())
+        self.assertEqual(sorted(requests), ["file\n", "fáidh\n"])
+
+
+    def test_exception(self):
+        self.profiler.configure(every=1)
+
+        with self.assertRaises(KeyError):
+            self.profiler.run(self.process, "saoi", {})
+
+        self.assertEqual(len(self.list_dumps(".prof")), 1)
+
+
+    def test_unwritable(self):
+        self.profiler.dir_path = os.path.join(self.temp_dir.name, "file")
+        open(self.profiler.dir_path, "w").close()
+        self.profiler.configure(every=1)
+
+        self.assertEqual(self.profiler.run(self.process, "saoi", {"suffix" : "!"}), "saoi!")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from request_tracer import RequestTracer
+
+class TestRequestTracer(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer = RequestTracer(buckets=[0.01, 0.1, 1])
+
+
+    def tearDown(self):
+        pass
+
+
+    def test_render_empty(self):
+        self.assertEqual(self.tracer.render(),
+            "# HELP pasadoir_stage_seconds Time spent in each stage of handling a request.\n"
+            + "# TYPE pasadoir_stage_seconds histogram\n")
+
+
+    def test_observe(self):
+        self.tracer.observe("build", 0.5)
+        self.tracer.observe("build", 2)
+        self.tracer.observe("build", 0.1)
+        self.tracer.observe("lookup", 0.001)
+
+        self.assertEqual(self.tracer.render().splitlines()[2:], [
+            'pasadoir_stage_seconds_bucket{stage="build",le="0.01"} 0',
+            'pasadoir_stage_seconds_bucket{stage="build",le="0.1"} 1',
+            'pasadoir_stage_seconds_bucket{stage="build",le="1"} 2',
+            'pasadoir_stage_seconds_bucket{stage="build",le="+Inf"} 3',
+            'pasadoir_stage_seconds_sum{stage="build"} 2.6',
+            'pasadoir_stage_seconds_count{stage="build"} 3',
+            'pasadoir_stage_seconds_bucket{stage="lookup",le="0.01"} 1',
+            'pasadoir_stage_seconds_bucket{stage="lookup",le="0.1"} 1',
+            'pasadoir_stage_seconds_bucket{stage="lookup",le="1"} 1',
+            'pasadoir_stage_seconds_bucket{stage="lookup",le="+Inf"} 1',
+            'pasadoir_stage_seconds_sum{stage="lookup"} 0.001',
+            'pasadoir_stage_seconds_count{stage="lookup"} 1',
+        ])
+
+
+    def test_stage(self):
+        with self.tracer.stage("format"):
+            pass
+
+        self.assertEqual(self.tracer.histograms["format"].count, 1)
+
+
+    def test_stage_error(self):
+        with self.assertRaises(ValueError):
+            with self.tracer.stage("build"):
+                raise ValueError("raiméis")
+
+        self.assertEqual(self.tracer.histograms["build"].count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
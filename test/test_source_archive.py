@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+
+from source_archive import SourceArchive, pack_sources
+from source_retriever import SourceRetriever
+
+class TestSourceArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.temp_dir.name, "foinsí")
+        os.makedirs(self.source_dir)
+        self.write("saoi.src", "is binn béal ina thost\r\nis leor nod don eolach\n")
+        self.write("eolaí.src", "bíonn gach tosú lag")
+        self.write("folamh.src", "")
+        self.write("merge.lst", "saoi\tsaoi__\n")
+        self.write("source.info", "date=695280768\n")
+        self.write("nótaí.txt", "ní foinse é seo\n")
+        self.archive_path = os.path.join(self.source_dir, "sources.pack")
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def write(self, filename, content):
+        with open(os.path.join(self.source_dir, filename), "wb") as source_file:
+            source_file.write(content.encode("utf8"))
+
+
+    def test_missing(self):
+        archive = SourceArchive(self.archive_path)
+
+        self.assertFalse(archive.refresh())
+        self.assertEqual(archive.list_filenames(), [])
+        self.assertEqual(archive.retrieve("saoi.src"), [])
+        self.assertIsNone(archive.get_signature("saoi.src"))
+
+
+    def test_corrupt(self):
+        with open(self.archive_path, "wb") as archive_file:
+            archive_file.write("ní cartlann í seo ar chor ar bith".encode("utf8"))
+
+        self.assertFalse(SourceArchive(self.archive_path).refresh())
+
+
+    def test_pack_and_retrieve(self):
+        self.assertEqual(pack_sources(self.source_dir, self.archive_path), 5)
+        archive = SourceArchive(self.archive_path)
+
+        self.assertTrue(archive.refresh())
+        self.assertEqual(sorted(archive.list_filenames()), ["eolaí.src", "folamh.src", "merge.lst", "saoi.src", "source.info"])
+        self.assertEqual(list(archive.retrieve("saoi.src")), ["is binn béal ina thost\n", "is leor nod don eolach\n"])
+        self.assertEqual(list(archive.retrieve("eolaí.src")), ["bíonn gach tosú lag"])
+        self.assertFalse(archive.retrieve("folamh.src"))
+        self.assertEqual(archive.get_signature("saoi.src")[0], len("is binn béal ina thost\r\nis leor nod don eolach\n".encode("utf8")))
+
+
+    def test_signature_survives_repack(self):
+        pack_sources(self.source_dir, self.archive_path)
+        archive = SourceArchive(self.archive_path)
+        archive.refresh()
+        saoi_signature = archive.get_signature("saoi.src")
+        eolai_signature = archive.get_signature("eolaí.src")
+        lines = archive.retrieve("saoi.src")
+
+        self.write("eolaí.src", "bíonn gach tosú lug")
+        self.write("aosánach.src", "níl aon tinteán mar do thinteán féin\n")
+        pack_sources(self.source_dir, self.archive_path)
+        archive.refresh()
+
+        self.assertEqual(archive.get_signature("saoi.src"), saoi_signature)
+        self.assertNotEqual(archive.get_signature("eolaí.src"), eolai_signature)
+        self.assertIn("aosánach.src", archive.list_filenames())
+        self.assertEqual(list(lines), ["is binn béal ina thost\n", "is leor nod don eolach\n"])
+
+
+    def test_source_retriever(self):
+        pack_sources(self.source_dir, self.archive_path)
+        for filename in ["saoi.src", "eolaí.src", "folamh.src", "merge.lst", "source.info"]:
+            os.remove(os.path.join(self.source_dir, filename))
+        retriever = SourceRetriever(self.source_dir)
+
+        self.assertEqual(sorted(retriever.list_speakers()), ["eolaí", "folamh", "saoi"])
+        self.assertEqual(retriever.get_merge_info(), ["saoi\tsaoi__\n"])
+        self.assertEqual(retriever.get_source_info(), ["date=695280768\n"])
+        self.assertEqual(list(retriever.retrieve("saoi")), ["is binn béal ina thost\n", "is leor nod don eolach\n"])
+        self.assertEqual(retriever.retrieve("anaithnid"), [])
+        self.assertIsNone(retriever.get_signature("anaithnid"))
+        retriever.set_offset("saoi", 0)
+        self.assertEqual(retriever.retrieve_appended("saoi"), [])
+
+
+    def test_source_retriever_switches_on_refresh(self):
+        retriever = SourceRetriever(self.source_dir)
+        directory_signature = retriever.get_signature("saoi")
+
+        pack_sources(self.source_dir, self.archive_path)
+        self.assertEqual(retriever.get_signature("saoi"), directory_signature)
+        retriever.refresh()
+
+        self.assertNotEqual(retriever.get_signature("saoi"), directory_signature)
+        os.remove(self.archive_path)
+        retriever.refresh()
+        self.assertEqual(retriever.get_signature("saoi"), directory_signature)
+
+
+if __name__ == "__main__":
+    unittest.main()
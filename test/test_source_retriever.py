@@ -0,0 +1,194 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from source_retriever import SourceRetriever
+
+class TestSourceRetriever(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.retriever = SourceRetriever(self.temp_dir.name)
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def write(self, speaker_name, content, mode="w"):
+        with open(os.path.join(self.temp_dir.name, speaker_name + ".src"), mode + "b") as source_file:
+            source_file.write(content.encode("utf8"))
+
+
+    def test_retrieve_missing(self):
+        self.assertEqual(self.retriever.retrieve("anaithnid"), [])
+        self.assertEqual(self.retriever.retrieve_appended("anaithnid"), [])
+
+
+    def test_retrieve_records_offset(self):
+        self.write("saoi", "is binn béal ina thost\r\nis leor nod don eolach\n")
+
+        lines = self.retriever.retrieve("saoi")
+
+        self.assertEqual(list(lines), ["is binn béal ina thost\n", "is leor nod don eolach\n"])
+        self.assertEqual(self.retriever.offsets["saoi"].offset, len("is binn béal ina thost\r\nis leor nod don eolach\n".encode("utf8")))
+
+
+    def test_retrieve_without_recording_offset(self):
+        self.write("saoi", "is binn béal ina thost\n")
+
+        lines = self.retriever.retrieve("saoi", record_offset=False)
+
+        self.assertEqual(list(lines), ["is binn béal ina thost\n"])
+        self.assertNotIn("saoi", self.retriever.offsets)
+
+
+    def test_retrieve_streams(self):
+        self.write("saoi", "is binn béal ina thost\ris leor nod don eolach\n")
+
+        lines = self.retriever.retrieve("saoi")
+
+        self.assertTrue(lines)
+        self.assertEqual(next(iter(lines)), "is binn béal ina thost\n")
+        self.assertEqual(list(lines), ["is binn béal ina thost\n", "is leor nod don eolach\n"])
+
+
+    def test_retrieve_stops_before_partial_line(self):
+        self.write("saoi", "is binn béal ina thost\nis leor nod")
+
+        lines = self.retriever.retrieve("saoi")
+
+        self.assertEqual(list(lines), ["is binn béal ina thost\n"])
+        lines.use_mmap = False
+        self.assertEqual(list(lines), ["is binn béal ina thost\n"])
+        self.assertEqual(self.retriever.offsets["saoi"].offset, len("is binn béal ina thost\n".encode("utf8")))
+        self.write("saoi", " don eolach\n", mode="a")
+        self.assertEqual(self.retriever.retrieve_appended("saoi"), ["is leor nod don eolach\n"])
+
+
+    def test_retrieve_partial_line_only(self):
+        self.write("saoi", "is binn béal ina thost")
+
+        lines = self.retriever.retrieve("saoi")
+
+        self.assertFalse(lines)
+        self.assertEqual(self.retriever.offsets["saoi"].offset, 0)
+        self.write("saoi", "\n", mode="a")
+        self.assertEqual(self.retriever.retrieve_appended("saoi"), ["is binn béal ina thost\n"])
+
+
+    def test_retrieve_without_mmap(self):
+        self.write("saoi", "is binn béal ina thost\r\nis leor nod don eolach\n")
+
+        lines = self.retriever.retrieve("saoi")
+        lines.use_mmap = False
+
+        self.assertEqual(list(lines), ["is binn béal ina thost\n", "is leor nod don eolach\n"])
+
+
+    def test_retrieve_stops_at_offset(self):
+        self.write("saoi", "is binn béal ina thost\n")
+        lines = self.retriever.retrieve("saoi")
+        self.write("saoi", "is leor nod don eolach\n", mode="a")
+
+        self.assertEqual(list(lines), ["is binn béal ina thost\n"])
+        lines.use_mmap = False
+        self.assertEqual(list(lines), ["is binn béal ina thost\n"])
+        self.assertEqual(self.retriever.retrieve_appended("saoi"), ["is leor nod don eolach\n"])
+
+
+    def test_retrieve_empty(self):
+        self.write("saoi", "")
+
+        lines = self.retriever.retrieve("saoi")
+
+        self.assertFalse(lines)
+        self.assertEqual(list(lines), [])
+
+
+    def test_retrieve_appended(self):
+        self.write("saoi", "is binn béal ina thost\n")
+        self.retriever.retrieve("saoi")
+        self.write("saoi", "is leor nod don eolach\nbíonn gach", mode="a")
+
+        lines = self.retriever.retrieve_appended("saoi")
+
+        self.assertEqual(lines, ["is leor nod don eolach\n"])
+        self.assertEqual(self.retriever.retrieve_appended("saoi"), [])
+        self.write("saoi", " tosú lag\n", mode="a")
+        self.assertEqual(self.retriever.retrieve_appended("saoi"), ["bíonn gach tosú lag\n"])
+
+
+    def test_retrieve_appended_from_set_offset(self):
+        self.write("saoi", "is binn béal ina thost\nis leor nod don eolach\n")
+        self.retriever.set_offset("saoi", len("is binn béal ina thost\nis leor".encode("utf8")))
+
+        lines = self.retriever.retrieve_appended("saoi")
+
+        self.assertEqual(lines, ["is leor nod don eolach\n"])
+
+
+    def test_retrieve_appended_truncated(self):
+        self.write("saoi", "is binn béal ina thost\nis leor nod don eolach\n")
+        self.retriever.retrieve("saoi")
+        self.write("saoi", "is binn an fhírinne\n")
+
+        self.assertIsNone(self.retriever.retrieve_appended("saoi"))
+        self.assertEqual(self.retriever.retrieve_appended("saoi"), [])
+
+
+    def test_retrieve_appended_rewritten(self):
+        self.write("saoi", "is binn béal ina thost\n")
+        self.retriever.retrieve("saoi")
+        self.write("saoi", "is leor nod don eolach\nbíonn gach tosú lag\n")
+
+        self.assertIsNone(self.retriever.retrieve_appended("saoi"))
+        self.assertEqual(self.retriever.retrieve_appended("saoi"), [])
+
+
+    def test_retrieve_appended_replaced(self):
+        self.write("saoi", "is binn béal ina thost\n")
+        self.retriever.retrieve("saoi")
+        replacement_path = os.path.join(self.temp_dir.name, "saoi.tmp")
+        with open(replacement_path, "wb") as source_file:
+            source_file.write("is binn béal ina thost\nis leor nod don eolach\n".encode("utf8"))
+        os.replace(replacement_path, os.path.join(self.temp_dir.name, "saoi.src"))
+
+        self.assertIsNone(self.retriever.retrieve_appended("saoi"))
+
+
+    def test_retrieve_appended_removed(self):
+        self.write("saoi", "is binn béal ina thost\n")
+        self.retriever.retrieve("saoi")
+        os.remove(os.path.join(self.temp_dir.name, "saoi.src"))
+
+        self.assertIsNone(self.retriever.retrieve_appended("saoi"))
+
+
+    def test_list_speakers_manifest(self):
+        self.write("saoi", "is binn béal ina thost\n")
+        self.write("eolaí", "is leor nod don eolach\n")
+        os.makedirs(os.path.join(self.temp_dir.name, ".compiled"))
+        os.utime(self.temp_dir.name, ns=(0, 10 ** 18))
+
+        self.assertEqual(sorted(self.retriever.list_speakers()), ["eolaí", "saoi"])
+        with patch("os.listdir") as listdir:
+            self.assertEqual(sorted(self.retriever.list_speakers()), ["eolaí", "saoi"])
+            listdir.assert_not_called()
+
+        self.write("fáidh", "bíonn gach tosú lag\n")
+        os.utime(self.temp_dir.name, ns=(0, 10 ** 18 + 1))
+        self.assertEqual(sorted(self.retriever.list_speakers()), ["eolaí", "fáidh", "saoi"])
+
+
+    def test_list_speakers_unwritable_manifest(self):
+        self.write("saoi", "is binn béal ina thost\n")
+        open(os.path.join(self.temp_dir.name, ".compiled"), "w").close()
+
+        self.assertEqual(self.retriever.list_speakers(), ["saoi"])
+        self.assertEqual(self.retriever.list_speakers(), ["saoi"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -43,6 +43,16 @@ class TestSpeakerCollection(unittest.TestCase):
         self.assertEqual(self.collection.source_info["channels"], ["#farraige", "#oileán", "#rúin"])
 
 
+    def test_refresh_reports_added_and_removed(self):
+        self.source_retriever.list_speakers.return_value = ["beag", "draoi", "eagnaí", "eolaí", "fáidh", "saoi"]
+
+        added_names, removed_names = self.collection.refresh()
+
+        self.assertEqual(added_names, ["draoi"])
+        self.assertEqual(removed_names, ["folamh"])
+        self.assertEqual(self.collection.resolve_names(["draoi", "folamh"]), ["draoi"])
+
+
     def test_resolve_names_single_known_same(self):
         names = self.collection.resolve_names(["saoi"])
 
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from speaker_statistics import SpeakerStatistics, SpeakerStats
+from transition_builder import TransitionBuilder
+from vocabulary import Vocabulary
+
+class TestSpeakerStatistics(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, ".compiled", "stats.lst")
+        self.source_retriever = Mock()
+        self.source_retriever.get_signature.return_value = (27, 695280768)
+        self.saoi_source = [
+            "is binn béal ina thost\n",
+            "is leor nod don eolach\n",
+            "is binn an fhírinne\n",
+            "binn\n",
+        ]
+        self.source_retriever.retrieve.return_value = self.saoi_source
+        self.statistics = SpeakerStatistics(self.source_retriever, self.path, lookback_length=2)
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def test_count(self):
+        stats = self.statistics.get("saoi")
+
+        self.assertEqual(stats, SpeakerStats(transitions=8, lines=3, tokens=14, vocabulary=11, lookbacks=7))
+        transitions = TransitionBuilder(Vocabulary()).build(self.saoi_source, 2)
+        self.assertEqual(stats.transitions, sum(len(follows) for follows in transitions.values()))
+        self.assertEqual(stats.lookbacks, len(transitions))
+        self.source_retriever.retrieve.assert_called_once_with("saoi", record_offset=False)
+
+
+    def test_cached_until_changed(self):
+        self.statistics.get("saoi")
+        self.statistics.get("saoi")
+        self.assertEqual(self.source_retriever.retrieve.call_count, 1)
+
+        self.source_retriever.get_signature.return_value = (52, 695280769)
+        self.source_retriever.retrieve.return_value = self.saoi_source[:1]
+
+        self.assertEqual(self.statistics.get("saoi"), SpeakerStats(3, 1, 5, 5, 3))
+        self.assertEqual(self.source_retriever.retrieve.call_count, 2)
+
+
+    def test_update_invalidated(self):
+        self.statistics.get("saoi")
+        self.statistics.get("eolaí")
+        self.source_retriever.get_signature.return_value = (52, 695280769)
+        self.source_retriever.retrieve.return_value = self.saoi_source[:1]
+
+        self.statistics.invalidate(["saoi", "fáidh"], ["eolaí"])
+        self.assertEqual(self.statistics.update(max_count=1), ["saoi"])
+        self.assertEqual(self.statistics.update(max_count=1), ["fáidh"])
+        self.assertEqual(self.statistics.update(max_count=1), [])
+
+        self.assertEqual(sorted(self.statistics.entries), ["fáidh", "saoi"])
+        self.assertEqual(self.statistics.get("saoi"), SpeakerStats(3, 1, 5, 5, 3))
+        self.assertEqual(self.source_retriever.retrieve.call_count, 4)
+
+
+    def test_update_skips_current(self):
+        self.statistics.get("saoi")
+        self.statistics.invalidate(["saoi"], [])
+
+        self.assertEqual(self.statistics.update(), [])
+        self.assertEqual(self.source_retriever.retrieve.call_count, 1)
+
+
+    def test_persisted_by_update(self):
+        self.statistics.get("saoi")
+        self.assertFalse(os.path.exists(self.path))
+        self.statistics.update()
+
+        statistics = SpeakerStatistics(self.source_retriever, self.path, lookback_length=2)
+
+        self.assertEqual(statistics.get("saoi"), SpeakerStats(8, 3, 14, 11, 7))
+        self.source_retriever.retrieve.assert_called_once_with("saoi", record_offset=False)
+
+
+    def test_missing(self):
+        self.source_retriever.get_signature.return_value = None
+
+        self.assertIsNone(self.statistics.get("anaithnid"))
+        self.statistics.invalidate(["anaithnid"], [])
+        self.assertEqual(self.statistics.update(), [])
+        self.source_retriever.retrieve.assert_not_called()
+        self.assertFalse(os.path.exists(self.path))
+
+
+    def test_corrupt_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w", encoding="utf8") as stats_file:
+            stats_file.write("saoi\t27\t695280768\tneart\n\nsaoi\t27\n")
+
+        statistics = SpeakerStatistics(self.source_retriever, self.path, lookback_length=2)
+
+        self.assertEqual(statistics.entries, {})
+        self.assertEqual(statistics.get("saoi"), SpeakerStats(8, 3, 14, 11, 7))
+
+
+if __name__ == "__main__":
+    unittest.main()
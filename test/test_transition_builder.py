@@ -1,25 +1,37 @@
 import unittest
 
+from follow_distribution import FollowDistribution
 from transition_builder import TransitionBuilder
+from vocabulary import Vocabulary
 
 class TestTransitionBuilder(unittest.TestCase):
 
     def setUp(self):
-        self.builder = TransitionBuilder()
+        self.vocabulary = Vocabulary()
+        self.builder = TransitionBuilder(self.vocabulary)
 
 
     def tearDown(self):
         pass
 
 
+    def decode(self, transitions):
+        return {tuple(self.vocabulary.decode(lookback)) : self.decode_follows(follows)
+            for lookback, follows in transitions.items()}
+
+
+    def decode_follows(self, follows):
+        return [token for token_id, count in follows.counts().items() for token in self.vocabulary.decode([token_id] * count)]
+
+
     def test_build_empty(self):
-        transitions = self.builder.build([], 2)
+        transitions = self.decode(self.builder.build([], 2))
 
         self.assertEqual(len(transitions), 0)
 
 
     def test_build_short_line(self):
-        transitions = self.builder.build(["hello"], 2)
+        transitions = self.decode(self.builder.build(["hello"], 2))
 
         self.assertEqual(len(transitions), 0)
 
@@ -29,7 +41,7 @@ class TestTransitionBuilder(unittest.TestCase):
             "the cat sat on the mat",
         ]
 
-        transitions = self.builder.build(source, 2)
+        transitions = self.decode(self.builder.build(source, 2))
 
         self.assertEqual(len(transitions), 4)
         self. assertEqual(transitions[("the", "cat")], ["sat"])
@@ -46,7 +58,7 @@ class TestTransitionBuilder(unittest.TestCase):
             "couldn't put humpty together again",
         ]
 
-        transitions = self.builder.build(source, 2)
+        transitions = self.decode(self.builder.build(source, 2))
 
         self.assertEqual(len(transitions), 15)
         self. assertEqual(transitions[("humpty", "dumpty")], ["sat", "had"])
@@ -54,12 +66,39 @@ class TestTransitionBuilder(unittest.TestCase):
         self. assertEqual(transitions[("the", "king's")], ["horses", "men"])
 
 
+    def test_build_shared_vocabulary(self):
+        first_transitions = self.builder.build(["the cat sat on the mat"], 2)
+        second_transitions = self.builder.build(["the mat sat on the cat"], 2)
+
+        self.assertEqual(len(self.vocabulary), 5)
+        self.assertEqual(first_transitions[self.vocabulary.encode(("the", "cat"))], FollowDistribution.from_tokens(self.vocabulary.intern_all(["sat"])))
+        self.assertEqual(second_transitions[self.vocabulary.encode(("the", "mat"))], FollowDistribution.from_tokens(self.vocabulary.intern_all(["sat"])))
+
+
+    def test_build_line_starts(self):
+        source = [
+            "humpty dumpty sat on a wall",
+            "humpty dumpty had a great fall",
+            "all the king's horses and all the king's men",
+            "couldn't put",
+        ]
+
+        transitions = self.builder.build(source, 2)
+
+        self.assertEqual(transitions.line_starts.counts(), {
+            self.vocabulary.encode(("humpty", "dumpty")) : 2,
+            self.vocabulary.encode(("all", "the")) : 1,
+        })
+        self.assertEqual(len(transitions.lookbacks), len(transitions))
+        self.assertEqual(set(transitions.lookbacks), set(transitions.keys()))
+
+
     def test_build_reverse(self):
         source = [
             "the cat sat on the mat",
         ]
 
-        transitions = self.builder.build(source, 2, reverse=True)
+        transitions = self.decode(self.builder.build(source, 2, reverse=True))
 
         self.assertEqual(len(transitions), 4)
         self. assertEqual(transitions[("mat", "the")], ["on"])
@@ -68,5 +107,21 @@ class TestTransitionBuilder(unittest.TestCase):
         self. assertEqual(transitions[("sat", "cat")], ["the"])
 
 
+    def test_build_both(self):
+        source = [
+            "the cat sat on the mat",
+            "the cat ran",
+            "hello",
+        ]
+
+        forward_transitions, reverse_transitions = self.builder.build_both(source, 2)
+
+        self.assertEqual(forward_transitions, self.builder.build(source, 2))
+        self.assertEqual(reverse_transitions, self.builder.build(source, 2, reverse=True))
+        self.assertEqual(forward_transitions.line_starts, self.builder.build(source, 2).line_starts)
+        self.assertEqual(reverse_transitions.line_starts, self.builder.build(source, 2, reverse=True).line_starts)
+        self.assertEqual(sorted(reverse_transitions.lookbacks), sorted(reverse_transitions))
+
+
 if __name__ == "__main__":
     unittest.main()
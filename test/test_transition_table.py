@@ -0,0 +1,98 @@
+import unittest
+
+from follow_distribution import FollowDistribution
+from transition_table import TransitionTable
+
+class TestTransitionTable(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+
+    def tearDown(self):
+        pass
+
+
+    def make_table(self, lookback_length, transitions):
+        table = TransitionTable(lookback_length, ((lookback, FollowDistribution.from_tokens(follows)) for lookback, follows in transitions.items()))
+        table.index()
+        return table
+
+
+    def test_lookbacks_with_prefix_empty(self):
+        table = self.make_table(2, {})
+
+        self.assertEqual(list(table.lookbacks_with_prefix(("is",))), [])
+
+
+    def test_lookbacks_with_prefix_single(self):
+        table = self.make_table(2, {
+            ("is", "binn") : ["béal"],
+            ("binn", "béal") : ["ina"],
+            ("is", "leor") : ["nod"],
+        })
+
+        self.assertEqual(list(table.lookbacks_with_prefix(("is",))), [("is", "binn"), ("is", "leor")])
+        self.assertEqual(list(table.lookbacks_with_prefix(("binn",))), [("binn", "béal")])
+
+
+    def test_lookbacks_with_prefix_no_match(self):
+        table = self.make_table(2, {
+            ("is", "binn") : ["béal"],
+            ("binn", "béal") : ["ina"],
+        })
+
+        self.assertEqual(list(table.lookbacks_with_prefix(("béal",))), [])
+        self.assertEqual(list(table.lookbacks_with_prefix((None,))), [])
+
+
+    def test_lookbacks_with_prefix_longer_lookback(self):
+        table = self.make_table(3, {
+            ("is", "binn", "béal") : ["ina"],
+            ("is", "binn", "an") : ["fhírinne"],
+            ("is", "leor", "nod") : ["don"],
+        })
+
+        self.assertEqual(list(table.lookbacks_with_prefix(("is",))), [("is", "binn", "béal"), ("is", "binn", "an"), ("is", "leor", "nod")])
+        self.assertEqual(list(table.lookbacks_with_prefix(("is", "binn"))), [("is", "binn", "béal"), ("is", "binn", "an")])
+        self.assertEqual(list(table.lookbacks_with_prefix(("binn", "béal"))), [])
+
+
+    def test_index_after_merge(self):
+        table = self.make_table(2, {("is", "binn") : ["béal"]})
+        table[("is", "leor")] = FollowDistribution.from_tokens(["nod"])
+
+        table.index()
+
+        self.assertEqual(list(table.lookbacks_with_prefix(("is",))), [("is", "binn"), ("is", "leor")])
+        self.assertEqual(table.lookbacks, [("is", "binn"), ("is", "leor")])
+
+
+    def test_extended(self):
+        table = self.make_table(2, {("is", "binn") : ["béal"], ("binn", "béal") : ["ina"]})
+        table.line_starts = FollowDistribution.from_tokens([("is", "binn")])
+        additions = self.make_table(2, {("is", "binn") : ["an"], ("is", "leor") : ["nod"]})
+        additions.line_starts = FollowDistribution.from_tokens([("is", "leor")])
+
+        extended = table.extended(additions)
+
+        self.assertEqual(extended[("is", "binn")], FollowDistribution.from_tokens(["béal", "an"]))
+        self.assertEqual(extended[("is", "leor")], FollowDistribution.from_tokens(["nod"]))
+        self.assertEqual(extended.lookbacks, [("is", "binn"), ("binn", "béal"), ("is", "leor")])
+        self.assertEqual(list(extended.lookbacks_with_prefix(("is",))), [("is", "binn"), ("is", "leor")])
+        self.assertEqual(extended.line_starts.counts(), {("is", "binn") : 1, ("is", "leor") : 1})
+        self.assertEqual(table[("is", "binn")], FollowDistribution.from_tokens(["béal"]))
+        self.assertEqual(list(table.lookbacks_with_prefix(("is",))), [("is", "binn")])
+        self.assertEqual(len(table.lookbacks), 2)
+
+
+    def test_estimate_size(self):
+        small_table = self.make_table(2, {("is", "binn") : ["béal"]})
+        large_table = self.make_table(2, {("is", "binn") : ["béal", "an", "an"], ("is", "leor") : ["nod"]})
+
+        self.assertGreater(small_table.estimate_size(), self.make_table(2, {}).estimate_size())
+        self.assertGreater(large_table.estimate_size(), small_table.estimate_size())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from vocabulary import Vocabulary
+
+class TestVocabulary(unittest.TestCase):
+
+    def setUp(self):
+        self.vocabulary = Vocabulary()
+
+
+    def tearDown(self):
+        pass
+
+
+    def test_intern_new(self):
+        token_ids = self.vocabulary.intern_all(["is", "binn", "béal"])
+
+        self.assertEqual(token_ids, [0, 1, 2])
+        self.assertEqual(len(self.vocabulary), 3)
+
+
+    def test_intern_existing(self):
+        self.vocabulary.intern_all(["is", "binn", "béal"])
+
+        token_ids = self.vocabulary.intern_all(["béal", "is", "ina", "thost"])
+
+        self.assertEqual(token_ids, [2, 0, 3, 4])
+        self.assertEqual(len(self.vocabulary), 5)
+
+
+    def test_encode_known(self):
+        self.vocabulary.intern_all(["is", "binn", "béal"])
+
+        token_ids = self.vocabulary.encode(("binn", "béal"))
+
+        self.assertEqual(token_ids, (1, 2))
+
+
+    def test_encode_unknown(self):
+        self.vocabulary.intern_all(["is", "binn", "béal"])
+
+        token_ids = self.vocabulary.encode(("binn", "tost"))
+
+        self.assertEqual(token_ids, (1, None))
+        self.assertEqual(len(self.vocabulary), 3)
+
+
+    def test_decode(self):
+        self.vocabulary.intern_all(["is", "binn", "béal"])
+
+        tokens = self.vocabulary.decode([2, 0, 1])
+
+        self.assertEqual(tokens, ["béal", "is", "binn"])
+
+
+if __name__ == "__main__":
+    unittest.main()